@@ -0,0 +1,123 @@
+"""
+This module contains the building blocks of the chunked (out-of-core)
+processing of the datasets: mergeable statistics that are folded one chunk
+at a time, and a disk store where the records of every group are spilled
+until they are written
+"""
+
+import os
+import json
+import math
+import tempfile
+
+
+class Moments:
+    """
+    This class keeps the count, sum, mean and sum of squared deviations (M2)
+    of a series of values. Partial moments of different chunks are merged
+    with the parallel algorithm of Chan et al., which keeps the variance
+    numerically stable
+    """
+    def __init__(self, count = 0, total = 0.0, mean = math.nan, m2 = 0.0):
+        self.count = count
+        self.total = total
+        self.mean = mean
+        self.m2 = m2
+
+
+    def merge(self, other):
+        """
+        Adds the input partial moments to these ones
+        """
+        count = self.count + other.count
+
+        if (other.count == 0):
+            return
+        elif (self.count == 0):
+            self.count, self.total = other.count, other.total
+            self.mean, self.m2 = other.mean, other.m2
+            return
+
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.total += other.total
+        self.count = count
+
+
+    def get_std(self):
+        """
+        Returns the sample standard deviation of the values (NaN if there are
+        less than two)
+        """
+        if (self.count < 2):
+            return math.nan
+
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+def get_moments(values):
+    """
+    Returns the Moments of the non-missing values of the input Series
+    """
+    values = values.dropna().astype(float)
+
+    if (len(values) == 0):
+        return Moments()
+
+    mean = float(values.mean())
+
+    return Moments(len(values), float(values.sum()), mean,
+                   float(((values - mean) ** 2).sum()))
+
+
+class SpillStore:
+    """
+    This class appends the JSON objects of every group to its own
+    newline-delimited file of a temporary directory, so that the records of a
+    dataset are grouped on disk instead of in memory. The directory is
+    deleted when the store is closed
+    """
+    def __init__(self):
+        self._directory = tempfile.TemporaryDirectory(prefix = 'spill_')
+        self._filenames = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+
+    def append(self, key, json_objects):
+        """
+        Appends the input JSON objects to the file of the group key
+        """
+        if (key not in self._filenames):
+            self._filenames[key] = os.path.join(self._directory.name,
+                                                f'{len(self._filenames)}.json')
+
+        with open(self._filenames[key], 'a') as spill_file:
+            spill_file.writelines(json.dumps(json_object) + '\n'
+                                  for json_object in json_objects)
+
+
+    def read(self, key):
+        """
+        Returns the list of JSON objects of the group key, in the order they
+        were appended
+        """
+        if (key not in self._filenames):
+            return []
+
+        with open(self._filenames[key]) as spill_file:
+            return [json.loads(line) for line in spill_file]
+
+
+    def close(self):
+        """
+        Deletes the spilled files
+        """
+        self._directory.cleanup()
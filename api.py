@@ -1,43 +1,129 @@
 """
 This module allows communication with the backend's API through POST requests
-with information of the datasets
+with information of the datasets. The requests are sent concurrently through
+a shared connection pool, with a bounded number of requests in flight,
+per-request timeouts and retries with exponential backoff
 """
 
-import json
-import grequests
-from constants import BEDS_URL, MEASURES_URL, HEADERS
+import time
+import asyncio
+import aiohttp
+import settings
+import profiling
+from constants import BEDS_URL, MEASURES_URL, HEADERS, API_BACKOFF
 
 
-def handle_exception(request, exception):
+async def _post(session, semaphore, endpoint, payload, index, retries):
     """
-    Exception handler callback function
+    Sends one POST request, retrying on server errors (5xx), connection errors
+    and timeouts, and returns a dictionary with its outcome
     """
-    print('Could not perform the request due to a problem:')
-    print(exception)
+    result = {'index': index, 'status': None, 'body': None, 'error': None,
+              'latency': None, 'attempts': 0}
 
+    for attempt in range(retries + 1):
+        result['attempts'] = attempt + 1
 
-def send_data(json_data_list, endpoint):
+        async with semaphore:
+            start = time.perf_counter()
+
+            try:
+                async with session.post(endpoint, data = payload,
+                                        headers = HEADERS) as response:
+                    result['body'] = await response.text()
+                    result['status'] = response.status
+                    result['latency'] = time.perf_counter() - start
+                    result['error'] = None
+
+                    if (response.status < 500):
+                        return result
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result['status'] = None
+                result['error'] = repr(e)
+
+        if (attempt < retries):
+            await asyncio.sleep(API_BACKOFF * 2 ** attempt)
+
+    return result
+
+
+async def _post_all(json_data_list, endpoint, concurrency, timeout, retries):
     """
-    Attempts to send a POST request to the Bed endpoint
+    Sends all the POST requests through one session and returns their
+    outcomes in the order of the payloads
     """
-    pending_requests = []
-        
-    for json_struct in json_data_list:
-        pending_requests.append(grequests.post(endpoint, data = json_struct,
-                                               headers = HEADERS))        
+    connector = aiohttp.TCPConnector(limit = concurrency)
+    client_timeout = aiohttp.ClientTimeout(total = timeout)
+    semaphore = asyncio.Semaphore(concurrency)
 
-    print('Going to send the requests')
+    async with aiohttp.ClientSession(connector = connector,
+                                     timeout = client_timeout) as session:
+        return await asyncio.gather(*[_post(session, semaphore, endpoint,
+                                            payload, index, retries)
+                                      for index, payload
+                                      in enumerate(json_data_list)])
 
-    responses = grequests.map(pending_requests, 
-                              exception_handler = handle_exception)
 
-    print('Requests sent')
+def _is_success(result):
+    """
+    Checks whether a request outcome is a successful response
+    """
+    return result['status'] is not None and 200 <= result['status'] < 300
 
-    for index, response in enumerate(responses):
-        if (response.status_code == 201):
+
+def _print_summary(results):
+    """
+    Prints the outcome of every request and the summary of successes,
+    failures and latencies
+    """
+    for result in results:
+        index = result['index']
+
+        if (_is_success(result)):
             print(f'SUCCESS! Response #{index}:')
-            print(response.json())
-        else:
+            print(result['body'])
+        elif (result['status'] is not None):
             print(f'Problem with the request. Response #{index}:')
-            print(response.status_code)
-            print(response.json())
\ No newline at end of file
+            print(result['status'])
+            print(result['body'])
+        else:
+            print(f'Could not perform request #{index} due to a problem:')
+            print(result['error'])
+
+    successes = sum(1 for result in results if _is_success(result))
+    latencies = sorted(result['latency'] for result in results
+                       if result['latency'] is not None)
+    retried = sum(1 for result in results if result['attempts'] > 1)
+
+    print(f'Requests sent: {len(results)} ({successes} succeeded, '
+          f'{len(results) - successes} failed, {retried} retried)')
+
+    if (latencies):
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f'Latency (ms): min {1000 * latencies[0]:.1f}, '
+              f'mean {1000 * sum(latencies) / len(latencies):.1f}, '
+              f'p95 {1000 * p95:.1f}, max {1000 * latencies[-1]:.1f}')
+
+
+@profiling.instrumented('send_data', count = len)
+def send_data(json_data_list, endpoint, concurrency = None, timeout = None,
+              retries = None):
+    """
+    Attempts to send a POST request with each payload to the input endpoint
+    (e.g. BEDS_URL or MEASURES_URL) and returns the list of their outcomes.
+    The concurrency limit, timeout (in seconds) and number of retries default
+    to the ones of the settings
+    """
+    concurrency = concurrency or settings.api_concurrency
+    timeout = timeout or settings.api_timeout
+    retries = settings.api_retries if retries is None else retries
+
+    print('Going to send the requests')
+
+    results = asyncio.run(_post_all(json_data_list, endpoint, concurrency,
+                                    timeout, retries))
+
+    print('Requests sent')
+    _print_summary(results)
+
+    return results
@@ -3,144 +3,277 @@ This module contains functions for processing the bed capacity dataset
 """
 
 import sys
-import api
-import json
+import math
+import cache
+import ranking
+import parallel
+import settings
+import profiling
+import serializer
+import numpy as np
 import pandas as pd
-from file_export import write_beds_data
-from commons import prompt_user
-from constants import BedsFilter, TOP_N
-from datatypes import (BedsRecord, BedTypesData, BedsGeneralData,
-                       BedTypesGeneralData)
-
-
-def _pack_records(country_gb, limit = None):
-    """
-    From a filtered grouped dataframe, returns a list of BedsRecords and
-    BedsTypesData objects
-    Precondition: The dataset contains the beds_total, beds_average,
-    population_average, estimated_beds, estimated_beds_total, and
-    estimated_beds_average columns
-    """
-    country_records = []
-    type_data = []
-
-    for country_name, country_group in list(country_gb)[:limit]:
-        beds_average = country_group['beds_average'].values[0]
-        beds_total = country_group['beds_total'].values[0]
-        population = country_group['population_average'].values[0]
-        estimated_beds_total = country_group['estimated_beds_total'].values[0]
-        estimated_beds_average = country_group['estimated_beds_average'] \
-                                     .values[0]
-        iso_code = ""
-
-        if (type(country_name) is tuple):
-            iso_code = country_name[1].lower()
-        else:
-            iso_code = country_name.lower()
-
-        new_record = BedsRecord(code = iso_code,
-                                lat = float(country_group['lat'].values[0]),
-                                lng = float(country_group['lng'].values[0]),
-                                beds_total = float(beds_total),
-                                beds_average = float(beds_average),
-                                estimated_beds_total = \
-                                    float(estimated_beds_total),
-                                estimated_beds_average = \
-                                    float(estimated_beds_average),
-                                population_average = population)
-
-        bed_types_groups = country_group.groupby('type')
-
-        for type_name, type_group in bed_types_groups:
-            type_bed_count = float(type_group['beds'].values[0])
-            type_percentage = 100 * type_bed_count / beds_total
-            type_population = float(type_group['population'].values[0])
-            type_estimated = type_population * type_bed_count / 10
-            source = type_group['source'].values[0]
-            source_url = type_group['source_url'].values[0]
-            year = type_group['year'].values[0]
-
-            new_type_data = BedTypesData(code = iso_code,
-                                         type_name = type_name.lower(),
-                                         count = type_bed_count,
-                                         percentage = type_percentage,
-                                         estimated_for_population = \
-                                             type_estimated,
-                                         population = type_population,
-                                         source = source,
-                                         source_url = source_url,
-                                         year = int(year))
-
-            type_data.append(new_type_data)
-
-        country_records.append(new_record)
-
-    return [country_records, type_data]
+from schemas import read_dataset, get_projection
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from spatial import SpatialIndex
+from aggregates import Moments, get_moments
+from file_export import write_beds_data, get_beds_filenames, read_files
+from commons import prompt_user, get_derived, set_derived
+from constants import (BedsFilter, BEDS_METRICS, BEDS_RANKINGS, BEDS_SCHEMA,
+                       BEDS_PROJECTIONS, BEDS_FILTER_PROJECTIONS,
+                       BEDS_SPATIAL_FILTERS, SPATIAL_RADIUS, SPATIAL_COUNT)
+from datatypes import (BedsRecordBatch, BedTypesDataBatch, BedsGeneralData,
+                       BedTypesGeneralData, BedsNeighborBatch)
+
+
+def _aggregate_countries(data):
+    """
+    Returns the aggregate table of the countries of the dataset, computed in
+    one grouped pass: a DataFrame indexed by country (sorted by name) with
+    the beds_total, beds_average, estimated_beds_total,
+    estimated_beds_average and population_average columns, and the lat and
+    lng columns (the first known coordinates of each country) if the
+    dataset has them
+    """
+    values = pd.DataFrame({
+        'beds': data['beds'],
+        'estimated_beds': data['population'] * data['beds'] / 10,
+        'population': data['population']
+    })
+    aggregations = {
+        'beds_total': ('beds', 'sum'),
+        'beds_average': ('beds', 'mean'),
+        'estimated_beds_total': ('estimated_beds', 'sum'),
+        'estimated_beds_average': ('estimated_beds', 'mean'),
+        'population_average': ('population', 'mean')
+    }
+
+    for column in ['lat', 'lng']:
+        if (column in data):
+            values[column] = data[column]
+            aggregations[column] = (column, 'first')
+
+    return values.groupby(data['country'], observed = True) \
+                 .agg(**aggregations)
+
+
+def _get_country_aggregates(data):
+    """
+    Returns the aggregate table of the countries of the dataset (see
+    _aggregate_countries), which is computed once for each loaded dataset,
+    when it is transformed or the first time a filter needs it
+    """
+    return get_derived(data, 'country_aggregates',
+                       lambda: _aggregate_countries(data))
+
+
+@profiling.instrumented('pack_records',
+                        count = lambda records: len(records[0]) +
+                                                len(records[1]))
+def _pack_records(data, countries = None):
+    """
+    From the transformed dataset, returns the BedsRecordBatch and
+    BedTypesDataBatch of the input countries, following their order (or
+    for all the countries sorted by name if None). The country fields are
+    taken from the aggregate table of the countries, the type fields from
+    the first record of each (country, type) pair, and the derived columns
+    are computed over whole arrays
+    """
+    country_data = _get_country_aggregates(data)
+
+    if (countries is not None):
+        country_data = country_data.loc[countries]
+
+    positions = pd.Series(range(len(country_data)), index = country_data.index)
+    type_data = data.drop_duplicates(['country', 'type'])
+    type_data = type_data[type_data['country'].isin(positions.index)]
+    type_positions = positions.reindex(type_data['country']).to_numpy()
+    type_data = type_data.assign(position = type_positions) \
+                         .sort_values(['position', 'type'], kind = 'mergesort')
+
+    type_bed_counts = type_data['beds'].astype(float)
+    type_populations = type_data['population'].astype(float)
+    type_percentages = 100 * type_bed_counts / \
+                       country_data['beds_total'].to_numpy() \
+                           [type_data['position'].to_numpy()]
+    type_estimates = type_populations * type_bed_counts / 10
+
+    country_records = BedsRecordBatch(
+        code = country_data.index.str.lower(),
+        lat = country_data['lat'].astype(float).to_numpy(),
+        lng = country_data['lng'].astype(float).to_numpy(),
+        beds_total = country_data['beds_total'].astype(float).to_numpy(),
+        beds_average = country_data['beds_average'].astype(float).to_numpy(),
+        estimated_beds_total = country_data['estimated_beds_total'] \
+                                   .astype(float).to_numpy(),
+        estimated_beds_average = country_data['estimated_beds_average'] \
+                                     .astype(float).to_numpy(),
+        population_average = country_data['population_average'] \
+                                 .astype(float).to_numpy())
+
+    type_data_list = BedTypesDataBatch(
+        code = type_data['country'].str.lower(),
+        type_name = type_data['type'].str.lower(),
+        count = type_bed_counts.to_numpy(),
+        percentage = type_percentages.to_numpy(),
+        estimated_for_population = type_estimates.to_numpy(),
+        population = type_populations.to_numpy(),
+        source = type_data['source'],
+        source_url = type_data['source_url'],
+        year = type_data['year'].astype(int).to_numpy())
+
+    return [country_records, type_data_list]
 
 
 def _process_without_filter(data):
     """
     Returns the basic structure of the whole dataset without filter
     """
-    country_gb = data.groupby('country')
-    return(_pack_records(country_gb))
+    return _pack_records(data)
 
 
-def _process_by_scale_capacity(data, ascending = False):
+def _get_metric_column(filter_metric):
     """
-    Filters by the N top or bottom countries by bed count and returns the list
-    of filtered BedsRecords and BedTypes
-    Precondition: The beds_total column has been added to the dataframe
+    Returns the column of the metric chosen for the ranking filters, or the
+    input metric of the filter if none was chosen
     """
-    sorted_data = data.sort_values(['beds_total'], ascending = ascending)
-    country_gb = sorted_data.groupby(['beds_total','country'], sort = False)
+    if (settings.ranking_metric is None):
+        return filter_metric
+    elif (settings.ranking_metric not in BEDS_METRICS):
+        raise Exception(f'"{settings.ranking_metric}" is not a metric of the '
+                        'beds dataset')
+    else:
+        return BEDS_METRICS[settings.ranking_metric]
+
 
-    return _pack_records(country_gb, TOP_N)
+def _get_ranked_countries(data, category):
+    """
+    Selects the N top and/or bottom countries by a metric, according to the
+    ranking settings (which default to the ones of the input ranking filter),
+    and returns a list with the [export name, countries] pair of every ranked
+    direction
+    """
+    filter_metric, filter_direction = BEDS_RANKINGS[category]
+    metric = _get_metric_column(filter_metric)
+    count = settings.ranking_count
+    directions = ranking.get_directions(filter_direction,
+                                        settings.ranking_direction)
+    rankings = ranking.rank(_get_country_aggregates(data), metric, count,
+                            directions)
+
+    return [[ranking.get_export_name(BedsFilter(category).name,
+                                     BEDS_RANKINGS[category], metric,
+                                     direction, count),
+             rankings[direction]]
+            for direction in directions]
+
+
+def _process_ranking(data, category):
+    """
+    Filters by the N top and/or bottom countries by a metric, according to the
+    ranking settings (which default to the ones of the input ranking filter),
+    and returns a list with the [export name, [BedsRecordBatch,
+    BedTypesDataBatch]] pair of every ranked direction
+    """
+    return [[name, _pack_records(data, countries)]
+            for name, countries in _get_ranked_countries(data, category)]
 
 
-def _process_by_estimated_capacity(data, ascending = False):
+def _build_spatial_index(country_data):
     """
-    Filters by the N top or bottom countries by bed estimate and returns the
-    list of filtered BedsRecords and BedTypesData
-    Precondition: The estimated_beds_total column has been added to the
-    dataframe
+    Returns the SpatialIndex of the coordinates of the input country data,
+    labeled by its index
     """
-    sorted_data = data.sort_values(['estimated_beds_total'], 
-                                   ascending = ascending)
-    country_gb = sorted_data.groupby(['estimated_beds_total','country'],
-                                     sort = False)
+    return SpatialIndex(country_data.index.to_numpy(), country_data['lat'],
+                        country_data['lng'])
 
-    return _pack_records(country_gb, TOP_N)
+
+def _get_spatial_index(data):
+    """
+    Returns the SpatialIndex of the countries of the dataset with known
+    coordinates (labeled by country and sorted by name), which is built once
+    for each loaded dataset
+    """
+    return get_derived(data, 'spatial_index',
+                       lambda: _build_spatial_index(
+                                   _get_country_aggregates(data) \
+                                       .dropna(subset = ['lat', 'lng'])))
 
 
-def _process_by_average_scale_capacity(data, ascending = False):
+def _get_query_points(index):
     """
-    Filters by the N top or bottom countries by bed count average and returns 
-    the list of filtered BedsRecords and BedTypesData
-    Precondition: The beds_average column has been added to the
-    dataframe
+    Returns a list with the origin codes, latitudes and longitudes of the
+    query points of the spatial filters: the points chosen in the settings
+    (without origin), or the location of every country of the spatial index
     """
-    sorted_data = data.sort_values(['beds_average'], 
-                                   ascending = ascending)
-    country_gb = sorted_data.groupby(['beds_average','country'],
-                                     sort = False)
+    if (settings.spatial_points is None):
+        origins = np.array([label.lower() for label in index.labels],
+                           dtype = object)
+        return [origins, index.lat, index.lng]
+
+    points = np.array(settings.spatial_points, dtype = float).reshape(-1, 2)
 
-    return _pack_records(country_gb, TOP_N)
+    return [np.full(len(points), None, dtype = object), points[:, 0],
+            points[:, 1]]
 
 
-def _process_by_average_estimated_capacity(data, ascending = False):
+def _get_spatial_export_name(category):
     """
-    Filters by the N top or bottom countries by bed estimate average and
-    returns the list of filtered BedsRecords and BedTypes
-    Precondition: The estimated_beds_average column has been added to the
-    dataframe
+    Returns the name of the exported files of a spatial filter, which is the
+    one of the filter unless its radius or count is not the default one
     """
-    sorted_data = data.sort_values(['estimated_beds_average'], 
-                                   ascending = ascending)
-    country_gb = sorted_data.groupby(['estimated_beds_average','country'],
-                                     sort = False)
+    if (category == BedsFilter.COUNTRIES_WITHIN_RADIUS.value and
+        settings.spatial_radius != SPATIAL_RADIUS):
+        return f'COUNTRIES_WITHIN_{settings.spatial_radius:g}_KM'
+    elif (category == BedsFilter.NEAREST_COUNTRIES.value and
+          settings.spatial_count != SPATIAL_COUNT):
+        return f'NEAREST_{settings.spatial_count}_COUNTRIES'
+
+    return BedsFilter(category).name
+
 
-    return _pack_records(country_gb, TOP_N)
+def _process_spatial(data, category):
+    """
+    Answers the spatial filter for every query point at once, and returns a
+    list with its [export name, [BedsNeighborBatch, BedTypesDataBatch]]
+    pair. The neighbors are the countries within the radius of each point
+    (sorted by distance) or its N nearest countries (ranked by bed capacity,
+    and then by distance), and the bed types are the ones of all the found
+    countries, sorted by name
+    """
+    index = _get_spatial_index(data)
+    origins, lat, lng = _get_query_points(index)
+    beds_totals = _get_country_aggregates(data)['beds_total'] \
+                      .reindex(index.labels).to_numpy(dtype = float)
+
+    with profiling.stage('spatial_query', len(lat)):
+        if (category == BedsFilter.COUNTRIES_WITHIN_RADIUS.value):
+            query_ids, positions, distances = index.query_radius(
+                                                  lat, lng,
+                                                  settings.spatial_radius)
+        else:
+            query_ids, positions, distances = index.query_nearest(
+                                                  lat, lng,
+                                                  settings.spatial_count)
+
+    if (category == BedsFilter.NEAREST_COUNTRIES.value):
+        order = np.lexsort((distances, -beds_totals[positions], query_ids))
+        query_ids = query_ids[order]
+        positions = positions[order]
+        distances = distances[order]
+
+    countries = index.labels[positions]
+    neighbors = BedsNeighborBatch(
+                    origin = origins[query_ids],
+                    origin_lat = lat[query_ids],
+                    origin_lng = lng[query_ids],
+                    code = [country.lower() for country in countries],
+                    distance = distances,
+                    beds_total = beds_totals[positions])
+    found_countries = sorted(set(countries.tolist()))
+
+    return [[_get_spatial_export_name(category),
+             [neighbors, _pack_records(data, found_countries)[1]]]]
 
 
 def _process_general_statistics(beds_df):
@@ -148,25 +281,28 @@ def _process_general_statistics(beds_df):
     Retrieves the dataset's general statistics in a list of two elements:
     [0] General information
     [1] Type-specific information
+    The statistics of the country totals are weighted by the records of each
+    country, so only this filter takes them back to one value per record
     """
-    beds_total = float(beds_df['beds_total'].sum())
-    beds_average = float(beds_df['beds_total'].mean())
-    beds_std = float(beds_df['beds_total'].std())
-    raw_sources_count = dict(beds_df['source'].value_counts())
-
-    sources_count = {source: int(count) for source, count
-                     in raw_sources_count.items()}
+    country_totals = pd.Series(_get_country_aggregates(beds_df)['beds_total'] \
+                                   .reindex(beds_df['country']).to_numpy())
+    beds_total = country_totals.sum()
+    beds_average = country_totals.mean()
+    beds_std = country_totals.std()
+    # Counted as objects, so that the sources missing from the data are not
+    # counted and the ties keep their order of appearance
+    sources_count = dict(beds_df['source'].astype(object).value_counts())
 
     general_data = BedsGeneralData(beds_total, beds_average, beds_std,
                                    sources_count)
     types_data = []
-    types_gb = beds_df.groupby('type')
+    types_gb = beds_df.groupby('type', observed = True)
 
     for type_name, type_group in types_gb:
-        type_count = float(type_group['beds'].sum())
-        type_percentage = float(type_count / beds_total * 100)
-        type_average = float(type_group['beds'].mean())
-        type_std = float(type_group['beds'].std())
+        type_count = type_group['beds'].sum()
+        type_percentage = type_count / beds_total * 100
+        type_average = type_group['beds'].mean()
+        type_std = type_group['beds'].std()
         if (pd.isna(type_std)):
             type_std = 0.0
 
@@ -180,70 +316,348 @@ def _process_general_statistics(beds_df):
 
 def _transform_beds_dataset(data):
     """
-    Includes additional columns to the beds dataset:
-    - estimated_beds: the amount of beds per person
-    - estimated_beds_total: sum of all estimated_beds in a country groupby
-    - estiamted_beds_average: average of estimated_beds in a country groupby
-    - beds_total: sum of beds in a country groupby
-    - beds_total: average of beds in a country groupby
-    """
-    data['estimated_beds'] = data['population'] * data['beds'] / 10
-    data['estimated_beds_total'] = data.groupby('country') \
-                                            ['estimated_beds'] \
-                                        .transform('sum')
-    data['estimated_beds_average'] = data.groupby('country') \
-                                            ['estimated_beds'] \
-                                        .transform('mean')
-    data['beds_total'] = data.groupby('country')['beds'].transform('sum')
-    data['beds_average'] = data.groupby('country')['beds'] \
-                                .transform('mean')
-    data['population_average'] = data.groupby('country')['population'] \
-                                        .transform('mean')
-
-
-def _filter_beds(category, sampling = False):
+    Computes the aggregate table of the countries of the beds dataset (see
+    _aggregate_countries), which is shared by all the filters instead of
+    broadcasting the aggregates to every record
+    """
+    set_derived(data, 'country_aggregates', _aggregate_countries(data))
+
+
+def _get_chunk_partials(chunk):
+    """
+    Returns a DataFrame indexed by country with the partial aggregates of a
+    chunk of the beds dataset: its number of rows, and the sums and counts of
+    the non-missing beds, estimated beds and population values
+    """
+    chunk = chunk.assign(estimated_beds = chunk['population'] * \
+                                          chunk['beds'] / 10)
+    country_groups = chunk.groupby('country')
+
+    return pd.DataFrame({
+        'rows': country_groups.size(),
+        'beds_sum': country_groups['beds'].sum(),
+        'beds_count': country_groups['beds'].count(),
+        'estimated_beds_sum': country_groups['estimated_beds'].sum(),
+        'estimated_beds_count': country_groups['estimated_beds'].count(),
+        'population_sum': country_groups['population'].sum(),
+        'population_count': country_groups['population'].count()
+    })
+
+
+def _get_chunked_general_statistics(partials, type_moments, sources_count):
+    """
+    Returns the dataset's general statistics (the same as
+    _process_general_statistics) from the merged aggregates of its chunks:
+    the partial aggregates of every country, the Moments of the beds of every
+    type and the counter of the sources of the rows
+    """
+    rows = partials['rows']
+    country_totals = partials['beds_sum']
+    count = int(rows.sum())
+    beds_total = float((rows * country_totals).sum())
+    beds_average = beds_total / count if count else math.nan
+    beds_std = math.sqrt(float((rows * (country_totals - beds_average) ** 2) \
+                               .sum()) / (count - 1)) \
+               if count > 1 else math.nan
+    sources_count = dict(sorted(sources_count.items(),
+                                key = lambda item: -item[1]))
+
+    general_data = BedsGeneralData(beds_total, beds_average, beds_std,
+                                   sources_count)
+    types_data = []
+
+    for type_name in sorted(type_moments):
+        moments = type_moments[type_name]
+        type_average = moments.total / moments.count if moments.count \
+                       else math.nan
+        type_std = moments.get_std()
+
+        if (math.isnan(type_std)):
+            type_std = 0.0
+
+        types_data.append(BedTypesGeneralData(type_name.lower(),
+                                              moments.total,
+                                              moments.total / beds_total * 100,
+                                              type_average, type_std))
+
+    return [general_data, types_data]
+
+
+@profiling.instrumented('read_chunks', count = len)
+def _read_beds_chunks(sampling = False):
+    """
+    Reads the beds dataset from its CSV file one chunk of rows at a time
+    (according to the chunk size setting), folding every chunk into mergeable
+    aggregates, and returns the dataset reduced to the first row of each
+    (country, type) pair, which is enough to pack its records and rank its
+    countries. The aggregate table of the countries and the general
+    statistics, which depend on every row, are computed from the aggregates
+    and kept as its 'country_aggregates' and 'general_statistics' derived
+    structures
+    """
+    nrows = BedsFilter.SAMPLE_RECORDS.value if sampling else None
+    partials = None
+    first_rows = None
+    type_moments = {}
+    sources_count = Counter()
+
+    for chunk in pd.read_csv(BedsFilter.DATA_FILENAME.value,
+                             chunksize = settings.chunk_size, nrows = nrows):
+        chunk_partials = _get_chunk_partials(chunk)
+        partials = chunk_partials if partials is None else \
+                   partials.add(chunk_partials, fill_value = 0)
+        first_rows = pd.concat([first_rows,
+                                chunk.drop_duplicates(['country', 'type'])]) \
+                       .drop_duplicates(['country', 'type'])
+        sources_count.update(chunk['source'].value_counts(sort = False) \
+                                            .to_dict())
+
+        for type_name, type_group in chunk.groupby('type'):
+            type_moments.setdefault(type_name, Moments()) \
+                        .merge(get_moments(type_group['beds']))
+
+    data = first_rows.reset_index(drop = True)
+    coordinates = data.drop_duplicates('country').set_index('country') \
+                      .reindex(partials.index)
+    set_derived(data, 'country_aggregates', pd.DataFrame({
+        'beds_total': partials['beds_sum'],
+        'beds_average': partials['beds_sum'] / partials['beds_count'],
+        'estimated_beds_total': partials['estimated_beds_sum'],
+        'estimated_beds_average': partials['estimated_beds_sum'] /
+                                  partials['estimated_beds_count'],
+        'population_average': partials['population_sum'] /
+                              partials['population_count'],
+        'lat': coordinates['lat'],
+        'lng': coordinates['lng']
+    }).sort_index())
+    set_derived(data, 'general_statistics',
+                _get_chunked_general_statistics(partials, type_moments,
+                                                sources_count))
+
+    return data
+
+
+def _read_beds_dataset(sampling = False, projection = 'records'):
+    """
+    Reads the beds dataset from its CSV file and returns it transformed. If
+    the sampling parameter is set to true, only a number of records will be
+    taken from the dataset according to the value of the
+    BedsFilter.SAMPLE_RECORDS constant. Only the columns of the input
+    projection (of BEDS_PROJECTIONS) are read, with the BEDS_SCHEMA types
+    """
+    with profiling.stage('read_csv', label = projection) as read_stage:
+        data = read_dataset(BedsFilter.DATA_FILENAME.value, BEDS_SCHEMA,
+                            BEDS_PROJECTIONS[projection])
+        read_stage.count(len(data))
+
+    if sampling:
+        data = data.head(BedsFilter.SAMPLE_RECORDS.value)
+
+    with profiling.stage('transform', len(data)):
+        _transform_beds_dataset(data)
+
+    return data
+
+
+@profiling.instrumented('load_dataset', count = len, label = 'beds')
+def load_beds_dataset(sampling = False, projection = 'records'):
+    """
+    Returns the transformed beds dataset with the columns of the input
+    projection, taking it from the cache when the CSV file has not changed
+    since it was stored. If a chunk size is set, the file is read in chunks
+    and the dataset is reduced to its aggregates, without the cache (as its
+    aggregates are derived structures that are not stored with it)
+    """
+    name = ('beds_sample' if sampling else 'beds') + f'_{projection}'
+
+    try:
+        if (settings.chunk_size):
+            return _read_beds_chunks(sampling)
+
+        return cache.load_dataset(BedsFilter.DATA_FILENAME.value, name,
+                                  lambda: _read_beds_dataset(sampling,
+                                                             projection))
+    except FileNotFoundError:
+        print(f'The file "{BedsFilter.DATA_FILENAME.value}" does not exist')
+        sys.exit('No file, no execution... Stopping!')
+    except ValueError as e:
+        print(e)
+        sys.exit('Invalid file, no execution... Stopping!')
+
+
+def _filter_beds(category, sampling = False, data = None):
     """
     Returns the dataset (pandas.core.frame.DataFrame) filtered by the input
     filter category. If the sampling parameter is set to true, only a number
     of records will be taken from the dataset according to the value of the
-    BedsFilter.SAMPLE_RECORDS constant
-    The returned structure is a list with two elements:
-    [0]: General structure for country information
+    BedsFilter.SAMPLE_RECORDS constant. An already loaded dataset can be
+    given through the data parameter, in which case it is not read again
+    The returned structure is a list with an [export name, records] pair for
+    each output of the filter (ranking filters can output both directions),
+    where the records are a list with two elements:
+    [0]: General structure for country information (or the countries found
+    around each point, for the spatial filters)
     [1]: Information for bed types
     """
-    try:
-        data = pd.read_csv(BedsFilter.DATA_FILENAME.value)
+    if (data is None):
+        data = load_beds_dataset(sampling,
+                                 BEDS_FILTER_PROJECTIONS[category])
 
-        if sampling:
-            data = data.head(BedsFilter.SAMPLE_RECORDS.value)
+    if (category == BedsFilter.NUMBER_PERCENT_COUNTRY_NORMAL.value):
+        records = _process_without_filter(data)
+    elif (category in BEDS_RANKINGS):
+        return _process_ranking(data, category)
+    elif (category in BEDS_SPATIAL_FILTERS):
+        return _process_spatial(data, category)
+    else:
+        records = get_derived(data, 'general_statistics') or \
+                  _process_general_statistics(data)
 
-        _transform_beds_dataset(data)
+    return [[BedsFilter(category).name, records]]
+
+
+def _serialize_records(records, filter_option):
+    """
+    Returns the JSON strings of the general and types data for the filtered
+    records of the input filter option
+    """
+    if (filter_option != BedsFilter.GENERAL_STATISTICS.value):
+        with profiling.stage('json_dumps', len(records[0]) + len(records[1])):
+            return [records[0].dumps(), records[1].dumps()]
+
+    with profiling.stage('to_json') as json_stage:
+        general_json_list = records[0].to_json()
+        types_json_list = [r.to_json() for r in records[1]]
+
+        json_stage.count(profiling.count_items(general_json_list,
+                                               types_json_list))
+
+    with profiling.stage('json_dumps'):
+        general_data = serializer.dumps(general_json_list)
+        types_data = serializer.dumps(types_json_list)
+
+    return [general_data, types_data]
+
+
+def _serialize_shard(shard):
+    """
+    Packs the records of a shard of countries, given its rows, countries and
+    their aggregate table, and returns the serialized items of its general
+    and types data (run by the worker processes)
+    """
+    rows, countries, country_aggregates = shard
+    set_derived(rows, 'country_aggregates', country_aggregates)
+    records = _pack_records(rows, countries)
+
+    return [records[0].dumps_items(), records[1].dumps_items()]
 
-        if (category == BedsFilter.NUMBER_PERCENT_COUNTRY_NORMAL.value):
-            return _process_without_filter(data)
-        elif (category == BedsFilter.TOP_COUNTRIES_SCALE.value):
-            return _process_by_scale_capacity(data)
-        elif (category == BedsFilter.BOTTOM_COUNTRIES_SCALE.value):
-            return _process_by_scale_capacity(data, True)
-        elif (category == BedsFilter.TOP_COUNTRIES_ESTIMATE.value):
-            return _process_by_estimated_capacity(data)
-        elif (category == BedsFilter.BOTTOM_COUNTRIES_ESTIMATE.value):
-            return _process_by_estimated_capacity(data, True)
-        elif (category == BedsFilter.TOP_COUNTRIES_AVG_SCALE.value):
-            return _process_by_average_scale_capacity(data)
-        elif (category == BedsFilter.BOTTOM_COUNTRIES_AVG_SCALE.value):
-            return _process_by_average_scale_capacity(data, True)
-        elif (category == BedsFilter.TOP_COUNTRIES_AVG_ESTIMATE.value):
-            return _process_by_average_estimated_capacity(data)
-        elif (category == BedsFilter.BOTTOM_COUNTRIES_AVG_ESTIMATE.value):
-            return _process_by_average_estimated_capacity(data, True)
+
+def _serialize_parallel(data, countries):
+    """
+    Returns the JSON strings of the general and types data of the input
+    countries (following their order), packed by a pool of worker processes
+    """
+    country_aggregates = _get_country_aggregates(data)
+    shards = [[rows, shard_countries,
+               country_aggregates.loc[shard_countries]]
+              for rows, shard_countries in parallel.get_shards(
+                                               data, 'country', countries,
+                                               settings.workers)]
+    fragments = parallel.map_shards(_serialize_shard, shards,
+                                    settings.workers)
+
+    return [serializer.join_items([general for general, types in fragments]),
+            serializer.join_items([types for general, types in fragments])]
+
+
+def _get_filter_name(filter_option, *args, **kwargs):
+    """
+    Returns the qualified name of the input filter option (the label of its
+    profiling stage)
+    """
+    return str(BedsFilter(filter_option))
+
+
+@profiling.instrumented('filter', label = _get_filter_name)
+def get_serialized_filter(filter_option, sampling = False, data = None):
+    """
+    Filters the dataset by the input filter option and returns a list with
+    the [export name, serialized data] pair of each output. If several
+    workers are set, the records of the countries are packed in parallel
+    """
+    if (settings.workers > 1 and
+        (filter_option == BedsFilter.NUMBER_PERCENT_COUNTRY_NORMAL.value or
+         filter_option in BEDS_RANKINGS)):
+        if (data is None):
+            data = load_beds_dataset(sampling,
+                                     BEDS_FILTER_PROJECTIONS[filter_option])
+
+        if (filter_option == BedsFilter.NUMBER_PERCENT_COUNTRY_NORMAL.value):
+            selections = [[BedsFilter(filter_option).name,
+                           sorted(data['country'].unique())]]
         else:
-            return _process_general_statistics(data)
+            selections = _get_ranked_countries(data, filter_option)
+
+        return [[name, _serialize_parallel(data, countries)]
+                for name, countries in selections]
+
+    return [[name, _serialize_records(records, filter_option)]
+            for name, records in _filter_beds(filter_option, sampling, data)]
+
+
+def _get_result_key(filter_option, sampling = False):
+    """
+    Returns the key of the cached results of the input filter option
+    """
+    name = 'beds_sample' if sampling else 'beds'
+
+    try:
+        return cache.get_result_key(BedsFilter.DATA_FILENAME.value, name,
+                                    filter_option, sampling)
     except FileNotFoundError:
         print(f'The file "{BedsFilter.DATA_FILENAME.value}" does not exist')
         sys.exit('No file, no execution... Stopping!')
 
 
+def _write_exports(exports, key):
+    """
+    Writes the JSON files of the input serialized exports and stores them as
+    the cached results with the input key
+    """
+    for name, api_data in exports:
+        write_beds_data(api_data[0], api_data[1], name)
+
+    cache.store_result(key, [[name, get_beds_filenames(name)]
+                             for name, api_data in exports])
+
+
+def _read_exports(cached_exports):
+    """
+    Returns the serialized exports of the input cached [export name, file
+    names] pairs, reading them from their files
+    """
+    return [[name, read_files(filenames)]
+            for name, filenames in cached_exports]
+
+
+def _print_cache_hit(filter_option):
+    """
+    Informs that the cached results of the input filter option are up to date
+    """
+    print(f'Results cache hit for {BedsFilter(filter_option).name}, its '
+          'files are up to date')
+
+
+def _send_exports(exports):
+    """
+    Sends the serialized data of the input exports to the backend's API
+    """
+    import api
+
+    for name, api_data in exports:
+        api.send_data(api_data, api.BEDS_URL)
+
+
 def load_bed_records(filter_option, cli_mode = False, sampling = False,
                      send_request = False):
     """
@@ -252,26 +666,66 @@ def load_bed_records(filter_option, cli_mode = False, sampling = False,
     If CLI mode is enabled, the user will be prompted to choose whether a
     request will be sent to the API; otherwise, the sending must be specified
     through the send_request parameter
+    If the cached results of the filter are up to date, the filter is not
+    computed and its files are not rewritten
     """
-    records = _filter_beds(filter_option, sampling)
-
-    general_json_list = records[0].to_json() \
-        if (filter_option == BedsFilter.GENERAL_STATISTICS.value) \
-        else [r.to_json() for r in records[0]]
+    key = _get_result_key(filter_option, sampling)
+    cached_exports = cache.get_result(key)
 
-    types_json_list = [r.to_json() for r in records[1]]
-
-    general_data = json.dumps(general_json_list, indent = 4)
-    types_data = json.dumps(types_json_list, indent = 4)
-
-    api_data = [general_data, types_data]
-
-    write_beds_data(general_data, types_data, filter_option)
+    if (cached_exports is not None):
+        _print_cache_hit(filter_option)
+        send = lambda: _send_exports(_read_exports(cached_exports))
+    else:
+        exports = get_serialized_filter(filter_option, sampling)
+        _write_exports(exports, key)
+        send = lambda: _send_exports(exports)
 
     if (cli_mode):
         user_input = prompt_user(3)
 
         if (user_input.lower() == 'yes'):
-            api.send_data(api_data, api.BEDS_URL)
+            send()
     elif (send_request):
-        api.send_data(api_data, api.BEDS_URL)
\ No newline at end of file
+        send()
+
+
+def load_bed_batch(filter_options, sampling = False, send_request = False):
+    """
+    Retrieves the bed records of several filters from a single load of the
+    dataset, computing the filters concurrently, and then writes all of their
+    JSON files (and sends them to the backend's API if specified). The filters
+    whose cached results are up to date are skipped, and the dataset is only
+    loaded if any filter must be computed
+    """
+    keys = [_get_result_key(option, sampling) for option in filter_options]
+    cached_results = [cache.get_result(key) for key in keys]
+    missing = [[option, key] for option, key, cached_exports
+               in zip(filter_options, keys, cached_results)
+               if cached_exports is None]
+    exports = []
+
+    for option, cached_exports in zip(filter_options, cached_results):
+        if (cached_exports is not None):
+            _print_cache_hit(option)
+
+    if (missing):
+        projection = get_projection(BEDS_PROJECTIONS, BEDS_FILTER_PROJECTIONS,
+                                    [option for option, key in missing])
+        data = load_beds_dataset(sampling, projection)
+
+        with ThreadPoolExecutor() as executor:
+            results = list(executor.map(
+                               lambda missing_option: get_serialized_filter(
+                                   missing_option[0], data = data),
+                               missing))
+
+        for (option, key), filter_exports in zip(missing, results):
+            _write_exports(filter_exports, key)
+            exports.extend(filter_exports)
+
+    if (send_request):
+        for cached_exports in cached_results:
+            if (cached_exports is not None):
+                exports.extend(_read_exports(cached_exports))
+
+        _send_exports(exports)
@@ -0,0 +1,401 @@
+"""
+This module runs the benchmark suite of both pipelines. For every chosen
+scale, synthetic datasets are generated in a temporary workspace and every
+filter is timed end to end (as a separate execution of the application,
+whose peak memory is measured as well) and per stage (read, transform,
+filter, serialize and write). The measurements are saved as JSON, and can be
+compared against the ones of a previous run to flag regressions
+"""
+
+import os
+import io
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import beds
+import settings
+import measures as msrs
+import numpy as np
+import pandas as pd
+from schemas import read_dataset
+from synthetic import generate_dataset
+from file_export import write_beds_data, write_measures_data
+from constants import (BedsFilter, MeasuresFilter, BED_FILTERS,
+                       MEASURE_FILTERS, BENCHMARK_ROWS, BENCHMARK_REPEAT,
+                       BENCHMARK_THRESHOLD, BENCHMARK_MIN_DELTA,
+                       BENCHMARK_FILENAME, BEDS_SCHEMA, MEASURES_SCHEMA)
+
+APPLICATION_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Runs the application given the path of its main module, the file where its
+# peak memory is written and its arguments. The peak is read from the memory
+# high-water mark of the process (only reported by Linux), since the one of
+# the resource usage of a child includes the memory of its parent
+APPLICATION_RUNNER = """
+import os, sys, runpy
+main_filename, memory_filename = sys.argv[1:3]
+sys.argv = [main_filename] + sys.argv[3:]
+sys.path.insert(0, os.path.dirname(main_filename))
+try:
+    runpy.run_path(main_filename, run_name = '__main__')
+finally:
+    try:
+        with open('/proc/self/status') as status_file:
+            peaks = [line.split()[1] for line in status_file
+                     if line.startswith('VmHWM:')]
+        with open(memory_filename, 'w') as memory_file:
+            memory_file.write(peaks[0])
+    except (OSError, IndexError):
+        pass
+"""
+
+
+class Pipeline:
+    """
+    This class holds the dataset option, filters, CSV schema and stage
+    functions of the processing of a dataset, so that each stage is timed
+    separately
+    """
+    def __init__(self, option, filter_enum, filters_count, schema, transform,
+                 process, serialize, write):
+        self.option = option
+        self.filter_enum = filter_enum
+        self.schema = schema
+        self.filter_options = range(1, filters_count + 1)
+        self.transform = transform
+        self.process = process
+        self.serialize = serialize
+        self.write = write
+
+
+PIPELINES = {
+    'beds': Pipeline(1, BedsFilter, len(BED_FILTERS), BEDS_SCHEMA,
+                     beds._transform_beds_dataset, beds._filter_beds,
+                     beds._serialize_records,
+                     lambda name, api_data: write_beds_data(*api_data,
+                                                            name)),
+    'measures': Pipeline(2, MeasuresFilter, len(MEASURE_FILTERS),
+                         MEASURES_SCHEMA, msrs._transform_measures_dataset,
+                         msrs._filter_measures, msrs._serialize_records,
+                         lambda name, api_data: write_measures_data(
+                                                    name, *api_data))
+}
+
+
+def _time_call(function, *args, **kwargs):
+    """
+    Calls the input function and returns a list with its result and the
+    seconds it took
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+
+    return [result, time.perf_counter() - start]
+
+
+def _run_application(arguments, workspace):
+    """
+    Runs the application with the input arguments on the workspace and
+    returns a list with the seconds it took and its peak memory in megabytes
+    (None if the platform does not report it)
+    """
+    log_filename = os.path.join(workspace, 'stderr.log')
+    memory_filename = os.path.join(workspace, 'memory.txt')
+    main_filename = os.path.join(APPLICATION_DIRECTORY, 'main.py')
+
+    if (os.path.exists(memory_filename)):
+        os.remove(memory_filename)
+
+    with open(log_filename, 'w') as log_file:
+        process, seconds = _time_call(subprocess.run,
+                                      [sys.executable, '-c',
+                                       APPLICATION_RUNNER, main_filename,
+                                       memory_filename] + arguments,
+                                      cwd = workspace,
+                                      stdout = subprocess.DEVNULL,
+                                      stderr = log_file)
+
+    if (process.returncode != 0):
+        with open(log_filename) as log_file:
+            raise RuntimeError(f'The application failed with the arguments '
+                               f'{arguments}:\n{log_file.read()}')
+
+    try:
+        with open(memory_filename) as memory_file:
+            return [seconds, int(memory_file.read()) / 1024]
+    except (OSError, ValueError):
+        return [seconds, None]
+
+
+def _prepare_workspace(workspace, rows, seed):
+    """
+    Creates the folders of the application on the workspace and generates
+    its synthetic datasets with the input number of rows
+    """
+    for folder in ['data', 'cache', os.path.join('export', 'beds'),
+                   os.path.join('export', 'measures')]:
+        os.makedirs(os.path.join(workspace, folder), exist_ok = True)
+
+    generate_dataset('beds', rows,
+                     os.path.join(workspace, BedsFilter.DATA_FILENAME.value),
+                     seed)
+    generate_dataset('measures', rows,
+                     os.path.join(workspace,
+                                  MeasuresFilter.DATA_FILENAME.value),
+                     seed)
+
+
+def _add_measurement(measurements, key, values, unit = 'seconds'):
+    """
+    Adds the best (lowest) of the input values to the measurements, unless
+    they are missing
+    """
+    values = [value for value in values if value is not None]
+
+    if (values):
+        measurements[key] = {'value': round(min(values), 6), 'unit': unit}
+
+
+def _benchmark_stages(pipeline, prefix, repeat, measurements):
+    """
+    Times the stages of every filter of a pipeline in this process, on the
+    current directory, and adds their best times to the measurements
+    """
+    filename = pipeline.filter_enum.DATA_FILENAME.value
+    read_times, transform_times = [], []
+
+    for _ in range(repeat):
+        data, seconds = _time_call(read_dataset, filename, pipeline.schema)
+        read_times.append(seconds)
+        transform_times.append(_time_call(pipeline.transform, data)[1])
+
+    _add_measurement(measurements, f'{prefix}/read', read_times)
+    _add_measurement(measurements, f'{prefix}/transform', transform_times)
+
+    for filter_option in pipeline.filter_options:
+        filter_prefix = f'{prefix}/{pipeline.filter_enum(filter_option).name}'
+        stage_times = {'filter': [], 'serialize': [], 'write': []}
+
+        for _ in range(repeat):
+            exports, seconds = _time_call(pipeline.process, filter_option,
+                                          data = data)
+            stage_times['filter'].append(seconds)
+            serialize_seconds = write_seconds = 0.0
+
+            for name, records in exports:
+                api_data, seconds = _time_call(pipeline.serialize, records,
+                                               filter_option)
+                serialize_seconds += seconds
+                write_seconds += _time_call(pipeline.write, name,
+                                            api_data)[1]
+
+            stage_times['serialize'].append(serialize_seconds)
+            stage_times['write'].append(write_seconds)
+
+        for stage, times in stage_times.items():
+            _add_measurement(measurements, f'{filter_prefix}/{stage}', times)
+
+
+def _benchmark_application(pipeline, prefix, repeat, workspace,
+                           measurements):
+    """
+    Runs every filter of a pipeline as a separate execution of the
+    application without the caches, and adds their best times and peak
+    memory to the measurements
+    """
+    for filter_option in pipeline.filter_options:
+        filter_prefix = f'{prefix}/{pipeline.filter_enum(filter_option).name}'
+        runs = [_run_application([str(pipeline.option), str(filter_option),
+                                  '--no-cache'], workspace)
+                for _ in range(repeat)]
+
+        _add_measurement(measurements, f'{filter_prefix}/end_to_end',
+                         [seconds for seconds, megabytes in runs])
+        _add_measurement(measurements, f'{filter_prefix}/peak_memory',
+                         [megabytes for seconds, megabytes in runs],
+                         'megabytes')
+
+
+def _get_git_commit():
+    """
+    Returns the commit of the application code, or None if it is unknown
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd = APPLICATION_DIRECTORY,
+                              capture_output = True, text = True,
+                              check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(rows_list, datasets, repeat = BENCHMARK_REPEAT, seed = 0):
+    """
+    Runs the benchmark suite of the input datasets at every number of rows
+    of the list and returns its results: the description of the environment,
+    the suite settings and the measurements by key (dataset/rows/stage or
+    dataset/rows/filter/stage)
+    """
+    measurements = {}
+    settings.use_cache = False
+    current_directory = os.getcwd()
+
+    for rows in rows_list:
+        with tempfile.TemporaryDirectory(prefix = 'benchmark_') as workspace:
+            print(f'Generating the synthetic datasets with {rows} rows')
+            _prepare_workspace(workspace, rows, seed)
+
+            for dataset in datasets:
+                pipeline = PIPELINES[dataset]
+                prefix = f'{dataset}/{rows}'
+                print(f'Benchmarking the {dataset} filters with {rows} rows')
+
+                try:
+                    os.chdir(workspace)
+
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        _benchmark_stages(pipeline, prefix, repeat,
+                                          measurements)
+                finally:
+                    os.chdir(current_directory)
+
+                _benchmark_application(pipeline, prefix, repeat, workspace,
+                                       measurements)
+
+    return {
+        'environment': {
+            'commit': _get_git_commit(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__
+        },
+        'suite': {'rows': rows_list, 'datasets': datasets, 'repeat': repeat,
+                  'seed': seed},
+        'measurements': measurements
+    }
+
+
+def compare_results(results, baseline, threshold = BENCHMARK_THRESHOLD):
+    """
+    Compares the measurements of the results with the ones of a baseline run
+    and returns the list of [key, baseline value, value, unit] of the ones
+    that regressed: they grew more than the threshold ratio and more than the
+    minimum delta of their unit, which filters out the timer noise
+    """
+    regressions = []
+
+    for key, measurement in results['measurements'].items():
+        previous = baseline['measurements'].get(key)
+
+        if (previous is None or previous['unit'] != measurement['unit']):
+            continue
+
+        unit = measurement['unit']
+        delta = measurement['value'] - previous['value']
+
+        if (delta > BENCHMARK_MIN_DELTA[unit] and
+            delta > threshold * previous['value']):
+            regressions.append([key, previous['value'], measurement['value'],
+                                unit])
+
+    return regressions
+
+
+def print_results(results, baseline = None):
+    """
+    Prints the measurements of the results, with their change from the
+    baseline run if given
+    """
+    print()
+
+    for key, measurement in results['measurements'].items():
+        value = measurement['value']
+        line = f'    {key:<64}{value:>12.4f} {measurement["unit"]}'
+        previous = baseline and baseline['measurements'].get(key)
+
+        if (previous and previous['value'] > 0):
+            change = 100 * (value / previous['value'] - 1)
+            line += f' ({change:+.1f}%)'
+        elif (previous):
+            line += ' (was 0)'
+
+        print(line)
+
+    print()
+
+
+def parse_arguments():
+    """
+    Parses the execution arguments of the benchmark suite
+    """
+    parser = argparse.ArgumentParser(
+        description = 'Benchmarks the filters of both datasets on synthetic '
+                      'data')
+    parser.add_argument('--rows', type = int, nargs = '+',
+                        default = BENCHMARK_ROWS, metavar = 'N',
+                        help = 'numbers of rows of the synthetic datasets')
+    parser.add_argument('--datasets', nargs = '+', choices = list(PIPELINES),
+                        default = list(PIPELINES),
+                        help = 'datasets whose filters are benchmarked')
+    parser.add_argument('--repeat', type = int, default = BENCHMARK_REPEAT,
+                        metavar = 'N',
+                        help = 'number of runs of every measurement (the '
+                               'best one is kept)')
+    parser.add_argument('--seed', type = int, default = 0,
+                        help = 'seed of the synthetic datasets')
+    parser.add_argument('--output', default = BENCHMARK_FILENAME,
+                        metavar = 'FILE',
+                        help = 'JSON file where the results are saved')
+    parser.add_argument('--baseline', metavar = 'FILE',
+                        help = 'JSON results of a previous run to compare '
+                               'with')
+    parser.add_argument('--threshold', type = float,
+                        default = BENCHMARK_THRESHOLD, metavar = 'RATIO',
+                        help = 'relative growth from the baseline that is '
+                               'flagged as a regression')
+    arguments = parser.parse_args()
+
+    if (min(arguments.rows) < 1 or arguments.repeat < 1):
+        parser.error('the numbers of rows and runs must be positive')
+    if (arguments.threshold < 0 or math.isnan(arguments.threshold)):
+        parser.error('the regression threshold cannot be negative')
+
+    return arguments
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    baseline = None
+
+    if (arguments.baseline):
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = run_suite(arguments.rows, arguments.datasets, arguments.repeat,
+                        arguments.seed)
+    print_results(results, baseline)
+
+    with open(arguments.output, 'w') as output_file:
+        json.dump(results, output_file, indent = 4)
+
+    print(f'Saved the results on {arguments.output}')
+
+    if (baseline is not None):
+        regressions = compare_results(results, baseline, arguments.threshold)
+
+        for key, previous, value, unit in regressions:
+            print(f'REGRESSION {key}: {previous:.4f} -> {value:.4f} {unit}')
+
+        if (regressions):
+            sys.exit(1)
+
+        print('No regressions against the baseline')
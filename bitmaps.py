@@ -0,0 +1,150 @@
+"""
+This module contains the compressed bitmaps of the inverted indexes, which
+are sets of row ids below a number of rows. A sparse set is kept as its
+sorted array of ids and a dense one as its bits packed in bytes, whichever
+is smaller, so that the rare keywords take little memory and the frequent
+ones are combined eight rows at a time. The set operations pick the
+cheapest combination of both representations
+"""
+
+import numpy as np
+
+# Bytes of a row id in the sparse representation
+_ID_BYTES = 4
+
+
+def _get_packed_size(size):
+    """
+    Returns the number of bytes of the packed bits of a bitmap of size rows
+    """
+    return (size + 7) // 8
+
+
+def _contains(bits, ids):
+    """
+    Returns the boolean array that tells which of the input ids are set in
+    the packed bits
+    """
+    return ((bits[ids >> 3] >> (7 - (ids & 7))) & 1).astype(bool)
+
+
+class Bitmap:
+    """
+    This class is a set of row ids below its size, stored either as a sorted
+    array of ids or as packed bits (only one of them is set)
+    """
+    __slots__ = ('size', '_ids', '_bits')
+
+    def __init__(self, size, ids = None, bits = None):
+        self.size = size
+        self._ids = ids
+        self._bits = bits
+
+
+    @classmethod
+    def from_ids(cls, size, ids):
+        """
+        Returns the bitmap of the input sorted and unique row ids, in its
+        smallest representation
+        """
+        ids = np.asarray(ids, dtype = np.uint32)
+
+        bitmap = cls(size, ids = ids)
+
+        if (len(ids) * _ID_BYTES <= _get_packed_size(size)):
+            return bitmap
+
+        return cls(size, bits = bitmap.to_bits())
+
+
+    @classmethod
+    def full(cls, size):
+        """
+        Returns the bitmap with all the row ids below the size
+        """
+        return cls(size, bits = np.packbits(np.ones(size, dtype = bool)))
+
+
+    def __len__(self):
+        if (self._ids is not None):
+            return len(self._ids)
+
+        return int(np.unpackbits(self._bits, count = self.size).sum())
+
+
+    def is_sparse(self):
+        """
+        Checks whether the bitmap is stored as an array of ids
+        """
+        return self._ids is not None
+
+
+    def to_ids(self):
+        """
+        Returns the sorted array of the row ids of the bitmap
+        """
+        if (self._ids is not None):
+            return self._ids
+
+        return np.flatnonzero(np.unpackbits(self._bits, count = self.size)) \
+                 .astype(np.uint32)
+
+
+    def to_bits(self):
+        """
+        Returns the packed bits of the bitmap
+        """
+        if (self._bits is not None):
+            return self._bits
+
+        present = np.zeros(self.size, dtype = bool)
+        present[self._ids] = True
+
+        return np.packbits(present)
+
+
+    def _compact(self):
+        """
+        Returns the bitmap in its smallest representation
+        """
+        if (self._bits is None):
+            return self
+
+        return Bitmap.from_ids(self.size, self.to_ids())
+
+
+    def __and__(self, other):
+        if (self.is_sparse() and other.is_sparse()):
+            return Bitmap(self.size, ids = np.intersect1d(self._ids,
+                                                          other._ids,
+                                                          assume_unique =
+                                                          True))
+        elif (self.is_sparse()):
+            return Bitmap(self.size,
+                          ids = self._ids[_contains(other._bits,
+                                                    self._ids)])
+        elif (other.is_sparse()):
+            return other & self
+
+        return Bitmap(self.size, bits = self._bits & other._bits)._compact()
+
+
+    def __or__(self, other):
+        if (self.is_sparse() and other.is_sparse()):
+            return Bitmap.from_ids(self.size, np.union1d(self._ids,
+                                                         other._ids))
+
+        return Bitmap(self.size, bits = self.to_bits() | other.to_bits())
+
+
+    def __sub__(self, other):
+        if (self.is_sparse() and other.is_sparse()):
+            return Bitmap(self.size, ids = np.setdiff1d(self._ids, other._ids,
+                                                        assume_unique = True))
+        elif (self.is_sparse()):
+            return Bitmap(self.size,
+                          ids = self._ids[~_contains(other._bits,
+                                                     self._ids)])
+
+        return Bitmap(self.size,
+                      bits = self._bits & ~other.to_bits())._compact()
@@ -0,0 +1,354 @@
+"""
+This module handles the on-disk caches of the application:
+- The transformed datasets, as columnar snapshots, so that the CSV parsing
+and transformation steps are skipped while the source files and the code do
+not change
+- The filter results, so that unchanged filters are neither recomputed nor
+rewritten
+- The incremental states, from which new releases of a source file are
+applied row by row
+"""
+
+import os
+import json
+import glob
+import pickle
+import hashlib
+import settings
+import serializer
+from constants import (CACHE_DIRECTORY, CACHE_VERSION, HASHES_FILENAME,
+                       RESULTS_DIRECTORY, RESULTS_CACHE_SIZE)
+
+_code_version = None
+
+
+def _get_file_hash(filename):
+    """
+    Returns the SHA-256 hex digest of the contents of the input file
+    """
+    digest = hashlib.sha256()
+
+    with open(filename, 'rb') as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _write_json(filename, content):
+    """
+    Writes the input content on a JSON file of the cache, creating its
+    directory if needed
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok = True)
+
+    with open(filename, 'w') as json_file:
+        json.dump(content, json_file)
+
+
+def get_source_hash(source_filename):
+    """
+    Returns the SHA-256 hex digest of the contents of a source file, reusing
+    the stored one while the size and modification time of the file do not
+    change
+    """
+    source_stat = os.stat(source_filename)
+    signature = [source_stat.st_size, source_stat.st_mtime_ns]
+    hashes_filename = os.path.join(CACHE_DIRECTORY, HASHES_FILENAME)
+    hashes = (settings.use_cache and _read_metadata(hashes_filename)) or {}
+    stored = hashes.get(source_filename)
+
+    if (stored and stored[:2] == signature):
+        return stored[2]
+
+    digest = _get_file_hash(source_filename)
+    hashes[source_filename] = signature + [digest]
+
+    if (settings.use_cache):
+        try:
+            _write_json(hashes_filename, hashes)
+        except OSError:
+            pass
+
+    return digest
+
+
+def get_code_version():
+    """
+    Returns a digest of the source code of the application modules, which
+    identifies the code that produced a result
+    """
+    global _code_version
+
+    if (_code_version is None):
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+
+        for filename in sorted(glob.glob(os.path.join(directory, '*.py'))):
+            digest.update(os.path.basename(filename).encode())
+            digest.update(_get_file_hash(filename).encode())
+
+        _code_version = digest.hexdigest()
+
+    return _code_version
+
+
+def _get_paths(name):
+    """
+    Returns the paths of the snapshot and metadata files for a cache entry
+    """
+    snapshot_filename = os.path.join(CACHE_DIRECTORY, f'{name}.npz')
+    metadata_filename = os.path.join(CACHE_DIRECTORY, f'{name}.json')
+    return [snapshot_filename, metadata_filename]
+
+
+def _read_metadata(metadata_filename):
+    """
+    Returns the stored metadata of a cache entry, or None if it is missing or
+    unreadable
+    """
+    try:
+        with open(metadata_filename) as metadata_file:
+            return json.load(metadata_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_valid(metadata, source_stat, source_filename):
+    """
+    Checks whether the stored metadata matches the current source file and
+    the current code. The size and modification time are compared first;
+    when the latter differs, the content hash decides (e.g. the file was
+    touched but not changed)
+    """
+    if (not metadata or
+        metadata.get('version') != [CACHE_VERSION, get_code_version()]):
+        return False
+    if (metadata['size'] != source_stat.st_size):
+        return False
+    if (metadata['mtime'] == source_stat.st_mtime_ns):
+        return True
+    return metadata['sha256'] == get_source_hash(source_filename)
+
+
+def _write_metadata(source_stat, source_filename, name):
+    """
+    Writes the metadata that identifies the source file of a cache entry
+    """
+    metadata_filename = _get_paths(name)[1]
+    metadata = {
+        'version': [CACHE_VERSION, get_code_version()],
+        'source': source_filename,
+        'size': source_stat.st_size,
+        'mtime': source_stat.st_mtime_ns,
+        'sha256': get_source_hash(source_filename)
+    }
+
+    _write_json(metadata_filename, metadata)
+
+
+def _store(data, source_stat, source_filename, name):
+    """
+    Writes the columnar snapshot of the transformed dataset and its metadata
+    """
+    from snapshots import write_snapshot
+
+    snapshot_filename = _get_paths(name)[0]
+
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok = True)
+        write_snapshot(data, snapshot_filename)
+        _write_metadata(source_stat, source_filename, name)
+    except (OSError, TypeError) as e:
+        print(f'Could not write the cache entry "{name}"!')
+        print(e)
+
+
+def load_dataset(source_filename, name, build):
+    """
+    Returns the transformed dataset for the source file. If the cache is
+    enabled and holds a valid snapshot under the entry name (stored from the
+    same source file by the same code), it is loaded instead of calling the
+    build function (which must read and transform the source file);
+    otherwise the dataset is built and the snapshot is refreshed
+    """
+    source_stat = os.stat(source_filename)
+
+    if (not settings.use_cache):
+        return build()
+
+    snapshot_filename, metadata_filename = _get_paths(name)
+    metadata = _read_metadata(metadata_filename)
+
+    if (_is_valid(metadata, source_stat, source_filename)):
+        from snapshots import read_snapshot
+
+        try:
+            data = read_snapshot(snapshot_filename)
+            print(f'Cache hit for "{name}"')
+
+            if (metadata['mtime'] != source_stat.st_mtime_ns):
+                _write_metadata(source_stat, source_filename, name)
+
+            return data
+        except Exception:
+            pass
+
+    print(f'Cache miss for "{name}", rebuilding it')
+    data = build()
+    _store(data, source_stat, source_filename, name)
+
+    return data
+
+
+def load_state(name):
+    """
+    Returns the stored incremental state with the input name, or None if the
+    cache is disabled, the refresh is forced, or the state is missing or was
+    stored by another version of the code
+    """
+    if (not settings.use_cache or settings.force):
+        return None
+
+    try:
+        with open(os.path.join(CACHE_DIRECTORY, f'{name}_state.pkl'),
+                  'rb') as state_file:
+            state = pickle.load(state_file)
+    except Exception:
+        return None
+
+    if (state.get('version') != [CACHE_VERSION, get_code_version()]):
+        return None
+
+    return state
+
+
+def store_state(name, state):
+    """
+    Writes the input incremental state under its name, tagged with the
+    version of the cache and of the code
+    """
+    if (not settings.use_cache):
+        return
+
+    state['version'] = [CACHE_VERSION, get_code_version()]
+
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok = True)
+
+        with open(os.path.join(CACHE_DIRECTORY, f'{name}_state.pkl'),
+                  'wb') as state_file:
+            pickle.dump(state, state_file)
+    except OSError as e:
+        print(f'Could not write the incremental state "{name}"!')
+        print(e)
+
+
+def get_result_key(source_filename, name, filter_option, sampling = False):
+    """
+    Returns the key of the results of a filter, which identifies the contents
+    of the source file, the dataset entry name, the filter option, the
+    sampling flag, the ranking, spatial, date, keyword, export, output format
+    and chunking settings and the code version
+    """
+    parts = [get_source_hash(source_filename), name, filter_option,
+             sampling, settings.ranking_count, settings.ranking_metric,
+             settings.ranking_direction, settings.spatial_points,
+             settings.spatial_radius, settings.spatial_count,
+             settings.active_date, settings.active_range,
+             settings.country_codes, settings.keyword_query,
+             settings.streaming, settings.ndjson,
+             serializer.get_format(), settings.chunk_size, get_code_version()]
+
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def get_file_signature(filename):
+    """
+    Returns the size and modification time of a file, or None if it does
+    not exist
+    """
+    try:
+        file_stat = os.stat(filename)
+        return [file_stat.st_size, file_stat.st_mtime_ns]
+    except OSError:
+        return None
+
+
+def get_result(key):
+    """
+    Returns the list of [export name, file names] pairs of the cached results
+    with the input key, or None if the cache is disabled, there are none, or
+    any of their files is missing or was changed after it was written
+    """
+    if (not settings.use_cache or settings.force):
+        return None
+
+    result_filename = os.path.join(RESULTS_DIRECTORY, f'{key}.json')
+    result = _read_metadata(result_filename)
+
+    if (not result):
+        return None
+
+    try:
+        for filename, signature in result['files'].items():
+            if (get_file_signature(filename) != signature):
+                os.remove(result_filename)
+                return None
+
+        os.utime(result_filename)
+    except OSError:
+        return None
+
+    return result['exports']
+
+
+def _evict_results():
+    """
+    Deletes the least recently used results entries beyond the
+    RESULTS_CACHE_SIZE constant
+    """
+    entries = sorted(glob.glob(os.path.join(RESULTS_DIRECTORY, '*.json')),
+                     key = os.path.getmtime, reverse = True)
+
+    for filename in entries[RESULTS_CACHE_SIZE:]:
+        os.remove(filename)
+
+
+def store_result(key, exports):
+    """
+    Stores the results entry with the input key, given the list of its
+    [export name, file names] pairs, whose files must already be written
+    """
+    if (not settings.use_cache):
+        return
+
+    files = {filename: get_file_signature(filename)
+             for name, filenames in exports for filename in filenames}
+    result = {'exports': exports, 'files': files}
+
+    if (None in files.values()):
+        return
+
+    try:
+        _write_json(os.path.join(RESULTS_DIRECTORY, f'{key}.json'), result)
+        _evict_results()
+    except OSError as e:
+        print('Could not write the results cache entry!')
+        print(e)
+
+
+def clear():
+    """
+    Deletes every cache entry and returns the number of removed files
+    """
+    removed = 0
+
+    for directory in [CACHE_DIRECTORY, RESULTS_DIRECTORY]:
+        if (os.path.isdir(directory)):
+            for filename in os.listdir(directory):
+                if (filename.endswith(('.npz', '.pkl', '.json'))):
+                    os.remove(os.path.join(directory, filename))
+                    removed += 1
+
+    return removed
@@ -2,15 +2,53 @@
 This module includes common functions used by different modules
 """
 
+import os
+import weakref
+import threading
+import settings
 from constants import MENU, BED_FILTERS, MEASURE_FILTERS
 
+# Structures derived from every loaded dataset, by the identity of the dataset
+_derived = {}
+_derived_lock = threading.RLock()
+
+# Locks held while a derived structure is built, by the identity of the
+# dataset and the name of the structure
+_build_locks = {}
+
+
+def _reset_derived_lock():
+    """
+    Replaces the locks of the derived structures in a forked process, where
+    they could have been copied while another thread of the parent held them
+    """
+    global _derived_lock, _build_locks
+    _derived_lock = threading.RLock()
+    _build_locks = {}
+
+
+if (hasattr(os, 'register_at_fork')):
+    os.register_at_fork(after_in_child = _reset_derived_lock)
+
+
+def get_filter_names(filters):
+    """
+    Returns the names of the input filters (BED_FILTERS or MEASURE_FILTERS),
+    with the number of countries of the rankings and the radius and number
+    of countries of the spatial filters chosen in the settings
+    """
+    return [name.format(count = settings.ranking_count,
+                        radius = settings.spatial_radius,
+                        nearest = settings.spatial_count)
+            for name in filters]
+
 
 def _print_filters(filters):
     """
     Prints the filters as menu options on the CLI
     """
     count = 1
-    for f in filters:
+    for f in get_filter_names(filters):
         print(f'    ({count}) {f}')
         count += 1
     print('    (0) Go back\n')
@@ -25,4 +63,71 @@ def prompt_user(message_index):
         _print_filters(BED_FILTERS)
     elif (message_index == 2):
         _print_filters(MEASURE_FILTERS)
-    return input()
\ No newline at end of file
+    return input()
+
+
+def _get_derived_entries(data):
+    """
+    Returns the dictionary of the structures derived from a loaded dataset,
+    which is dropped when the dataset is garbage collected
+    Precondition: the lock of the derived structures is held
+    """
+    key = id(data)
+
+    if (key not in _derived):
+        _derived[key] = {}
+        weakref.finalize(data, _drop_derived_entries, key)
+
+    return _derived[key]
+
+
+def _drop_derived_entries(key):
+    """
+    Drops the structures derived from a garbage collected dataset, and the
+    locks used to build them
+    """
+    with _derived_lock:
+        _derived.pop(key, None)
+
+        for build_key in [k for k in _build_locks if k[0] == key]:
+            del _build_locks[build_key]
+
+
+def get_derived(data, name, build = None):
+    """
+    Returns the structure with the input name derived from a loaded dataset
+    (an index or an aggregate table), which is built with the build function
+    the first time (or None if it was not set and there is no function). The
+    structures are kept apart from the dataset, instead of in its
+    attributes, since pandas copies the attributes into every frame derived
+    from it. The structures are built without holding the lock of the
+    other structures, so that the threads which look up or build other
+    structures (or the same ones of other datasets) do not wait for them;
+    the threads which need the same structure wait for its first build
+    """
+    with _derived_lock:
+        entries = _get_derived_entries(data)
+
+        if (name in entries or build is None):
+            return entries.get(name)
+
+        build_lock = _build_locks.setdefault((id(data), name),
+                                             threading.RLock())
+
+    with build_lock:
+        with _derived_lock:
+            if (name in entries):
+                return entries[name]
+
+        value = build()
+
+        with _derived_lock:
+            return entries.setdefault(name, value)
+
+
+def set_derived(data, name, value):
+    """
+    Sets the structure with the input name derived from a loaded dataset
+    """
+    with _derived_lock:
+        _get_derived_entries(data)[name] = value
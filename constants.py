@@ -20,6 +20,8 @@ class BedsFilter(Enum):
     TOP_COUNTRIES_AVG_ESTIMATE = 8
     BOTTOM_COUNTRIES_AVG_ESTIMATE = 9
     GENERAL_STATISTICS = 10
+    COUNTRIES_WITHIN_RADIUS = 11
+    NEAREST_COUNTRIES = 12
     DATA_FILENAME = './data/hospital_beds.csv'
     EXPORT_FILENAME = './export/beds/#.json'
     SAMPLE_RECORDS = 24
@@ -37,6 +39,10 @@ class MeasuresFilter(Enum):
     TOP_COUNTRIES_RECORDS_COUNT = 4
     BOTTOM_COUNTRIES_RECORDS_COUNT = 5
     GENERAL_STATISTICS = 6
+    ACTIVE_MEASURES_ON_DATE = 7
+    DAILY_ACTIVE_MEASURES = 8
+    KEYWORD_QUERY_MEASURES = 9
+    KEYWORD_QUERY_COUNTS = 10
     ## TODO: Add more filter options
     DATA_FILENAME = './data/measures.csv'
     EXPORT_FILENAME = './export/measures/#.json'
@@ -44,25 +50,81 @@ class MeasuresFilter(Enum):
 
 
 TOP_N = 10
+SPATIAL_RADIUS = 1000
+SPATIAL_COUNT = 5
+KEYWORD_QUERY = '(school closure OR university closure) AND NOT remote ' \
+                'schooling'
 BED_FILTERS = [
     'Number and percentage of beds per type, by country (scale)',
-    f'Top {TOP_N} countries with highest bed capacity (scale)',
-    f'Top {TOP_N} countries with lowest bed capacity (scale)',
-    f'Top {TOP_N} countries with highest bed capacity (estimated)',
-    f'Top {TOP_N} countries with lowest bed capacity (estimated)',
-    f'Top {TOP_N} countries with highest average bed capacity (scale)',
-    f'Top {TOP_N} countries with lowest average bed capacity (scale)',
-    f'Top {TOP_N} countries with highest average bed capacity (estimated)',
-    f'Top {TOP_N} countries with lowest average bed capacity (estimated)',
-    'General dataset statistics'
+    'Top {count} countries with highest bed capacity (scale)',
+    'Top {count} countries with lowest bed capacity (scale)',
+    'Top {count} countries with highest bed capacity (estimated)',
+    'Top {count} countries with lowest bed capacity (estimated)',
+    'Top {count} countries with highest average bed capacity (scale)',
+    'Top {count} countries with lowest average bed capacity (scale)',
+    'Top {count} countries with highest average bed capacity (estimated)',
+    'Top {count} countries with lowest average bed capacity (estimated)',
+    'General dataset statistics',
+    'Countries within {radius} km of each point (or country)',
+    '{nearest} nearest countries of each point (or country), ranked by '
+    'bed capacity (scale)'
 ]
 MEASURE_FILTERS = [
     'General measures by country',
-    f'Top {TOP_N} contries with highest count of different measures',
-    f'Top {TOP_N} contries with lowest count of different measures',
-    f'Top {TOP_N} contries with highest count of measure records',
-    f'Top {TOP_N} contries with lowest count of measure records',
-    'General dataset statistics'
+    'Top {count} contries with highest count of different measures',
+    'Top {count} contries with lowest count of different measures',
+    'Top {count} contries with highest count of measure records',
+    'Top {count} contries with lowest count of measure records',
+    'General dataset statistics',
+    'Measures active on the last start date (or a chosen date), by country',
+    'Number of active measures per day, by country',
+    'Measures matching a keyword query, by country',
+    'Number of measures matching a keyword query, by country'
+]
+BEDS_METRICS = {
+    'beds_total': 'beds_total',
+    'beds_average': 'beds_average',
+    'estimated_beds_total': 'estimated_beds_total',
+    'estimated_beds_average': 'estimated_beds_average',
+    'population_average': 'population_average'
+}
+BEDS_RANKINGS = {
+    BedsFilter.TOP_COUNTRIES_SCALE.value: ['beds_total', 'top'],
+    BedsFilter.BOTTOM_COUNTRIES_SCALE.value: ['beds_total', 'bottom'],
+    BedsFilter.TOP_COUNTRIES_ESTIMATE.value: ['estimated_beds_total', 'top'],
+    BedsFilter.BOTTOM_COUNTRIES_ESTIMATE.value: ['estimated_beds_total',
+                                                 'bottom'],
+    BedsFilter.TOP_COUNTRIES_AVG_SCALE.value: ['beds_average', 'top'],
+    BedsFilter.BOTTOM_COUNTRIES_AVG_SCALE.value: ['beds_average', 'bottom'],
+    BedsFilter.TOP_COUNTRIES_AVG_ESTIMATE.value: ['estimated_beds_average',
+                                                  'top'],
+    BedsFilter.BOTTOM_COUNTRIES_AVG_ESTIMATE.value: ['estimated_beds_average',
+                                                     'bottom']
+}
+BEDS_SPATIAL_FILTERS = [
+    BedsFilter.COUNTRIES_WITHIN_RADIUS.value,
+    BedsFilter.NEAREST_COUNTRIES.value
+]
+MEASURES_METRICS = {
+    'keywords_count': 'Keywords Count',
+    'records_count': 'Records Count'
+}
+MEASURES_RANKINGS = {
+    MeasuresFilter.TOP_COUNTRIES_MEASURE_COUNT.value: ['Keywords Count',
+                                                       'top'],
+    MeasuresFilter.BOTTOM_COUNTRIES_MEASURE_COUNT.value: ['Keywords Count',
+                                                          'bottom'],
+    MeasuresFilter.TOP_COUNTRIES_RECORDS_COUNT.value: ['Records Count', 'top'],
+    MeasuresFilter.BOTTOM_COUNTRIES_RECORDS_COUNT.value: ['Records Count',
+                                                          'bottom']
+}
+MEASURES_DATE_FILTERS = [
+    MeasuresFilter.ACTIVE_MEASURES_ON_DATE.value,
+    MeasuresFilter.DAILY_ACTIVE_MEASURES.value
+]
+MEASURES_KEYWORD_FILTERS = [
+    MeasuresFilter.KEYWORD_QUERY_MEASURES.value,
+    MeasuresFilter.KEYWORD_QUERY_COUNTS.value
 ]
 MENU = [
     '''Please enter the desired option:
@@ -75,6 +137,69 @@ MENU = [
     '''\nDo you want to send the results to the API?
     Type "yes" if you want to; otherwise, hit the Enter (Return) key\n'''
 ]
+BEDS_SCHEMA = {
+    'country': 'category',
+    'state': None,
+    'county': None,
+    'lat': 'float64',
+    'lng': 'float64',
+    'type': 'category',
+    'measure': 'category',
+    'beds': 'float64',
+    'population': 'int64',
+    'year': 'int16',
+    'source': 'category',
+    'source_url': 'category'
+}
+MEASURES_SCHEMA = {
+    'ID': None,
+    'Applies To': 'category',
+    'Country': 'category',
+    'Date Start': 'date',
+    'Date end intended': 'date',
+    'Description of measure implemented': None,
+    'Exceptions': 'category',
+    'Implementing City': 'category',
+    'Implementing State/Province': 'category',
+    'Keywords': 'category',
+    'Quantity': 'float64',
+    'Source': 'category',
+    'Target city': None,
+    'Target country': 'category',
+    'Target region': 'category',
+    'Target state': None
+}
+DATE_FORMAT = '%b %d, %Y'
+BEDS_PROJECTIONS = {
+    'statistics': ['country', 'type', 'beds', 'population', 'source'],
+    'records': ['country', 'lat', 'lng', 'type', 'beds', 'population', 'year',
+                'source', 'source_url']
+}
+BEDS_FILTER_PROJECTIONS = {
+    BedsFilter.NUMBER_PERCENT_COUNTRY_NORMAL.value: 'records',
+    **{filter_option: 'records' for filter_option in BEDS_RANKINGS},
+    BedsFilter.GENERAL_STATISTICS.value: 'statistics',
+    **{filter_option: 'records' for filter_option in BEDS_SPATIAL_FILTERS}
+}
+MEASURES_PROJECTIONS = {
+    'counts': ['Country', 'Keywords', 'Source'],
+    'intervals': ['Country', 'Date Start', 'Date end intended', 'Keywords',
+                  'Source'],
+    'records': ['Country', 'Date Start', 'Date end intended',
+                'Description of measure implemented', 'Exceptions',
+                'Implementing City', 'Implementing State/Province',
+                'Keywords', 'Quantity', 'Source', 'Target country',
+                'Target region']
+}
+MEASURES_FILTER_PROJECTIONS = {
+    MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value: 'records',
+    **{filter_option: 'records' for filter_option in MEASURES_RANKINGS},
+    MeasuresFilter.GENERAL_STATISTICS.value: 'counts',
+    MeasuresFilter.ACTIVE_MEASURES_ON_DATE.value: 'records',
+    MeasuresFilter.DAILY_ACTIVE_MEASURES.value: 'intervals',
+    MeasuresFilter.KEYWORD_QUERY_MEASURES.value: 'records',
+    MeasuresFilter.KEYWORD_QUERY_COUNTS.value: 'counts'
+}
 REMAINING_ISO_CODES = {
     'Vietnam': 'VN',
     'South Korea': 'KR',
@@ -90,8 +215,50 @@ REMAINING_ISO_CODES = {
     'Russia': 'RU',
     'Palestine': 'PS'
 }
+DEFERRED_MODULES = [
+    'numpy',
+    'pandas',
+    'serializer',
+    'profiling',
+    'schemas',
+    'cache',
+    'ranking',
+    'keywords',
+    'normalization',
+    'incremental',
+    'aggregates',
+    'parallel',
+    'beds',
+    'measures',
+    'pycountry',
+    'aiohttp',
+    'api',
+    'orjson'
+]
+CACHE_DIRECTORY = './cache/'
+CACHE_VERSION = 3
+ISO_CODES_FILENAME = 'iso_codes.json'
+HASHES_FILENAME = 'hashes.json'
+RESULTS_DIRECTORY = './cache/results/'
+RESULTS_CACHE_SIZE = 64
+JSON_BACKENDS = ['auto', 'stdlib', 'orjson']
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8000
 BEDS_URL = 'https://api-covid-pi.now.sh/bed'
 MEASURES_URL = 'https://api-covid-pi.now.sh/xmeasurex' # TODO: Update endpoint
+API_CONCURRENCY = 4
+API_TIMEOUT = 30
+API_RETRIES = 3
+API_BACKOFF = 0.5
+SYNTHETIC_BLOCK_ROWS = 100000
+BENCHMARK_ROWS = [1000, 10000, 100000]
+BENCHMARK_REPEAT = 3
+BENCHMARK_THRESHOLD = 0.25
+BENCHMARK_MIN_DELTA = {'seconds': 0.05, 'megabytes': 5}
+BENCHMARK_FILENAME = './benchmark.json'
+PROFILE_FILENAME = './profile.json'
+EARTH_RADIUS = 6371.0088
+SPATIAL_LEAF_SIZE = 8
 HEADERS = {
     "Content-type": "application/json",
     "Accept": "text/plain"
@@ -2,13 +2,18 @@
 This module defines the data types used in the application to store data
 """
 
-import json
+import settings
+import serializer
 
 
 class BedsRecord:
     """
     This class represents a record from the beds capacity dataset
     """
+    __slots__ = ('_code', '_lat', '_lng', '_beds_average', '_beds_total',
+                 '_population_average', '_estimated_beds_total',
+                 '_estimated_beds_average')
+
     def __init__(self, code = None, lat = None, lng = None,
                  beds_average = None, beds_total = None,
                  estimated_beds_total = None, estimated_beds_average = None,
@@ -24,7 +29,7 @@ class BedsRecord:
 
 
     def __str__(self):
-        return json.dumps(self.to_json())
+        return serializer.dumps_line(self.to_json())
 
 
     def __repr__(self):
@@ -51,6 +56,10 @@ class BedTypesData:
     """
     This class represents a bed type information object
     """
+    __slots__ = ('_code', '_type_name', '_count', '_percentage', '_population',
+                 '_estimated_for_population', '_source', '_source_url',
+                 '_year')
+
     def __init__(self, code = None, type_name = None, count = None,
                  percentage = None, population = None,
                  estimated_for_population = None, source = None,
@@ -67,7 +76,7 @@ class BedTypesData:
 
 
     def __str__(self):
-        return json.dumps(self.to_json())
+        return serializer.dumps_line(self.to_json())
 
 
     def __repr__(self):
@@ -91,10 +100,53 @@ class BedTypesData:
         }
 
 
+class BedsNeighbor:
+    """
+    This class represents a country found by a spatial query of the beds
+    dataset around a point (the location of the origin country, if any)
+    """
+    __slots__ = ('_origin', '_origin_lat', '_origin_lng', '_code',
+                 '_distance', '_beds_total')
+
+    def __init__(self, origin = None, origin_lat = None, origin_lng = None,
+                 code = None, distance = None, beds_total = None):
+        self._origin = origin
+        self._origin_lat = origin_lat
+        self._origin_lng = origin_lng
+        self._code = code
+        self._distance = distance
+        self._beds_total = beds_total
+
+
+    def __str__(self):
+        return serializer.dumps_line(self.to_json())
+
+
+    def __repr__(self):
+        return str(self)
+
+
+    def to_json(self):
+        """
+        Returns the json representation of the BedsNeighbor instance
+        """
+        return {
+            'origin': self._origin,
+            'originLat': self._origin_lat,
+            'originLng': self._origin_lng,
+            'code': self._code,
+            'distance': self._distance,
+            'bedsTotal': self._beds_total
+        }
+
+
 class BedsGeneralData:
     """
     This class represents the object that stores general beds statistics
     """
+    __slots__ = ('_beds_count', '_beds_average', '_beds_stantard_deviation',
+                 '_sources_count')
+
     def __init__(self, beds_count = None, beds_average = None, 
                  beds_stantard_deviation = None, sources_count = None):
         self._beds_count = beds_count
@@ -104,7 +156,7 @@ class BedsGeneralData:
 
 
     def __str__(self):
-        return json.dumps(self.to_json())
+        return serializer.dumps_line(self.to_json())
 
 
     def __repr__(self):
@@ -124,6 +176,9 @@ class BedTypesGeneralData:
     """
     This class represents the object that stores general bed types statistics
     """
+    __slots__ = ('_type_name', '_count', '_percentage', '_average',
+                 '_standard_deviation')
+
     def __init__(self, type_name = None, count = None, percentage = None,
                   average = None, standard_deviation = None):
         self._type_name = type_name
@@ -134,7 +189,7 @@ class BedTypesGeneralData:
 
 
     def __str__(self):
-        return json.dumps(self.to_json())
+        return serializer.dumps_line(self.to_json())
 
 
     def __repr__(self):
@@ -155,6 +210,9 @@ class MeasuresGroupData:
     """
     This class represents general measures and restrictions information
     """
+    __slots__ = ('_code', '_keywords_count', '_keywords_total',
+                 '_keywords_records_total', '_sources_count')
+
     def __init__(self, code = None, keywords_count = None,
                  keywords_total = None, keywords_records_total = None,
                  sources_count = None, target_countries = None,
@@ -167,7 +225,7 @@ class MeasuresGroupData:
 
 
     def __str__(self):
-        return json.dumps(self.to_json())
+        return serializer.dumps_line(self.to_json())
 
 
     def __repr__(self):
@@ -191,6 +249,11 @@ class MeasuresData:
     """
     This class represents an object of measures and restrictions information
     """
+    __slots__ = ('_code', '_date_start', '_date_end', '_description',
+                 '_keywords', '_exceptions', '_quantity',
+                 '_implementing_cities', '_implementing_states',
+                 '_target_countries', '_target_regions', '_source')
+
     def __init__(self, code = None, date_start = None, date_end = None,
                  description = None, keywords = None, exceptions = None,
                  quantity = None, implementing_cities = None,
@@ -211,7 +274,7 @@ class MeasuresData:
 
 
     def __str__(self):
-        return json.dumps(self.to_json())
+        return serializer.dumps_line(self.to_json())
 
 
     def __repr__(self):
@@ -238,10 +301,77 @@ class MeasuresData:
         }
 
 
+class MeasuresActivity:
+    """
+    This class represents the number of measures and restrictions of a
+    country that were active on a date
+    """
+    __slots__ = ('_code', '_date', '_active_count')
+
+    def __init__(self, code = None, date = None, active_count = None):
+        self._code = code
+        self._date = date
+        self._active_count = active_count
+
+
+    def __str__(self):
+        return serializer.dumps_line(self.to_json())
+
+
+    def __repr__(self):
+        return str(self)
+
+
+    def to_json(self):
+        """
+        Returns the json representation of the MeasuresActivity instance
+        """
+        return {
+            'code': self._code,
+            'date': self._date,
+            'activeCount': self._active_count
+        }
+
+
+class MeasuresQueryHits:
+    """
+    This class represents the number of measures and restrictions of a
+    country that match a keyword query
+    """
+    __slots__ = ('_code', '_query', '_hits_count')
+
+    def __init__(self, code = None, query = None, hits_count = None):
+        self._code = code
+        self._query = query
+        self._hits_count = hits_count
+
+
+    def __str__(self):
+        return serializer.dumps_line(self.to_json())
+
+
+    def __repr__(self):
+        return str(self)
+
+
+    def to_json(self):
+        """
+        Returns the json representation of the MeasuresQueryHits instance
+        """
+        return {
+            'code': self._code,
+            'query': self._query,
+            'hitsCount': self._hits_count
+        }
+
+
 class MeasuresGeneralData:
     """
     This class represents an object that stores general measures statistics
     """
+    __slots__ = ('_countries_measures_count', '_all_keywords_count',
+                 '_all_sources_count')
+
     def __init__(self, countries_measures_count = None,
                  all_keywords_count = None, all_sources_count = None):
         self._countries_measures_count = countries_measures_count
@@ -250,7 +380,7 @@ class MeasuresGeneralData:
 
 
     def __str__(self):
-        return json.dumps(self.to_json())
+        return serializer.dumps_line(self.to_json())
 
 
     def __repr__(self):
@@ -265,4 +395,169 @@ class MeasuresGeneralData:
             'countriesMeasuresCount': self._countries_measures_count,
             'allKeywordsCount': self._all_keywords_count,
             'allSourcesCount': self._all_sources_count
-        }
\ No newline at end of file
+        }
+
+
+class RecordBatch:
+    """
+    This class is the base of the columnar record batches, which keep the
+    fields of many records as columns (lists, NumPy arrays or Series) instead
+    of one object per record. A batch is serialized column by column, with
+    the same JSON text as the list of its records, while its json
+    representation and its iteration build the records one by one
+    """
+    __slots__ = ('_columns',)
+
+    # Record class of the batch and (json key, argument of the record class)
+    # pairs of its fields, in the order of the json representation
+    record_type = None
+    fields = ()
+
+    def __init__(self, **columns):
+        self._columns = [columns[argument] for key, argument in self.fields]
+
+
+    def __len__(self):
+        return len(self._columns[0]) if self._columns else 0
+
+
+    def __iter__(self):
+        arguments = [argument for key, argument in self.fields]
+
+        for values in zip(*self._get_lists()):
+            yield self.record_type(**dict(zip(arguments, values)))
+
+
+    def __str__(self):
+        return serializer.dumps_line(self.to_json())
+
+
+    def __repr__(self):
+        return str(self)
+
+
+    def _get_lists(self):
+        """
+        Returns the columns of the batch as lists of Python values
+        """
+        return [column.tolist() if hasattr(column, 'tolist') else column
+                for column in self._columns]
+
+
+    def to_json(self):
+        """
+        Returns the json representation of the records of the batch, as a list
+        """
+        keys = [key for key, argument in self.fields]
+        return [dict(zip(keys, values)) for values in zip(*self._get_lists())]
+
+
+    def dumps_records(self):
+        """
+        Returns a list with the serialized text of each record of the batch,
+        as serializer.dumps_items returns it for the record alone. The pretty
+        format is encoded from the columns, and the compact one (whose
+        encoders are faster on the records) from the json representation
+        """
+        if (settings.compact_json):
+            return [serializer.dumps_items([record_json])
+                    for record_json in self.to_json()]
+
+        return serializer.dumps_objects([key for key, argument
+                                         in self.fields], self._get_lists())
+
+
+    def dumps_items(self):
+        """
+        Returns the serialized items of the records of the batch, as
+        serializer.dumps_items returns them for its json representation
+        """
+        if (settings.compact_json):
+            return serializer.dumps_items(self.to_json())
+
+        opening, separator, closing = serializer.get_delimiters()
+        return separator.join(self.dumps_records())
+
+
+    def dumps(self):
+        """
+        Returns the JSON string of the records of the batch, as
+        serializer.dumps returns it for its json representation
+        """
+        if (settings.compact_json):
+            return serializer.dumps(self.to_json())
+
+        return serializer.join_items([self.dumps_items()])
+
+
+class BedsRecordBatch(RecordBatch):
+    """
+    This class represents a columnar batch of BedsRecord objects
+    """
+    __slots__ = ()
+    record_type = BedsRecord
+    fields = (('code', 'code'), ('lat', 'lat'), ('lng', 'lng'),
+              ('bedsTotal', 'beds_total'), ('bedsAverage', 'beds_average'),
+              ('populationAverage', 'population_average'),
+              ('estimatedBedsTotal', 'estimated_beds_total'),
+              ('estimatedBedsAverage', 'estimated_beds_average'))
+
+
+class BedTypesDataBatch(RecordBatch):
+    """
+    This class represents a columnar batch of BedTypesData objects
+    """
+    __slots__ = ()
+    record_type = BedTypesData
+    fields = (('code', 'code'), ('type', 'type_name'), ('total', 'count'),
+              ('percentage', 'percentage'), ('population', 'population'),
+              ('estimatedForPopulation', 'estimated_for_population'),
+              ('source', 'source'), ('sourceUrl', 'source_url'),
+              ('year', 'year'))
+
+
+class BedsNeighborBatch(RecordBatch):
+    """
+    This class represents a columnar batch of BedsNeighbor objects
+    """
+    __slots__ = ()
+    record_type = BedsNeighbor
+    fields = (('origin', 'origin'), ('originLat', 'origin_lat'),
+              ('originLng', 'origin_lng'), ('code', 'code'),
+              ('distance', 'distance'), ('bedsTotal', 'beds_total'))
+
+
+class MeasuresDataBatch(RecordBatch):
+    """
+    This class represents a columnar batch of MeasuresData objects
+    """
+    __slots__ = ()
+    record_type = MeasuresData
+    fields = (('code', 'code'), ('dateStart', 'date_start'),
+              ('dateEnd', 'date_end'), ('description', 'description'),
+              ('keywords', 'keywords'), ('exceptions', 'exceptions'),
+              ('quantity', 'quantity'),
+              ('implementingCities', 'implementing_cities'),
+              ('implementingStates', 'implementing_states'),
+              ('targetCountries', 'target_countries'),
+              ('targetRegions', 'target_regions'), ('source', 'source'))
+
+
+class MeasuresActivityBatch(RecordBatch):
+    """
+    This class represents a columnar batch of MeasuresActivity objects
+    """
+    __slots__ = ()
+    record_type = MeasuresActivity
+    fields = (('code', 'code'), ('date', 'date'),
+              ('activeCount', 'active_count'))
+
+
+class MeasuresQueryHitsBatch(RecordBatch):
+    """
+    This class represents a columnar batch of MeasuresQueryHits objects
+    """
+    __slots__ = ()
+    record_type = MeasuresQueryHits
+    fields = (('code', 'code'), ('query', 'query'),
+              ('hitsCount', 'hits_count'))
@@ -2,9 +2,57 @@
 This module handles file saving processes
 """
 
+import profiling
+import serializer
 from constants import BedsFilter, MeasuresFilter
 
 
+class JsonStreamWriter:
+    """
+    This class writes JSON items on a file as they are produced, either as a
+    JSON array with the same format as serializer.dumps(items) or as
+    newline-delimited JSON (one item per line)
+    """
+    def __init__(self, filename, ndjson = False):
+        self._file = open(filename, 'w')
+        self._ndjson = ndjson
+        self._count = 0
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+
+    def write(self, item):
+        """
+        Encodes the input item and appends it to the file
+        """
+        if (self._ndjson):
+            self._file.write(serializer.dumps_line(item) + '\n')
+        else:
+            opening, separator, closing = serializer.get_delimiters()
+            self._file.write((separator if self._count else opening) +
+                             serializer.dumps_items([item]))
+
+        self._count += 1
+
+
+    def close(self):
+        """
+        Closes the JSON array (if needed) and the file
+        """
+        if (not self._ndjson):
+            opening, separator, closing = serializer.get_delimiters()
+            self._file.write(closing if self._count else '[]')
+
+        self._file.close()
+
+
+@profiling.instrumented('write_file')
 def write_to_file(data, filename):
     """
     Writes data on the file with specified name
@@ -18,33 +66,88 @@ def write_to_file(data, filename):
         print(e)
 
 
-def write_beds_data(general_json, types_json, filter_index):
+def read_files(filenames):
     """
-    Writes the entered beds json into a file named according to the chosen
-    filter
+    Returns the list of contents of the input files
     """
-    general_name = BedsFilter(filter_index).name + '_GENERAL'
-    types_name = BedsFilter(filter_index).name + '_TYPES'
+    contents = []
+
+    for filename in filenames:
+        with open(filename) as export_file:
+            contents.append(export_file.read())
+
+    return contents
+
+
+def get_beds_filenames(export_name):
+    """
+    Returns the general and types file names of the input beds export name
+    """
+    general_name = export_name + '_GENERAL'
+    types_name = export_name + '_TYPES'
     general_filename = BedsFilter.EXPORT_FILENAME.value.replace("#", 
                                                                 general_name)
     types_filename = BedsFilter.EXPORT_FILENAME.value.replace("#", types_name)
-    
+
+    return [general_filename, types_filename]
+
+
+def write_beds_data(general_json, types_json, export_name):
+    """
+    Writes the entered beds json into a file named according to the export
+    name of the chosen filter
+    """
+    general_filename, types_filename = get_beds_filenames(export_name)
+
     write_to_file(general_json, general_filename)
     write_to_file(types_json, types_filename)
 
 
-def write_measures_data(filter_index, general_json, types_json = None):
+def get_measures_filenames(export_name, ndjson = False):
     """
-    Writes the entered measures json into a file named according to the chosen
-    filter
+    Returns the general and measures file names of the input measures export
+    name
     """
-    general_name = MeasuresFilter(filter_index).name + '_GENERAL'
-    general_filename = MeasuresFilter.EXPORT_FILENAME.value.replace("#", 
-                                                                general_name)
+    extension = '.ndjson' if ndjson else '.json'
+    filename = MeasuresFilter.EXPORT_FILENAME.value.replace('.json', extension)
+
+    return [filename.replace("#", export_name + '_GENERAL'),
+            filename.replace("#", export_name + '_MEASURES')]
+
+
+def write_measures_stream(export_name, records, ndjson = False):
+    """
+    Writes the measures files of the export name while the records iterable
+    produces its [general json, measures json list] pairs, so that only one
+    pair is held in memory at a time. The files can be written as JSON arrays
+    or as newline-delimited JSON
+    """
+    general_filename, types_filename = get_measures_filenames(export_name,
+                                                              ndjson)
+
+    try:
+        with JsonStreamWriter(general_filename, ndjson) as general_writer, \
+             JsonStreamWriter(types_filename, ndjson) as types_writer:
+            for general_json, types_json_list in records:
+                general_writer.write(general_json)
+
+                for types_json in types_json_list:
+                    types_writer.write(types_json)
+
+        print(f'Wrote the results on {general_filename}!')
+        print(f'Wrote the results on {types_filename}!')
+    except OSError as e:
+        print(f'Could not write {general_filename} and {types_filename}!')
+        print(e)
+
+
+def write_measures_data(export_name, general_json, types_json = None):
+    """
+    Writes the entered measures json into a file named according to the export
+    name of the chosen filter
+    """
+    general_filename, types_filename = get_measures_filenames(export_name)
     write_to_file(general_json, general_filename)
     
     if (types_json):
-        types_name = MeasuresFilter(filter_index).name + '_MEASURES'
-        types_filename = MeasuresFilter.EXPORT_FILENAME.value.replace("#",
-                                                                  types_name)
         write_to_file(types_json, types_filename)
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+This module contains the helpers of the incremental ingestion of a dataset.
+Every row of a new release of the source file is identified by a stable key
+and a content hash, so that only its inserted, changed and deleted rows are
+processed, and the serialized records are kept as JSON fragments from which
+the exports are assembled
+"""
+
+import hashlib
+import pandas as pd
+from cache import get_file_signature
+
+
+def get_row_keys(data, row_hashes, id_column):
+    """
+    Returns the Series with the key of every row of the raw dataset, given
+    their content hashes: its ID when it is present and unique, or its content
+    hash (and occurrence number among identical rows) otherwise
+    """
+    ids = data[id_column]
+    hashes = row_hashes.astype(str)
+    occurrences = hashes.groupby(hashes).cumcount().astype(str)
+    has_id = ids.notna() & ~ids.duplicated(keep = False)
+
+    return ('id:' + ids.astype(str)).where(has_id, 'row:' + hashes + ':' +
+                                                   occurrences)
+
+
+def get_row_hashes(data):
+    """
+    Returns the Series with the content hash of every row of the dataset
+    """
+    return pd.util.hash_pandas_object(data, index = False)
+
+
+def diff_rows(old_hashes, new_hashes):
+    """
+    Compares the row hashes of the stored state with the ones of the new
+    release (both Series indexed by row key) and returns a list with three
+    Index objects:
+    [0]: Keys of the inserted rows
+    [1]: Keys of the changed rows
+    [2]: Keys of the deleted rows
+    """
+    inserted = new_hashes.index.difference(old_hashes.index, sort = False)
+    deleted = old_hashes.index.difference(new_hashes.index, sort = False)
+    common = new_hashes.index.intersection(old_hashes.index, sort = False)
+    changed = common[new_hashes[common].to_numpy() !=
+                     old_hashes[common].to_numpy()]
+
+    return [inserted, changed, deleted]
+
+
+def _get_export_entry(api_data, filenames):
+    """
+    Returns the content hash of the serialized data of an export together
+    with the signatures of its files
+    """
+    digest = hashlib.sha256()
+
+    for part in api_data:
+        digest.update(part.encode())
+
+    return [digest.hexdigest(),
+            [get_file_signature(filename) for filename in filenames]]
+
+
+def is_emitted(exports, name, api_data, filenames):
+    """
+    Checks whether the input serialized data of an export is the one last
+    written on its files, according to the emitted exports of the state
+    """
+    return exports.get(name) == _get_export_entry(api_data, filenames)
+
+
+def record_emitted(exports, name, api_data, filenames):
+    """
+    Records on the emitted exports of the state that the input serialized data
+    of an export was written on its files
+    """
+    exports[name] = _get_export_entry(api_data, filenames)
@@ -0,0 +1,165 @@
+"""
+This module contains the interval index of the measures, which answers which
+of them were active on a date and how many were active on every day of a
+range. The date ranges are converted to day numbers and sorted by group
+(country) and start, so that the intervals of a group that started by a date
+are found by binary search, and the daily counts of a range are the
+cumulative sums of the starts minus the ends of the intervals, without
+visiting the intervals once per day. A missing end means that the interval
+is still ongoing
+"""
+
+import numpy as np
+
+
+def _get_days(dates):
+    """
+    Returns the day numbers (since the epoch) of the input dates, as an
+    integer array with the minimum integer in place of the missing dates
+    """
+    return np.asarray(dates, dtype = 'datetime64[D]').astype(np.int64)
+
+
+def get_day(date_string):
+    """
+    Returns the day number (since the epoch) of a 'YYYY-MM-DD' date string
+    """
+    return int(np.datetime64(date_string, 'D').astype(np.int64))
+
+
+def get_date_strings(days):
+    """
+    Returns the 'YYYY-MM-DD' strings of the input day numbers
+    """
+    return np.datetime_as_string(np.asarray(days, dtype = 'datetime64[D]'))
+
+
+class IntervalIndex:
+    """
+    This class indexes the date ranges of labeled intervals. The intervals
+    without a start, or that end before they start, are never active. Every
+    interval is identified by its position in the input arrays
+    """
+    def __init__(self, labels, starts, ends):
+        missing = np.iinfo(np.int64).min
+        start_days = _get_days(starts)
+        end_days = _get_days(ends)
+        valid = (start_days != missing) & ((end_days == missing) |
+                                           (end_days >= start_days))
+        self.labels, groups = np.unique(np.asarray(labels)[valid],
+                                        return_inverse = True)
+        positions = np.flatnonzero(valid)
+        start_days = start_days[valid]
+        end_days = end_days[valid]
+
+        # First and last start days, which are an empty range without
+        # intervals
+        self.first_day = int(start_days.min()) if len(start_days) else 0
+        self.last_day = int(start_days.max()) if len(start_days) else -1
+
+        # The days are relative to the day before the first start, so that 0
+        # is before every interval, and the ongoing intervals end on the last
+        # day of the stride, after every start and end of the others
+        self._origin = self.first_day - 1
+        self._ongoing = end_days == missing
+        self._stride = max(self.last_day,
+                           int(np.max(end_days, initial = self._origin))) - \
+                       self._origin + 2
+        start_days = start_days - self._origin
+        end_days = np.where(self._ongoing, self._stride - 1,
+                            end_days - self._origin)
+        order = np.lexsort((positions, start_days, groups))
+
+        self._groups = groups[order]
+        self._positions = positions[order]
+        self._ongoing = self._ongoing[order]
+        self._start_days = start_days[order]
+        self._end_days = end_days[order]
+        self._start_keys = self._groups * self._stride + self._start_days
+        self._group_starts = np.searchsorted(self._start_keys,
+                                             np.arange(len(self.labels)) *
+                                             self._stride)
+
+
+    def __len__(self):
+        return len(self._positions)
+
+
+    def get_groups(self, labels = None):
+        """
+        Returns the sorted array with the group numbers of the input labels
+        that have intervals (all the groups if None)
+        """
+        if (labels is None):
+            return np.arange(len(self.labels))
+
+        groups = np.searchsorted(self.labels, labels)
+        groups = groups[groups < len(self.labels)]
+
+        return np.unique(groups[np.isin(self.labels[groups], labels)])
+
+
+    def _get_relative_day(self, day):
+        """
+        Returns the input day number relative to the indexed days, clipped to
+        the range of the stride
+        """
+        return int(np.clip(day - self._origin, 0, self._stride - 1))
+
+
+    def query_active(self, day, labels = None):
+        """
+        Returns a list with the group numbers and positions of the intervals
+        active on the input day number, of the groups of the input labels (or
+        of all of them if None), sorted by group and then by position. The
+        intervals of a group that started by the day are found by binary
+        search, and only their ends are checked
+        """
+        groups = self.get_groups(labels)
+        relative_day = self._get_relative_day(day)
+        starts = self._group_starts[groups]
+        ends = np.searchsorted(self._start_keys,
+                               groups * self._stride + relative_day,
+                               side = 'right')
+        sizes = ends - starts
+        offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes,
+                                                     sizes)
+        candidates = np.repeat(starts, sizes) + offsets
+        active = candidates[self._end_days[candidates] >= relative_day]
+        order = np.lexsort((self._positions[active], self._groups[active]))
+
+        return [self._groups[active][order], self._positions[active][order]]
+
+
+    def count_daily(self, first_day, last_day, labels = None):
+        """
+        Returns a list with the group numbers of the input labels (or all of
+        them if None) and the matrix with the number of their intervals
+        active on every day from the first to the last day number (one row
+        per group and one column per day). Every interval adds one from its
+        start and subtracts one after its end, so the counts are the
+        cumulative sums of those steps along the days
+        """
+        groups = self.get_groups(labels)
+        days = max(last_day - first_day + 1, 0)
+        rows = np.full(len(self.labels), -1)
+        rows[groups] = np.arange(len(groups))
+        selected = rows[self._groups] >= 0
+        interval_rows = rows[self._groups[selected]]
+
+        # Steps before the range count from its first day, and the ones after
+        # it fall in an extra column that is dropped
+        first_day = first_day - self._origin
+        start_columns = np.clip(self._start_days[selected] - first_day, 0,
+                                days)
+        end_columns = np.where(self._ongoing[selected], days,
+                               np.clip(self._end_days[selected] - first_day +
+                                       1, 0, days))
+        cells = len(groups) * (days + 1)
+        steps = np.bincount(interval_rows * (days + 1) + start_columns,
+                            minlength = cells) - \
+                np.bincount(interval_rows * (days + 1) + end_columns,
+                            minlength = cells)
+
+        return [groups, np.cumsum(steps.reshape(len(groups), days + 1),
+                                  axis = 1)[:, :days]]
@@ -0,0 +1,216 @@
+"""
+This module contains the keyword engine of the measures dataset. The comma
+lists of the 'Keywords' column are exploded once into a long table of
+(row, keyword) pairs backed by a categorical keyword dictionary, from which
+the keyword counts and histograms are computed, and the inverted index of
+the keyword queries is built
+"""
+
+import numpy as np
+import pandas as pd
+from functools import reduce
+from itertools import chain
+from bitmaps import Bitmap
+from queries import evaluate_query
+
+
+def explode_keywords(keyword_lists):
+    """
+    Returns the long table of the input Series of keyword lists as a
+    DataFrame with two columns:
+    - row: position of the record in the input Series
+    - keyword: categorical keyword, whose categories are the sorted keyword
+    dictionary
+    """
+    lists = keyword_lists.tolist()
+    lengths = [len(keywords) for keywords in lists]
+    rows = np.repeat(np.arange(len(lists)), lengths)
+    keywords = pd.Categorical(list(chain.from_iterable(lists)))
+
+    return pd.DataFrame({'row': rows, 'keyword': keywords})
+
+
+def select_rows(keywords_table, positions):
+    """
+    Returns the long table of the rows at the input positions of the table,
+    following their order, where the row of every pair is its position in
+    the input positions. The keyword dictionary is kept
+    """
+    rows = keywords_table['row'].to_numpy()
+    positions = np.asarray(positions, dtype = np.int64)
+    starts = np.searchsorted(rows, positions)
+    lengths = np.searchsorted(rows, positions + 1) - starts
+    pairs = np.arange(lengths.sum()) + \
+            np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    keywords = keywords_table['keyword']
+
+    return pd.DataFrame({
+        'row': np.repeat(np.arange(len(positions)), lengths),
+        'keyword': pd.Categorical.from_codes(
+                       keywords.cat.codes.to_numpy()[pairs],
+                       dtype = keywords.dtype)
+    })
+
+
+def get_keyword_lists(keywords_table, size):
+    """
+    Returns the list with the keyword list of each of the input number of
+    rows of the table, which share the strings of the keyword dictionary
+    """
+    bounds = np.searchsorted(keywords_table['row'].to_numpy(),
+                             np.arange(size + 1))
+    keywords = np.asarray(keywords_table['keyword'], dtype = object)
+
+    return [keywords[start:end].tolist()
+            for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def _get_labeled_codes(keywords_table, labels):
+    """
+    Returns a DataFrame with the group label and the keyword code of every
+    (row, keyword) pair, given the group label of each row
+    """
+    labels = np.asarray(labels)
+
+    return pd.DataFrame({'label': labels[keywords_table['row'].to_numpy()],
+                         'code': keywords_table['keyword'].cat.codes \
+                                                          .to_numpy()})
+
+
+def count_keywords(keywords_table, labels):
+    """
+    Returns a list with two Series indexed by the group labels of the rows:
+    [0]: Count of different keywords of each group
+    [1]: Count of keyword records of each group
+    """
+    labeled_codes = _get_labeled_codes(keywords_table, labels)
+    different_counts = labeled_codes.drop_duplicates().groupby('label').size()
+    records_counts = labeled_codes.groupby('label').size()
+
+    return [different_counts, records_counts]
+
+
+def _pack_histogram(categories, codes, counts):
+    """
+    Returns the histogram structure for the input keyword codes and counts
+    """
+    return [{"keywords": categories[code], "count": count}
+            for code, count in zip(codes.tolist(), counts.tolist())]
+
+
+def get_histograms(keywords_table, labels):
+    """
+    Returns a dictionary with the keyword histogram of each group, given the
+    group label of each row. Every histogram is sorted by keyword
+    """
+    categories = keywords_table['keyword'].cat.categories.tolist()
+    labeled_codes = _get_labeled_codes(keywords_table, labels)
+    sizes = labeled_codes.groupby(['label', 'code']).size()
+    group_labels = sizes.index.get_level_values('label').to_numpy()
+    group_codes = sizes.index.get_level_values('code').to_numpy()
+    counts = sizes.to_numpy()
+    starts = np.flatnonzero(np.r_[True, group_labels[1:] != group_labels[:-1]])
+    ends = np.r_[starts[1:], len(sizes)]
+
+    return {group_labels[start]: _pack_histogram(categories,
+                                                 group_codes[start:end],
+                                                 counts[start:end])
+            for start, end in zip(starts, ends)}
+
+
+def get_histogram(keywords_table):
+    """
+    Returns the keyword histogram of the whole table, sorted by keyword
+    """
+    categories = keywords_table['keyword'].cat.categories.tolist()
+    counts = np.bincount(keywords_table['keyword'].cat.codes.to_numpy(),
+                         minlength = len(categories))
+    codes = np.flatnonzero(counts)
+
+    return _pack_histogram(categories, codes, counts[codes])
+
+
+def _get_bitmaps(size, rows, labels):
+    """
+    Returns the dictionary from every label to the Bitmap of its rows, given
+    the row and the label of each (row, label) pair
+    """
+    categories = pd.Categorical(labels)
+    label_codes = categories.codes
+    present = label_codes >= 0
+    rows = np.asarray(rows)[present]
+    label_codes = label_codes[present]
+    order = np.lexsort((rows, label_codes))
+    rows = rows[order]
+    label_codes = label_codes[order]
+    starts = np.flatnonzero(np.r_[True, label_codes[1:] != label_codes[:-1]]) \
+             if len(label_codes) else np.array([], dtype = int)
+    ends = np.r_[starts[1:], len(label_codes)]
+
+    return {categories.categories[label_codes[start]]:
+            Bitmap.from_ids(size, np.unique(rows[start:end]))
+            for start, end in zip(starts, ends)}
+
+
+class KeywordIndex:
+    """
+    This class is the inverted index of the keyword queries: the Bitmap of
+    the rows of every keyword and of every country code. The cost of a query
+    depends on the size of the bitmaps of its keywords, and not on the size
+    of the keyword vocabulary
+    """
+    def __init__(self, rows, keywords, codes):
+        self.size = len(codes)
+        self.codes, self._row_codes = np.unique(np.asarray(codes),
+                                                return_inverse = True)
+        self._universe = Bitmap.full(self.size)
+        self._empty = Bitmap.from_ids(self.size, [])
+        self._keywords = _get_bitmaps(self.size, rows, keywords)
+        self._countries = _get_bitmaps(self.size, np.arange(self.size),
+                                       codes)
+
+
+    def __len__(self):
+        return len(self._keywords)
+
+
+    def _get_keyword_bitmap(self, keyword):
+        """
+        Returns the Bitmap of the rows of a keyword, which is empty if the
+        keyword is not in the index
+        """
+        return self._keywords.get(keyword, self._empty)
+
+
+    def query(self, tree, codes = None):
+        """
+        Returns a list with the codes of the countries with rows that match
+        the input query tree (of queries.parse_query), sorted, their number
+        of matching rows, and the matching rows sorted by country and then by
+        row. Only the rows of the input country codes are matched, if given
+        """
+        result = evaluate_query(tree, self._get_keyword_bitmap,
+                                self._universe)
+
+        if (codes is not None):
+            result = result & reduce(lambda union, bitmap: union | bitmap,
+                                     [self._countries[code] for code in codes
+                                      if code in self._countries],
+                                     self._empty)
+
+        rows = result.to_ids()
+        row_codes = self._row_codes[rows]
+        counts = np.bincount(row_codes, minlength = len(self.codes))
+        present = np.flatnonzero(counts)
+
+        return [self.codes[present], counts[present],
+                rows[np.argsort(row_codes, kind = 'stable')]]
+
+
+def get_keyword_index(keywords_table, codes):
+    """
+    Returns the KeywordIndex of the input long table of keywords, given the
+    country code of each of its rows
+    """
+    return KeywordIndex(keywords_table['row'].to_numpy(),
+                        keywords_table['keyword'], np.asarray(codes))
@@ -2,12 +2,22 @@
 This is the main module of the application that serves as execution entry point
 """
 
+import time
+
+STARTED = time.perf_counter()
+
 import sys
-import beds
+import csv
+import argparse
+import datetime
+import importlib.util
+import startup
+import settings
 import traceback
-import measures as msrs
 from commons import prompt_user
-from constants import MENU, BED_FILTERS, MEASURE_FILTERS
+from constants import (MENU, BED_FILTERS, MEASURE_FILTERS, BEDS_METRICS,
+                       MEASURES_METRICS, JSON_BACKENDS, PROFILE_FILENAME,
+                       SERVER_HOST, SERVER_PORT)
 
 
 def validate_option(option, min_value, max_value):
@@ -38,6 +48,8 @@ def main_cli():
             if (dataset_option == 0):
                 finished = True 
             elif (dataset_option == 1):
+                import beds
+
                 while (filter_navigation):
                     filter_option = int(prompt_user(1))
 
@@ -48,6 +60,8 @@ def main_cli():
                             beds.load_bed_records(filter_option,
                                                   cli_mode = True)
             else:
+                import measures as msrs
+
                 while (filter_navigation):
                     filter_option = int(prompt_user(2))
 
@@ -60,40 +74,355 @@ def main_cli():
                                                       cli_mode = True)
 
 
-def main_args(send_request = False):
+def parse_filter_options(filter_argument, filters_count):
+    """
+    Returns the list of filter indexes described by the filter argument, which
+    can be a single index, a comma-separated list of indexes, or 'all'. If any
+    index is not valid, None is returned
     """
-    Program entry point with execution arguments
-    """    
-    dataset_option = int(sys.argv[1])
+    if (filter_argument.lower() == 'all'):
+        return list(range(1, filters_count + 1))
+
+    filter_options = [int(option) for option in filter_argument.split(',')]
+
+    for filter_option in filter_options:
+        if (not validate_option(filter_option, 1, filters_count)):
+            return None
+
+    return filter_options
+
 
-    if (validate_option(dataset_option, 1, 2)):
+def main_args(dataset_argument, filter_argument, send_request = False):
+    """
+    Program entry point with execution arguments. The dataset argument can be
+    an index or 'all' (both datasets), and the filter argument can be an
+    index, a comma-separated list of indexes or 'all'. When several filters
+    are requested, each dataset is loaded once and shared by all of them
+    """
+    if (dataset_argument.lower() == 'all'):
+        dataset_options = [1, 2]
+    else:
+        dataset_options = [int(dataset_argument)]
+
+        if (not validate_option(dataset_options[0], 1, 2)):
+            return
+
+    for dataset_option in dataset_options:
         if (dataset_option == 1):
-            filter_option = int(sys.argv[2])
+            import beds
+
+            filter_options = parse_filter_options(filter_argument,
+                                                  len(BED_FILTERS))
 
-            if (validate_option(filter_option, 1, len(BED_FILTERS))):
-                beds.load_bed_records(filter_option,
+            if (filter_options and len(filter_options) == 1):
+                beds.load_bed_records(filter_options[0],
                                       send_request = send_request)
+            elif (filter_options):
+                beds.load_bed_batch(filter_options,
+                                    send_request = send_request)
         else:
-            filter_option = int(sys.argv[2])
+            import measures as msrs
 
-            if (validate_option(filter_option, 1, len(MEASURE_FILTERS))):
-                msrs.load_measure_records(filter_option,
+            filter_options = parse_filter_options(filter_argument,
+                                                  len(MEASURE_FILTERS))
+
+            if (filter_options and len(filter_options) == 1):
+                msrs.load_measure_records(filter_options[0],
                                           send_request = send_request)
+            elif (filter_options):
+                msrs.load_measure_batch(filter_options,
+                                        send_request = send_request)
+
+
+def parse_point(point_argument):
+    """
+    Returns the [latitude, longitude] pair of a "LAT,LNG" point argument
+    """
+    try:
+        lat, lng = [float(value) for value in point_argument.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{point_argument}" is not a '
+                                         'LAT,LNG point')
+
+    if (not (-90 <= lat <= 90 and -180 <= lng <= 180)):
+        raise argparse.ArgumentTypeError(f'"{point_argument}" is out of the '
+                                         'latitude and longitude ranges')
+
+    return [lat, lng]
+
+
+def read_points(filename):
+    """
+    Returns the list of [latitude, longitude] pairs of a CSV file with lat
+    and lng columns
+    """
+    with open(filename, newline = '') as points_file:
+        return [parse_point(f'{row["lat"]},{row["lng"]}')
+                for row in csv.DictReader(points_file)]
+
+
+def parse_date(date_argument):
+    """
+    Returns the 'YYYY-MM-DD' string of a date argument in that format
+    """
+    try:
+        return datetime.date.fromisoformat(date_argument).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{date_argument}" is not a '
+                                         'YYYY-MM-DD date')
+
+
+def parse_date_range(range_argument):
+    """
+    Returns the [first date, last date] pair of 'YYYY-MM-DD' strings of a
+    "FROM,TO" date range argument
+    """
+    dates = [parse_date(date) for date in range_argument.split(',')]
+
+    if (len(dates) != 2 or dates[0] > dates[1]):
+        raise argparse.ArgumentTypeError(f'"{range_argument}" is not a '
+                                         'FROM,TO range of dates')
+
+    return dates
+
+
+def parse_country_code(code_argument):
+    """
+    Returns the uppercase ISO 3166 - alpha 2 code of a country argument
+    """
+    if (len(code_argument) != 2 or not code_argument.isalpha()):
+        raise argparse.ArgumentTypeError(f'"{code_argument}" is not an ISO '
+                                         '3166 - alpha 2 country code')
+
+    return code_argument.upper()
+
+
+def parse_keyword_query(query_argument):
+    """
+    Returns a keyword query argument, once it is checked to be well formed
+    """
+    from queries import parse_query
+
+    try:
+        parse_query(query_argument)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f'"{query_argument}" is not a '
+                                         f'keyword query: {e}')
+
+    return query_argument
+
+
+def parse_arguments():
+    """
+    Returns the parsed execution arguments
+    """
+    parser = argparse.ArgumentParser(
+                 usage = 'python main.py [options] [<index of dataset> '
+                         '<index of filter> [post] | serve]')
+    parser.add_argument('dataset', nargs = '?',
+                        help = 'index of the dataset, "all", or "serve" to '
+                               'start the query server')
+    parser.add_argument('filter', nargs = '?',
+                        help = 'index of the filter, comma-separated indexes '
+                               'or "all"')
+    parser.add_argument('post', nargs = '?',
+                        help = 'type "post" to send the results to the API')
+    parser.add_argument('--no-cache', action = 'store_true',
+                        help = 'read and transform the CSV files without '
+                               'using the dataset and results caches (the '
+                               'table of ISO codes of the country names is '
+                               'still used)')
+    parser.add_argument('--force', action = 'store_true',
+                        help = 'recompute and rewrite the results of the '
+                               'filters even if they are up to date')
+    parser.add_argument('--workers', type = int, default = settings.workers,
+                        metavar = 'N',
+                        help = 'number of worker processes that pack the '
+                               'records of the countries')
+    parser.add_argument('--chunk-size', type = int, metavar = 'ROWS',
+                        help = 'read the CSV files in chunks of this number '
+                               'of rows, keeping only their aggregates in '
+                               'memory')
+    parser.add_argument('--incremental', action = 'store_true',
+                        help = 'apply only the measures rows changed since '
+                               'the last incremental run and write only the '
+                               'changed files')
+    parser.add_argument('--clear-cache', action = 'store_true',
+                        help = 'delete the dataset cache before running')
+    parser.add_argument('--profile', action = 'store_true',
+                        help = 'measure the time, memory and rows of every '
+                               'processing stage, printing them as a table '
+                               'and writing them as a JSON trace')
+    parser.add_argument('--profile-output', default = PROFILE_FILENAME,
+                        metavar = 'FILE',
+                        help = 'file of the JSON trace of --profile')
+    parser.add_argument('--startup-report', action = 'store_true',
+                        help = 'print the import cost of the application '
+                               'modules')
+    parser.add_argument('--stream', action = 'store_true',
+                        help = 'write the measures files while their records '
+                               'are produced, one country at a time')
+    parser.add_argument('--ndjson', action = 'store_true',
+                        help = 'stream the measures files as newline-'
+                               'delimited JSON (implies --stream)')
+    parser.add_argument('--compact', action = 'store_true',
+                        help = 'write the JSON files without whitespace '
+                               'instead of indented')
+    parser.add_argument('--json-backend', choices = JSON_BACKENDS,
+                        default = settings.json_backend,
+                        help = 'encoder of the compact JSON files ("auto" '
+                               'uses orjson when it is installed)')
+    parser.add_argument('--top', type = int, default = settings.ranking_count,
+                        metavar = 'N',
+                        help = 'number of countries of the ranking filters')
+    parser.add_argument('--metric',
+                        choices = sorted({**BEDS_METRICS, **MEASURES_METRICS}),
+                        help = 'metric of the ranking filters (the one of '
+                               'each filter by default)')
+    parser.add_argument('--direction', choices = ['top', 'bottom', 'both'],
+                        help = 'direction of the ranking filters (the one of '
+                               'each filter by default)')
+    parser.add_argument('--point', type = parse_point, action = 'append',
+                        metavar = 'LAT,LNG',
+                        help = 'query point of the spatial filters (can be '
+                               'repeated; the location of every country by '
+                               'default)')
+    parser.add_argument('--points-file', metavar = 'FILE',
+                        help = 'CSV file with the lat and lng columns of more '
+                               'query points of the spatial filters')
+    parser.add_argument('--radius', type = float,
+                        default = settings.spatial_radius, metavar = 'KM',
+                        help = 'radius of the countries within distance '
+                               'filter, in kilometers')
+    parser.add_argument('--nearest', type = int,
+                        default = settings.spatial_count, metavar = 'N',
+                        help = 'number of countries of the nearest countries '
+                               'filter')
+    parser.add_argument('--date', type = parse_date, metavar = 'YYYY-MM-DD',
+                        help = 'date of the active measures filter (the last '
+                               'start date of the measures by default)')
+    parser.add_argument('--date-range', type = parse_date_range,
+                        metavar = 'FROM,TO',
+                        help = 'first and last dates of the daily active '
+                               'measures filter (the range of the start dates '
+                               'of the measures by default)')
+    parser.add_argument('--country', type = parse_country_code,
+                        action = 'append', metavar = 'CODE',
+                        help = 'ISO code of a country the date and keyword '
+                               'filters are restricted to (can be repeated)')
+    parser.add_argument('--query', type = parse_keyword_query,
+                        default = settings.keyword_query, metavar = 'QUERY',
+                        help = 'boolean query of the keyword filters, with '
+                               'the AND, OR and NOT operators and '
+                               'parentheses')
+
+    parser.add_argument('--concurrency', type = int,
+                        default = settings.api_concurrency, metavar = 'N',
+                        help = 'maximum number of API requests in flight')
+    parser.add_argument('--timeout', type = float,
+                        default = settings.api_timeout, metavar = 'SECONDS',
+                        help = 'timeout of each API request')
+    parser.add_argument('--retries', type = int,
+                        default = settings.api_retries, metavar = 'N',
+                        help = 'number of retries of a failed API request')
+    parser.add_argument('--host', default = SERVER_HOST,
+                        help = 'address of the query server')
+    parser.add_argument('--port', type = int, default = SERVER_PORT,
+                        help = 'port of the query server')
+    arguments = parser.parse_args()
+
+    if (arguments.top < 1):
+        parser.error('the number of countries of --top must be positive')
+    if (arguments.radius <= 0 or arguments.nearest < 1):
+        parser.error('the --radius and the number of countries of --nearest '
+                     'must be positive')
+    if (arguments.points_file):
+        try:
+            arguments.point = (arguments.point or []) + \
+                              read_points(arguments.points_file)
+        except (OSError, KeyError, argparse.ArgumentTypeError) as e:
+            parser.error(f'the --points-file cannot be read: {e}')
+    if (arguments.concurrency < 1 or arguments.timeout <= 0 or
+        arguments.retries < 0):
+        parser.error('the API concurrency and timeout must be positive, and '
+                     'the retries cannot be negative')
+    if (arguments.workers < 1):
+        parser.error('the number of --workers must be positive')
+    if (arguments.chunk_size is not None and arguments.chunk_size < 1):
+        parser.error('the number of rows of --chunk-size must be positive')
+    if (arguments.chunk_size and (arguments.incremental or
+                                  arguments.dataset == 'serve')):
+        parser.error('--chunk-size cannot be combined with --incremental or '
+                     'the query server')
+    if (arguments.incremental and (arguments.no_cache or arguments.stream or
+                                   arguments.ndjson)):
+        parser.error('--incremental cannot be combined with --no-cache, '
+                     '--stream or --ndjson')
+    if (arguments.json_backend == 'orjson' and
+        importlib.util.find_spec('orjson') is None):
+        parser.error('the orjson backend requires the orjson package')
+
+    return arguments
 
 
 if __name__ == '__main__':
     try:
-        if (len(sys.argv) == 1):
-            main_cli()
-        elif (len(sys.argv) == 3):
-            main_args()
-        elif (len(sys.argv) == 4):
-            main_args(sys.argv[3] == 'post')
-        else:
+        arguments = parse_arguments()
+
+        settings.use_cache = not arguments.no_cache
+        settings.force = arguments.force
+        settings.incremental = arguments.incremental
+        settings.chunk_size = arguments.chunk_size
+        settings.workers = arguments.workers
+        settings.streaming = arguments.stream or arguments.ndjson
+        settings.ndjson = arguments.ndjson
+        settings.compact_json = arguments.compact
+        settings.json_backend = arguments.json_backend
+        settings.ranking_count = arguments.top
+        settings.ranking_metric = arguments.metric
+        settings.ranking_direction = arguments.direction
+        settings.spatial_points = arguments.point
+        settings.spatial_radius = arguments.radius
+        settings.spatial_count = arguments.nearest
+        settings.active_date = arguments.date
+        settings.active_range = arguments.date_range
+        settings.country_codes = sorted(set(arguments.country)) \
+                                 if arguments.country else None
+        settings.keyword_query = arguments.query
+        settings.api_concurrency = arguments.concurrency
+        settings.api_timeout = arguments.timeout
+        settings.api_retries = arguments.retries
+        settings.profile = arguments.profile
+
+        if (arguments.startup_report):
+            startup.print_report(time.perf_counter() - STARTED)
+
+        if (arguments.clear_cache):
+            import cache
+
+            print(f'Removed {cache.clear()} cache files')
+
+        if (arguments.dataset == 'serve'):
+            import server
+
+            server.serve(arguments.host, arguments.port)
+        elif (arguments.dataset is None):
+            if (not arguments.clear_cache and not arguments.startup_report):
+                main_cli()
+        elif (arguments.filter is None):
             raise Exception('Not enough arguments. Usage: python main.py' \
                 +' <index of dataset> <index of filter>')
+        else:
+            main_args(arguments.dataset, arguments.filter,
+                      arguments.post == 'post')
     except ValueError:        
         print('\nSorry, only numbers are valid! Try again\n')
     except Exception as e:
         traceback.print_exc()
-        sys.exit(f'\nUnexpected error! Exiting.\nThe error: ** {e} ** \n')
\ No newline at end of file
+        sys.exit(f'\nUnexpected error! Exiting.\nThe error: ** {e} ** \n')
+    finally:
+        if (settings.profile):
+            import profiling
+
+            profiling.print_report()
+            profiling.write_trace(arguments.profile_output)
\ No newline at end of file
@@ -2,16 +2,37 @@
 This module contains functions for processing the measures/restrictions dataset
 """
 
-import api
-import json
-import pycountry
+import re
+import sys
+import cache
+import ranking
+import parallel
+import incremental
+import settings
+import profiling
+import serializer
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from commons import prompt_user
-from urllib.parse import urlparse
-from file_export import write_measures_data
-from constants import MeasuresFilter, TOP_N, REMAINING_ISO_CODES
-from datatypes import MeasuresGroupData, MeasuresData, MeasuresGeneralData
+from schemas import read_dataset, get_projection
+from commons import prompt_user, get_derived, set_derived
+from collections import Counter
+from aggregates import SpillStore
+from queries import parse_query
+from intervals import IntervalIndex, get_day, get_date_strings
+from concurrent.futures import ThreadPoolExecutor
+from file_export import (write_measures_data, write_measures_stream,
+                         get_measures_filenames, read_files)
+from constants import (MeasuresFilter, MEASURES_METRICS, MEASURES_RANKINGS,
+                       MEASURES_SCHEMA, DATE_FORMAT, MEASURES_PROJECTIONS,
+                       MEASURES_FILTER_PROJECTIONS, MEASURES_DATE_FILTERS,
+                       MEASURES_KEYWORD_FILTERS, KEYWORD_QUERY)
+from keywords import (explode_keywords, select_rows, get_keyword_lists,
+                      count_keywords, get_histograms, get_histogram,
+                      get_keyword_index, KeywordIndex)
+from normalization import get_iso_codes, get_url_domains
+from datatypes import (MeasuresGroupData, MeasuresDataBatch,
+                       MeasuresGeneralData, MeasuresActivityBatch,
+                       MeasuresQueryHitsBatch, RecordBatch)
 
 
 def _get_series_count(series):
@@ -19,175 +40,201 @@ def _get_series_count(series):
     Returns a structure with the count of keywords for the input keyword series
     """
     raw_count = dict(series.value_counts().sort_index())
-    return [{"keywords": keyword, "count": int(count)}
+    return [{"keywords": keyword, "count": count}
             for keyword, count in raw_count.items()]
 
 
-def _get_from_nan_col(value, is_list):
+def _get_nullable_list(values, present = None):
     """
-    Returne None if the value is nan; otherwise, returns the value
+    Returns the values of the input Series as a list, with None in place of
+    its missing values (or of the values outside the present mask, if given)
     """
-    result = None
-    if (pd.notna(value)):
-        if (is_list):
-            result = value.split(', ')
-        else:
-            result = value
-    return result
+    if (present is None):
+        present = values.notna()
+    return values.astype(object).where(present, None).tolist()
 
 
-def _get_separated_keywords(original_keywords_series):
+def _get_formatted_dates(dates_series):
     """
-    Returns a Series with all independent keywords from the keywords Series
-    (separated from comma lists)
+    Returns the dates of the input Series (already parsed, or in the
+    'Mar 16, 2020' format) as a list of 'YYYY-MM-DD' strings, with None in
+    place of missing dates
     """
-    keywords_list = []
+    dates = pd.to_datetime(dates_series, format = DATE_FORMAT)
+    return _get_nullable_list(dates.dt.strftime('%Y-%m-%d'), dates.notna())
 
-    [[keywords_list.append(key) for key in record.split(', ')]
-     for record in original_keywords_series.values.tolist()]
 
-    return pd.Series(keywords_list)
+def _get_split_lists(list_series):
+    """
+    Returns the comma lists of the input Series as a list of lists of strings,
+    with None in place of missing values
+    """
+    return _get_nullable_list(list_series.str.split(', '))
 
 
-def _pack_records(country_gb, limit = None):
+def _get_quantities(quantity_series):
     """
-    From a filtered grouped dataframe, return a list with MeasuresGroupData and
-    MeasuresData lists
-    Precondition: The dataset has been normalized and contains the 'Code',
-    'Source Domain' and 'Keywords Count' columns
+    Returns the quantities of the input Series as a list of integers, with
+    None in place of missing or zero quantities
     """
-    measure_records = []
-    measure_data = []
+    present = quantity_series.notna() & (quantity_series != 0)
+    quantities = quantity_series.where(present, 0).astype('int64')
+    return _get_nullable_list(quantities, present)
 
-    for country_name, country_group in list(country_gb)[:limit]:
-        iso_code = ""
 
-        if (type(country_name) is tuple):
-            iso_code = country_name[1].lower()
-        else:
-            iso_code = country_name.lower()
-
-        separated_keywords = _get_separated_keywords(country_group['Keywords'])
-        keywords_count = _get_series_count(separated_keywords)
-        keywords_total = int(country_group['Keywords Count'].values[0])
-        records_total = int(country_group['Records Count'].values[0])
-        raw_sources_count = dict(country_group['Source Domain'].value_counts())
-
-        sources_count = [{"sources": source, "count": int(count)}
-                         for source, count in raw_sources_count.items()]
-
-        new_record = MeasuresGroupData(code = iso_code,
-                                       keywords_count = keywords_count,
-                                       keywords_total = keywords_total,
-                                       keywords_records_total = records_total,
-                                       sources_count = sources_count)
-
-        measure_records.append(new_record)
-
-        for index, row in country_group.iterrows():
-            n_date_start = row['Date Start']
-            date_start = None
-            if (pd.notna(n_date_start)):
-                dt_start = datetime.strptime(n_date_start, '%b %d, %Y')
-                date_start = dt_start.strftime('%Y-%m-%d')
-
-            n_date_end = row['Date end intended']
-            date_end = None
-            if (pd.notna(n_date_end)):
-                dt_end = datetime.strptime(n_date_end, '%b %d, %Y')
-                date_end = dt_end.strftime('%Y-%m-%d')
-
-            description = _get_from_nan_col(
-                              row['Description of measure implemented'], False)
-
-            raw_quantity = _get_from_nan_col(row['Quantity'], False)
-            quantity = None
-            if (raw_quantity):
-                quantity = int(raw_quantity)
-                              
-            exceptions = _get_from_nan_col(row['Exceptions'], True)
-
-            keywords = row['Keywords'].split(', ')
-
-            implementing_cities = _get_from_nan_col(row['Implementing City'],
-                                                    True)
-            implementing_states = _get_from_nan_col(
-                                      row['Implementing State/Province'], True)
-            target_countries = _get_from_nan_col(row['Target country'], True)
-            target_regions = _get_from_nan_col(row['Target region'], True)
-
-            source = _get_from_nan_col(row['Source'], False)
-
-            new_data = MeasuresData(code = iso_code,
-                                    date_start = date_start,
-                                    date_end = date_end,
-                                    description = description,
-                                    keywords = keywords,
-                                    exceptions = exceptions,
-                                    quantity = quantity,
-                                    implementing_cities = implementing_cities,
-                                    implementing_states = implementing_states,
-                                    target_countries = target_countries,
-                                    target_regions = target_regions,
-                                    source = source)
-
-            measure_data.append(new_data)
-
-    return [measure_records, measure_data]
-
-
-def _country_to_iso(country):
-    """
-    Returns the ISO 3166 - alpha 2 code for a given country name
-    """
-    if (country.startswith('US:')):
-      return 'US'
-    else:
-        result = pycountry.countries.get(name = country)
-        if (not result):
-          return REMAINING_ISO_CODES[country]
-        else:
-          return result.alpha_2
+def _get_keywords_table(data):
+    """
+    Returns the long table of the keywords of the measures of the dataset
+    (of keywords.explode_keywords), which is exploded once for each loaded
+    dataset or chunk
+    """
+    return get_derived(data, 'keywords_table',
+                       lambda: explode_keywords(data['Keywords'] \
+                                                    .str.split(', ')))
 
 
-def _get_url_domain(url):
+def _get_measures_data(data, keyword_lists):
     """
-    Retrieves the domain from the input URL
+    Returns the MeasuresDataBatch with every record of the dataset, building
+    each field column-wise, given the list with the keyword list of each
+    record
+    Precondition: The dataset has been normalized and contains the 'Code'
+    column
     """
-    if (pd.notna(url)):
-        return urlparse(url).netloc
-    else:
-        return pd.NA
+    return MeasuresDataBatch(
+               code = data['Code'].str.lower().tolist(),
+               date_start = _get_formatted_dates(data['Date Start']),
+               date_end = _get_formatted_dates(data['Date end intended']),
+               description = _get_nullable_list(
+                                 data['Description of measure implemented']),
+               keywords = keyword_lists,
+               exceptions = _get_split_lists(data['Exceptions']),
+               quantity = _get_quantities(data['Quantity']),
+               implementing_cities = _get_split_lists(
+                                         data['Implementing City']),
+               implementing_states = _get_split_lists(
+                                         data['Implementing State/Province']),
+               target_countries = _get_split_lists(data['Target country']),
+               target_regions = _get_split_lists(data['Target region']),
+               source = _get_nullable_list(data['Source']))
+
+
+def _get_group_record(iso_code, country_group, keywords_count):
+    """
+    Returns the MeasuresGroupData object of a country group, given its
+    keyword histogram
+    Precondition: The dataset has been normalized and contains the 'Source
+    Domain', 'Keywords Count' and 'Records Count' columns
+    """
+    keywords_total = country_group['Keywords Count'].values[0]
+    records_total = country_group['Records Count'].values[0]
+    raw_sources_count = dict(country_group['Source Domain'].value_counts())
+
+    sources_count = [{"sources": source, "count": count}
+                     for source, count in raw_sources_count.items()]
+
+    return MeasuresGroupData(code = iso_code.lower(),
+                             keywords_count = keywords_count,
+                             keywords_total = keywords_total,
+                             keywords_records_total = records_total,
+                             sources_count = sources_count)
+
+
+@profiling.instrumented('pack_records',
+                        count = lambda records: len(records[0]) +
+                                                len(records[1]))
+def _pack_records(data, codes = None):
+    """
+    From the dataset, returns a list with the MeasuresGroupData objects and
+    the MeasuresDataBatch of the input country codes, following their order
+    (or for all the countries sorted by code if None). The records of each
+    country keep their order in the dataset
+    Precondition: The dataset has been normalized and contains the 'Code',
+    'Source Domain' and 'Keywords Count' columns
+    """
+    if (codes is None):
+        codes = sorted(data['Code'].unique())
+
+    ranks = data['Code'].map(pd.Series(range(len(codes)), index = codes)) \
+                        .to_numpy()
+    rows = np.flatnonzero(~np.isnan(ranks))
+    rows = rows[np.argsort(ranks[rows], kind = 'stable')]
+    country_data = data.iloc[rows]
+    keywords_table = select_rows(_get_keywords_table(data), rows)
+
+    histograms = get_histograms(keywords_table, country_data['Code'])
+    measure_records = [_get_group_record(iso_code, country_group,
+                                         histograms[iso_code])
+                       for iso_code, country_group
+                       in country_data.groupby('Code', sort = False)]
+    keyword_lists = get_keyword_lists(keywords_table, len(country_data))
+
+    return [measure_records, _get_measures_data(country_data, keyword_lists)]
 
 
-def _count_different_keywords(keywords_series):
+def _iter_records(data, codes = None):
     """
-    Returns the count of all unique separated keywords 
+    Lazily yields, for each of the input country codes in their order (or for
+    all the countries sorted by code if None), a list with its
+    MeasuresGroupData object and the MeasuresDataBatch of its records, so that
+    only one country group is packed at a time
+    Precondition: The dataset has been normalized and contains the 'Code',
+    'Source Domain' and 'Keywords Count' columns
     """
-    return len(_get_separated_keywords(keywords_series).unique())
+    group_positions = data.groupby('Code').indices
+    keywords_table = _get_keywords_table(data)
+
+    if (codes is None):
+        codes = sorted(group_positions)
+
+    for iso_code in codes:
+        country_group = data.iloc[group_positions[iso_code]]
+        country_table = select_rows(keywords_table,
+                                    group_positions[iso_code])
+        histogram = get_histogram(country_table)
+
+        yield [_get_group_record(iso_code, country_group, histogram),
+               _get_measures_data(country_group,
+                                  get_keyword_lists(country_table,
+                                                    len(country_group)))]
 
 
-def _count_keywords_records(keywords_series):
+def _report_unresolved(unresolved):
     """
-    Returns the count of all unique separated keywords 
+    Prints the sorted country names whose ISO code could not be found, if
+    there are any
     """
-    return len(_get_separated_keywords(keywords_series))
+    if (unresolved):
+        print(f'Could not find the ISO code of {len(unresolved)} countries, '
+              'so their records are skipped:')
+        print(', '.join(unresolved))
 
 
-def _transform_measures_dataset(data):
+def _transform_measures_dataset(data, report = True):
     """
-    Deletes records with empty values on the 'Keywords' and 'Country' columns,
-    adds the 'Code' column with the ISO 3166 - alpha 2 code of the country
-    names in 'Country', and adds the 'Source Domain' column with the domain of
-    the urls in 'Source'
+    Deletes records with empty values on the 'Keywords' and 'Country'
+    columns, adds the 'Code' column with the ISO 3166 - alpha 2 code of the
+    country names in 'Country' (deleting the records whose country could not
+    be resolved, which are reported together unless report is False), and
+    adds the 'Source Domain' column with the domain of the urls in 'Source'.
+    Returns the sorted country names that could not be resolved
     """
     data.dropna(subset = ['Keywords', 'Country'], inplace = True)
-    data['Code'] = data['Country'].apply(_country_to_iso)
-    data['Source Domain'] = data['Source'].apply(_get_url_domain)
-    data['Keywords Count'] = data.groupby('Code')['Keywords'] \
-                                     .transform(_count_different_keywords)
-    data['Records Count'] = data.groupby('Code')['Keywords'] \
-                                     .transform(_count_keywords_records)
+    iso_codes, unresolved = get_iso_codes(data['Country'])
+
+    if (report):
+        _report_unresolved(unresolved)
+
+    data['Code'] = iso_codes
+    data.dropna(subset = ['Code'], inplace = True)
+    data['Source Domain'] = get_url_domains(data['Source'])
+    different_counts, records_counts = count_keywords(
+                                           _get_keywords_table(data),
+                                           data['Code'])
+    data['Keywords Count'] = data['Code'].map(different_counts)
+    data['Records Count'] = data['Code'].map(records_counts)
+
+    return unresolved
 
 
 def _process_without_filter(data):
@@ -195,36 +242,58 @@ def _process_without_filter(data):
     Returns the basic structure for the whole dataset without filter
     Precondition: the dataset has been normalized and it has the 'Code' column
     """
-    country_gb = data.groupby('Code')
-    return _pack_records(country_gb)
+    return _pack_records(data)
 
 
-def _process_by_measure_count(data, ascending = False):
+def _get_metric_column(filter_metric):
     """
-    Returns the basic structure for the dataset, filtering by the N top or
-    bottom countries with a number 
-    Precondition: the dataset has been normalized and it has the 'Code' and
-    'Keywords Count' columns
+    Returns the column of the metric chosen for the ranking filters, or the
+    input metric of the filter if none was chosen
     """
-    country_gb = data.groupby('Code')
-    sorted_data = data.sort_values(['Keywords Count'], ascending = ascending)
-    country_gb = sorted_data.groupby(['Keywords Count','Code'], sort = False)
-
-    return _pack_records(country_gb, TOP_N)
+    if (settings.ranking_metric is None):
+        return filter_metric
+    elif (settings.ranking_metric not in MEASURES_METRICS):
+        raise Exception(f'"{settings.ranking_metric}" is not a metric of the '
+                        'measures dataset')
+    else:
+        return MEASURES_METRICS[settings.ranking_metric]
 
 
-def _process_by_records_count(data, ascending = False):
+def _get_ranked_codes(data, category):
     """
-    Returns the basic structure for the dataset, filtering by the N top or
-    bottom countries with a number 
-    Precondition: the dataset has been normalized and it has the 'Code' and
-    'Keywords Count' columns
+    Selects the N top and/or bottom countries by a metric, according to the
+    ranking settings (which default to the ones of the input ranking filter),
+    and returns a list with the [export name, country codes] pair of every
+    ranked direction
+    Precondition: the dataset has been normalized and it has the 'Code',
+    'Keywords Count' and 'Records Count' columns
     """
-    country_gb = data.groupby('Code')
-    sorted_data = data.sort_values(['Records Count'], ascending = ascending)
-    country_gb = sorted_data.groupby(['Records Count','Code'], sort = False)
-
-    return _pack_records(country_gb, TOP_N)
+    filter_metric, filter_direction = MEASURES_RANKINGS[category]
+    metric = _get_metric_column(filter_metric)
+    count = settings.ranking_count
+    directions = ranking.get_directions(filter_direction,
+                                        settings.ranking_direction)
+    aggregate = data.drop_duplicates('Code').set_index('Code').sort_index()
+    rankings = ranking.rank(aggregate, metric, count, directions)
+
+    return [[ranking.get_export_name(MeasuresFilter(category).name,
+                                     MEASURES_RANKINGS[category], metric,
+                                     direction, count),
+             rankings[direction]]
+            for direction in directions]
+
+
+def _process_ranking(data, category):
+    """
+    Returns the basic structure for the dataset, filtering by the N top and/or
+    bottom countries by a metric according to the ranking settings (which
+    default to the ones of the input ranking filter), as a list with the
+    [export name, records] pair of every ranked direction
+    Precondition: the dataset has been normalized and it has the 'Code',
+    'Keywords Count' and 'Records Count' columns
+    """
+    return [[name, _pack_records(data, codes)]
+            for name, codes in _get_ranked_codes(data, category)]
 
 
 def _process_general_information(data):
@@ -238,8 +307,7 @@ def _process_general_information(data):
     m_counts = dict(zip(unique_counts['Code'],
                         unique_counts['Keywords Count']))
 
-    separated_keywords = _get_separated_keywords(data['Keywords'])
-    keywords_count = _get_series_count(separated_keywords)
+    keywords_count = get_histogram(_get_keywords_table(data))
 
     sources_count = _get_series_count(data['Source Domain'])
 
@@ -250,41 +318,999 @@ def _process_general_information(data):
     return [general_data] # TODO: Including detail data - To be Determined
 
 
-def _filter_measures(category, sampling = False):
+def _get_interval_index(data):
+    """
+    Returns the IntervalIndex of the date ranges of the measures of the
+    dataset (labeled by country code), which is built once for each loaded
+    dataset
+    Precondition: the dataset has been normalized and it has the 'Code' column
+    """
+    return get_derived(data, 'interval_index',
+                       lambda: IntervalIndex(data['Code'].to_numpy(),
+                                             data['Date Start'],
+                                             data['Date end intended']))
+
+
+def _build_keyword_index(data):
+    """
+    Returns the KeywordIndex of the keywords of the measures of the dataset
+    Precondition: the dataset has been normalized and it has the 'Code' column
+    """
+    with profiling.stage('keyword_index', len(data)):
+        return get_keyword_index(_get_keywords_table(data),
+                                 data['Code'])
+
+
+def _get_keyword_index(data):
+    """
+    Returns the KeywordIndex of the keywords of the measures of the dataset,
+    which is built once for each loaded dataset
+    Precondition: the dataset has been normalized and it has the 'Code' column
+    """
+    return get_derived(data, 'keyword_index',
+                       lambda: _build_keyword_index(data))
+
+
+def _get_filter_index(data, category):
+    """
+    Returns the index of the dataset that answers a date filter (its
+    IntervalIndex) or a keyword filter (its KeywordIndex)
+    """
+    if (category in MEASURES_DATE_FILTERS):
+        return _get_interval_index(data)
+
+    return _get_keyword_index(data)
+
+
+def _get_date_export_name(category):
+    """
+    Returns the name of the exported files of a date filter, which is the one
+    of the filter unless a date (or range of dates) was chosen
+    """
+    if (category == MeasuresFilter.ACTIVE_MEASURES_ON_DATE.value and
+        settings.active_date is not None):
+        return 'ACTIVE_MEASURES_ON_' + settings.active_date.replace('-', '_')
+    elif (category == MeasuresFilter.DAILY_ACTIVE_MEASURES.value and
+          settings.active_range is not None):
+        first_date, last_date = settings.active_range
+        return f'DAILY_ACTIVE_MEASURES_{first_date}_TO_{last_date}' \
+                   .replace('-', '_')
+
+    return MeasuresFilter(category).name
+
+
+def _select_active_measures(index):
+    """
+    Returns a list with the MeasuresActivityBatch of the countries with
+    measures active on the date of the settings (or the last start date),
+    sorted by code, and the positions of their active measures, sorted by
+    country and then by position. Only the countries of the country codes
+    setting are selected, if any
+    """
+    if (settings.active_date is None):
+        day = index.last_day
+    else:
+        day = get_day(settings.active_date)
+
+    with profiling.stage('interval_query', len(index)):
+        groups, positions = index.query_active(day, settings.country_codes)
+        active_groups, counts = np.unique(groups, return_counts = True)
+
+    activity = MeasuresActivityBatch(
+                   code = [iso_code.lower() for iso_code
+                           in index.labels[active_groups]],
+                   date = get_date_strings(np.full(len(counts), day)),
+                   active_count = counts)
+
+    return [activity, positions]
+
+
+def _get_daily_activity(index):
+    """
+    Returns the MeasuresActivityBatch with the number of measures active on
+    every day of the range of the settings (or the range of the start
+    dates), for every country (of the country codes setting, if any), sorted
+    by code and then by date
+    """
+    if (settings.active_range is None):
+        first_day, last_day = index.first_day, index.last_day
+    else:
+        first_day, last_day = [get_day(date) for date
+                               in settings.active_range]
+
+    with profiling.stage('interval_query', len(index)):
+        groups, counts = index.count_daily(first_day, last_day,
+                                           settings.country_codes)
+
+    dates = get_date_strings(np.arange(first_day, last_day + 1))
+
+    return MeasuresActivityBatch(
+               code = np.repeat([iso_code.lower() for iso_code
+                                 in index.labels[groups]], len(dates)),
+               date = np.tile(dates, len(groups)),
+               active_count = counts.ravel())
+
+
+def _get_keyword_export_name(category):
+    """
+    Returns the name of the exported files of a keyword filter, which is the
+    one of the filter followed by the keyword query unless it is the default
+    one
+    """
+    name = MeasuresFilter(category).name
+
+    if (settings.keyword_query == KEYWORD_QUERY):
+        return name
+
+    return name + '_' + re.sub('[^A-Z0-9]+', '_',
+                               settings.keyword_query.upper()).strip('_')
+
+
+def _select_keyword_matches(index):
+    """
+    Returns a list with the MeasuresQueryHitsBatch of the countries with
+    measures that match the keyword query of the settings, sorted by code,
+    and the positions of the matching measures, sorted by country and then
+    by position. Only the countries of the country codes setting are
+    selected, if any
+    """
+    with profiling.stage('keyword_query', index.size):
+        codes, counts, positions = index.query(
+                                       parse_query(settings.keyword_query),
+                                       settings.country_codes)
+
+    hits = MeasuresQueryHitsBatch(
+               code = [iso_code.lower() for iso_code in codes],
+               query = [settings.keyword_query] * len(codes),
+               hits_count = counts)
+
+    return [hits, positions]
+
+
+def _select_records(category, index):
+    """
+    Returns a list with the export name of a date or keyword filter, the
+    batch of its general data (the activity or the query hits of the
+    countries), and the positions of its measures in the input index of the
+    filter (IntervalIndex or KeywordIndex), which are None for the daily
+    active measures and keyword query counts filters
+    """
+    if (category == MeasuresFilter.DAILY_ACTIVE_MEASURES.value):
+        return [_get_date_export_name(category), _get_daily_activity(index),
+                None]
+    elif (category == MeasuresFilter.ACTIVE_MEASURES_ON_DATE.value):
+        return [_get_date_export_name(category)] + \
+               _select_active_measures(index)
+
+    hits, positions = _select_keyword_matches(index)
+
+    if (category == MeasuresFilter.KEYWORD_QUERY_COUNTS.value):
+        positions = None
+
+    return [_get_keyword_export_name(category), hits, positions]
+
+
+def _process_index_filter(data, category):
+    """
+    Returns the structure of a date or keyword filter as a list with its
+    [export name, records] pair. The records are the batch of its general
+    data and, except for the daily active measures and keyword query counts
+    filters, the MeasuresDataBatch of its measures
+    Precondition: the dataset has been normalized and it has the 'Code'
+    column
+    """
+    name, general, positions = _select_records(category,
+                                               _get_filter_index(data,
+                                                                 category))
+
+    if (positions is None):
+        return [[name, [general]]]
+
+    keyword_lists = get_keyword_lists(select_rows(_get_keywords_table(data),
+                                                  positions),
+                                      len(positions))
+
+    return [[name, [general,
+                    _get_measures_data(data.iloc[positions],
+                                       keyword_lists)]]]
+
+
+def _get_index_exports(category, index, serialize_measures):
+    """
+    Returns the list with the [export name, serialized data] pair of a date
+    or keyword filter from its index (IntervalIndex or KeywordIndex), given
+    the function that returns the serialized MeasuresData of the input
+    positions of the index
+    """
+    name, general, positions = _select_records(category, index)
+    general_data = general.dumps()
+
+    if (positions is None):
+        return [[name, [general_data]]]
+
+    return [[name, [general_data, serialize_measures(positions)]]]
+
+
+def _read_measures_dataset(sampling = False, projection = 'records'):
+    """
+    Reads the measures dataset from its CSV file and returns it transformed.
+    If the sampling parameter is set to true, only a number of records will be
+    taken from the dataset according to the value of the
+    MeasuresFilter.SAMPLE_RECORDS constant. Only the columns of the input
+    projection (of MEASURES_PROJECTIONS) are read, with the MEASURES_SCHEMA
+    types, so the dates are already parsed
+    """
+    with profiling.stage('read_csv', label = projection) as read_stage:
+        data = read_dataset(MeasuresFilter.DATA_FILENAME.value,
+                            MEASURES_SCHEMA,
+                            MEASURES_PROJECTIONS[projection])
+        read_stage.count(len(data))
+
+    if sampling:
+        data = data.head(MeasuresFilter.SAMPLE_RECORDS.value)
+
+    with profiling.stage('transform', len(data)):
+        _transform_measures_dataset(data)
+
+    return data
+
+
+@profiling.instrumented('load_dataset', count = len, label = 'measures')
+def load_measures_dataset(sampling = False, projection = 'records'):
+    """
+    Returns the transformed measures dataset with the columns of the input
+    projection, taking it from the cache when the CSV file has not changed
+    since it was stored
+    """
+    name = ('measures_sample' if sampling else 'measures') + f'_{projection}'
+
+    try:
+        return cache.load_dataset(MeasuresFilter.DATA_FILENAME.value, name,
+                                  lambda: _read_measures_dataset(sampling,
+                                                                 projection))
+    except FileNotFoundError:
+        print(f'The file "{MeasuresFilter.DATA_FILENAME.value}" does not '
+              'exist')
+        sys.exit('No file, no execution... Stopping!')
+    except ValueError as e:
+        print(e)
+        sys.exit('Invalid file, no execution... Stopping!')
+
+
+def _filter_measures(category, sampling = False, data = None):
     """
     Returns the dataset (pandas.core.frame.DataFrame) filtered by the input
     filter category. If the sampling parameter is set to true, only a number
     of records will be taken from the dataset according to the value of the
-    MeasuresFilter.SAMPLE_RECORDS constant
-    The returned structure is a list with two elements:
-    [0]: General structure for country information
-    [1]: Information for restrictions
+    MeasuresFilter.SAMPLE_RECORDS constant. An already loaded dataset can be
+    given through the data parameter, in which case it is not read again
+    The returned structure is a list with an [export name, records] pair for
+    each output of the filter (ranking filters can output both directions),
+    where the records are a list with two elements:
+    [0]: General structure for country information (or the activity or the
+    query hits of the countries, for the date and keyword filters)
+    [1]: Information for restrictions (missing for the daily active measures
+    and keyword query counts filters)
     """
+    if (data is None):
+        data = load_measures_dataset(sampling,
+                                     MEASURES_FILTER_PROJECTIONS[category])
+
+    if (category == MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value):
+        records = _process_without_filter(data)
+    elif (category in MEASURES_RANKINGS):
+        return _process_ranking(data, category)
+    elif (category in MEASURES_DATE_FILTERS or
+          category in MEASURES_KEYWORD_FILTERS):
+        return _process_index_filter(data, category)
+    else:
+        records = _process_general_information(data)
+
+    return [[MeasuresFilter(category).name, records]]
+
+
+def _serialize_records(records, filter_option):
+    """
+    Returns a list with the JSON strings of the general data and, except for
+    the general statistics, daily active measures and keyword query counts
+    filters, the measures data of the filtered records
+    """
+    if (filter_option != MeasuresFilter.GENERAL_STATISTICS.value):
+        with profiling.stage('to_json') as json_stage:
+            json_lists = [records_list
+                          if isinstance(records_list, RecordBatch)
+                          else [r.to_json() for r in records_list]
+                          for records_list in records]
+
+            json_stage.count(sum(len(json_list) for json_list in json_lists))
+
+        with profiling.stage('json_dumps'):
+            return [json_list.dumps() if isinstance(json_list, RecordBatch)
+                    else serializer.dumps(json_list)
+                    for json_list in json_lists]
+    else:
+        with profiling.stage('to_json', 1):
+            general_json_list = records[0].to_json()
+
+        with profiling.stage('json_dumps'):
+            general_data = serializer.dumps(general_json_list)
+
+        return [general_data]
+
+
+def _serialize_shard(shard):
+    """
+    Packs the records of a shard of countries, given its rows, country codes
+    and keywords table, and returns the serialized items of its general and
+    measures data (run by the worker processes)
+    """
+    rows, codes, keywords_table = shard
+    set_derived(rows, 'keywords_table', keywords_table)
+    records = _pack_records(rows, codes)
+
+    return [serializer.dumps_items([r.to_json() for r in records[0]]),
+            records[1].dumps_items()]
+
+
+def _serialize_parallel(data, codes):
+    """
+    Returns the JSON strings of the general and measures data of the input
+    country codes (following their order), packed by a pool of worker
+    processes
+    """
+    keywords_table = _get_keywords_table(data)
+    shards = [[rows, shard_codes,
+               select_rows(keywords_table, data.index.get_indexer(rows.index))]
+              for rows, shard_codes in parallel.get_shards(data, 'Code', codes,
+                                                           settings.workers)]
+    fragments = parallel.map_shards(_serialize_shard, shards,
+                                    settings.workers)
+
+    return [serializer.join_items([general for general, types in fragments]),
+            serializer.join_items([types for general, types in fragments])]
+
+
+def _get_filter_name(filter_option, *args, **kwargs):
+    """
+    Returns the qualified name of the input filter option (the label of its
+    profiling stage)
+    """
+    return str(MeasuresFilter(filter_option))
+
+
+@profiling.instrumented('filter', label = _get_filter_name)
+def get_serialized_filter(filter_option, sampling = False, data = None):
+    """
+    Filters the dataset by the input filter option and returns a list with
+    the [export name, serialized data] pair of each output. If several
+    workers are set, the records of the countries are packed in parallel
+    """
+    if (settings.workers > 1 and
+        (filter_option == MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value or
+         filter_option in MEASURES_RANKINGS)):
+        if (data is None):
+            data = load_measures_dataset(
+                       sampling, MEASURES_FILTER_PROJECTIONS[filter_option])
+
+        if (filter_option ==
+            MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value):
+            selections = [[MeasuresFilter(filter_option).name,
+                           sorted(data['Code'].unique())]]
+        else:
+            selections = _get_ranked_codes(data, filter_option)
+
+        return [[name, _serialize_parallel(data, codes)]
+                for name, codes in selections]
+
+    return [[name, _serialize_records(records, filter_option)]
+            for name, records in _filter_measures(filter_option, sampling,
+                                                  data)]
+
+
+def _get_counted_group(iso_code, country):
+    """
+    Returns the MeasuresGroupData JSON object of a country from its keyword
+    and source counters. Its sources are sorted by count, keeping their order
+    of appearance on ties
+    """
+    keywords = country['keywords']
+    keywords_count = [{"keywords": keyword, "count": count}
+                      for keyword, count in sorted(keywords.items())]
+    sources_count = [{"sources": source, "count": count}
+                     for source, count in sorted(country['sources'].items(),
+                                                 key = lambda item: -item[1])]
+
+    return MeasuresGroupData(code = iso_code.lower(),
+                             keywords_count = keywords_count,
+                             keywords_total = len(keywords),
+                             keywords_records_total = sum(keywords.values()),
+                             sources_count = sources_count).to_json()
+
+
+def _fold_measures_chunk(countries, spill, chunk):
+    """
+    Transforms a chunk of the measures dataset and folds it into the keyword
+    and source counters, the date ranges, the (row, keyword) pairs, the
+    number of rows and the first position of each country, spilling the
+    MeasuresData JSON objects of its records to the input SpillStore.
+    Returns the sorted country names of the chunk that could not be
+    resolved, which are reported once for all the chunks
+    """
+    unresolved = _transform_measures_dataset(chunk, report = False)
+    keyword_lists = get_keyword_lists(_get_keywords_table(chunk), len(chunk))
+    records = _get_measures_data(chunk, keyword_lists).to_json()
+    domains = chunk['Source Domain'].tolist()
+    starts = pd.to_datetime(chunk['Date Start'], format = DATE_FORMAT) \
+               .to_numpy()
+    ends = pd.to_datetime(chunk['Date end intended'], format = DATE_FORMAT) \
+             .to_numpy()
+
+    for iso_code, indexes in chunk.groupby('Code', sort = False) \
+                                  .indices.items():
+        country = countries.setdefault(iso_code, {
+            'keywords': Counter(),
+            'sources': Counter(),
+            'starts': [],
+            'ends': [],
+            'keyword_rows': [],
+            'keyword_labels': [],
+            'rows': 0,
+            'position': chunk.index[indexes[0]]
+        })
+        lengths = [len(keyword_lists[index]) for index in indexes]
+        ranks = np.arange(country['rows'], country['rows'] + len(indexes))
+
+        country['keywords'].update(keyword for index in indexes
+                                   for keyword in keyword_lists[index])
+        country['sources'].update(domains[index] for index in indexes
+                                  if isinstance(domains[index], str))
+        country['starts'].append(starts[indexes])
+        country['ends'].append(ends[indexes])
+        country['keyword_rows'].append(np.repeat(ranks, lengths))
+        country['keyword_labels'].append(np.array(
+            [sys.intern(keyword) for index in indexes
+             for keyword in keyword_lists[index]], dtype = object))
+        country['rows'] += len(indexes)
+        spill.append(iso_code, [records[index] for index in indexes])
+
+    return unresolved
+
+
+@profiling.instrumented('read_chunks')
+def _read_measures_chunks(sampling = False):
+    """
+    Reads the measures dataset from its CSV file one chunk of rows at a time
+    (according to the chunk size setting), folding every chunk into
+    mergeable per-country counters, and returns a dictionary with:
+    - groups: MeasuresGroupData JSON object of every country code
+    - codes: country codes in order of first appearance in the dataset
+    - spill: SpillStore with the MeasuresData JSON objects of every country,
+    which must be closed once the dataset is no longer needed
+    - intervals: IntervalIndex of the date ranges of the records of every
+    country, with the records of the countries sorted by code one after
+    another
+    - keywords: KeywordIndex of the keywords of the records, in the same
+    order
+    - offsets: position of the first record of each of those countries
+    """
+    nrows = MeasuresFilter.SAMPLE_RECORDS.value if sampling else None
+    countries = {}
+    unresolved = set()
+    spill = SpillStore()
+
     try:
-        data = pd.read_csv(MeasuresFilter.DATA_FILENAME.value)
+        # The text columns are read as such even when a chunk has no values
+        columns = pd.read_csv(MeasuresFilter.DATA_FILENAME.value,
+                              nrows = 0).columns
+        text_types = {column: str for column in columns
+                      if column != 'Quantity'}
+
+        for chunk in pd.read_csv(MeasuresFilter.DATA_FILENAME.value,
+                                 chunksize = settings.chunk_size,
+                                 nrows = nrows, dtype = text_types):
+            unresolved.update(_fold_measures_chunk(countries, spill, chunk))
+    except FileNotFoundError:
+        spill.close()
+        print(f'The file "{MeasuresFilter.DATA_FILENAME.value}" does not '
+              'exist')
+        sys.exit('No file, no execution... Stopping!')
+    except ValueError as e:
+        spill.close()
+        print(e)
+        sys.exit('Invalid file, no execution... Stopping!')
+
+    _report_unresolved(sorted(unresolved))
+    sorted_codes = sorted(countries)
+    sizes = np.array([countries[iso_code]['rows']
+                      for iso_code in sorted_codes], dtype = 'int64')
+    offsets = np.cumsum(sizes) - sizes
+    row_codes = np.repeat(sorted_codes, sizes)
+    get_folded = lambda key, empty: np.concatenate(
+                     [empty] + [array for iso_code in sorted_codes
+                                for array in countries[iso_code][key]])
+    no_dates = np.array([], dtype = 'datetime64[ns]')
+    keyword_offsets = np.repeat(offsets, [sum(map(len, countries[iso_code]
+                                                       ['keyword_rows']))
+                                          for iso_code in sorted_codes])
+
+    return {
+        'groups': {iso_code: _get_counted_group(iso_code, country)
+                   for iso_code, country in countries.items()},
+        'codes': sorted(countries, key = lambda iso_code:
+                                          countries[iso_code]['position']),
+        'spill': spill,
+        'intervals': IntervalIndex(row_codes,
+                                   get_folded('starts', no_dates),
+                                   get_folded('ends', no_dates)),
+        'keywords': KeywordIndex(get_folded('keyword_rows',
+                                            np.array([], dtype = 'int64')) +
+                                 keyword_offsets,
+                                 get_folded('keyword_labels',
+                                            np.array([], dtype = object)),
+                                 row_codes),
+        'offsets': pd.Series(offsets, index = sorted_codes)
+    }
+
+
+def _get_spilled_measures(data, positions):
+    """
+    Returns the serialized MeasuresData of the records of the chunked dataset
+    at the input positions of its indexes (sorted by country and then by
+    position), reading the spilled records of each country once
+    """
+    offsets = data['offsets']
+    country_ids = np.searchsorted(offsets.to_numpy(), positions,
+                                  side = 'right') - 1
+    measures_json = []
 
-        if sampling:
-            data = data.head(MeasuresFilter.SAMPLE_RECORDS.value)
+    for country_id, country_positions in pd.Series(positions) \
+                                             .groupby(country_ids):
+        records = data['spill'].read(offsets.index[country_id])
+        measures_json.extend(records[position - offsets.iloc[country_id]]
+                             for position in country_positions)
 
-        _transform_measures_dataset(data)
-        
-        if (category == MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value):
-            return _process_without_filter(data)
-        elif (category == MeasuresFilter.TOP_COUNTRIES_MEASURE_COUNT.value):
-            return _process_by_measure_count(data)
-        elif (category == MeasuresFilter.BOTTOM_COUNTRIES_MEASURE_COUNT.value):
-            return _process_by_measure_count(data, ascending = True)
-        elif (category == MeasuresFilter.TOP_COUNTRIES_RECORDS_COUNT.value):
-            return _process_by_records_count(data)
-        elif (category == MeasuresFilter.BOTTOM_COUNTRIES_RECORDS_COUNT.value):
-            return _process_by_records_count(data, ascending = True)
+    return serializer.dumps(measures_json)
+
+
+@profiling.instrumented('chunk_filter', label = _get_filter_name)
+def _chunk_filter(filter_option, sampling = False, data = None):
+    """
+    Writes the JSON files of the input filter option from the chunked dataset
+    (read for this filter if not given), one country at a time, and returns
+    the list of [export name, file names] pairs of its outputs
+    """
+    if (data is None):
+        data = _read_measures_chunks(sampling)
+
+        with data['spill']:
+            return _chunk_filter(filter_option, data = data)
+
+    name = MeasuresFilter(filter_option).name
+
+    if (filter_option == MeasuresFilter.GENERAL_STATISTICS.value):
+        general_data = _get_summed_general_information(data['groups'],
+                                                       data['codes'])
+        write_measures_data(name, serializer.dumps(general_data.to_json()))
+        return [[name, get_measures_filenames(name)[:1]]]
+    elif (filter_option in MEASURES_DATE_FILTERS or
+          filter_option in MEASURES_KEYWORD_FILTERS):
+        index = data['intervals'] if filter_option in MEASURES_DATE_FILTERS \
+                else data['keywords']
+        exports = _get_index_exports(filter_option, index,
+                                     lambda positions: _get_spilled_measures(
+                                                           data, positions))
+
+        for export_name, api_data in exports:
+            write_measures_data(export_name, *api_data)
+
+        return [[export_name, get_measures_filenames(export_name)
+                              [:len(api_data)]]
+                for export_name, api_data in exports]
+    elif (filter_option == MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value):
+        selections = [[name, sorted(data['groups'])]]
+    else:
+        selections = _get_ranked_codes(_get_groups_aggregate(data['groups']),
+                                       filter_option)
+
+    for export_name, codes in selections:
+        records = ([data['groups'][iso_code], data['spill'].read(iso_code)]
+                   for iso_code in codes)
+        write_measures_stream(export_name, records, settings.ndjson)
+
+    return _get_streamed_files([export_name for export_name, codes
+                                in selections])
+
+
+def _get_state_rows(raw_rows, row_hashes):
+    """
+    Transforms the input raw rows (indexed by row key) and returns their
+    DataFrame for the incremental state, with the 'hash', 'Code', 'Keywords',
+    'Source Domain', 'Date Start', 'Date end intended' (parsed) and
+    'fragment' (JSON of the MeasuresData object) columns. The rows dropped by
+    the transformation keep only their hash
+    """
+    state_rows = pd.DataFrame({'hash': row_hashes[raw_rows.index]},
+                              index = raw_rows.index)
+    data = raw_rows.copy()
+
+    if (len(data) == 0):
+        return state_rows.reindex(columns = ['hash', 'Code', 'Keywords',
+                                             'Source Domain', 'Date Start',
+                                             'Date end intended',
+                                             'fragment'])
+
+    _transform_measures_dataset(data)
+    keyword_lists = get_keyword_lists(_get_keywords_table(data), len(data))
+    fragments = _get_measures_data(data, keyword_lists).dumps_records()
+    transformed = data[['Code', 'Keywords', 'Source Domain']] \
+                      .assign(fragment = fragments)
+
+    for column in ['Date Start', 'Date end intended']:
+        transformed[column] = pd.to_datetime(data[column],
+                                             format = DATE_FORMAT)
+
+    return state_rows.join(transformed)
+
+
+def _get_group_entry(iso_code, country_rows, keywords_table):
+    """
+    Returns the MeasuresGroupData JSON object of a country and its fragment,
+    given the rows of the country in the incremental state in dataset order
+    and their keywords table
+    """
+    histogram = get_histogram(keywords_table)
+    records_count = sum(item['count'] for item in histogram)
+    country_group = country_rows.assign(**{'Keywords Count': len(histogram),
+                                           'Records Count': records_count})
+    group = _get_group_record(iso_code, country_group, histogram).to_json()
+
+    return {'group': group, 'fragment': serializer.dumps_items([group])}
+
+
+@profiling.instrumented('refresh_state',
+                        count = lambda state: len(state['rows']))
+def _refresh_state(sampling = False):
+    """
+    Loads the incremental state of the measures dataset and applies to it the
+    rows of the CSV file that were inserted, changed or deleted since the
+    last incremental run, transforming only those rows and rebuilding only
+    the group records of the affected countries. The state is a dictionary
+    with:
+    - rows: DataFrame indexed by row key with the content hash and position
+    of every row, and the transformed columns and JSON fragment of its record
+    - countries: dictionary from the code of every country to its
+    MeasuresGroupData JSON object and fragment
+    - exports: the content hash and file signatures of every written export
+    - format: the output format of the fragments, so that the state is
+    rebuilt when it changes
+    """
+    name = 'measures_sample' if sampling else 'measures'
+
+    try:
+        raw = pd.read_csv(MeasuresFilter.DATA_FILENAME.value)
+    except FileNotFoundError:
+        print(f'The file "{MeasuresFilter.DATA_FILENAME.value}" does not '
+              'exist')
+        sys.exit('No file, no execution... Stopping!')
+
+    if sampling:
+        raw = raw.head(MeasuresFilter.SAMPLE_RECORDS.value)
+
+    row_hashes = incremental.get_row_hashes(raw)
+    keys = incremental.get_row_keys(raw, row_hashes, 'ID')
+    raw.index = keys
+    row_hashes.index = keys
+
+    state = cache.load_state(name)
+
+    if (state is None or state.get('format') != serializer.get_format()):
+        state = {
+            'rows': _get_state_rows(raw.iloc[:0], row_hashes),
+            'countries': {},
+            'exports': {},
+            'format': serializer.get_format()
+        }
+
+    rows = state['rows']
+    inserted, changed, deleted = incremental.diff_rows(rows['hash'],
+                                                       row_hashes)
+    removed = changed.append(deleted)
+    new_rows = _get_state_rows(raw.loc[inserted.append(changed)], row_hashes)
+    affected = set(rows.loc[removed, 'Code'].dropna()) | \
+               set(new_rows['Code'].dropna())
+
+    rows = pd.concat([rows.drop(removed), new_rows])
+    rows['position'] = pd.Series(range(len(keys)), index = keys)[rows.index] \
+                         .to_numpy()
+    affected_rows = rows[rows['Code'].isin(affected)] \
+                        .sort_values('position', kind = 'mergesort')
+
+    for iso_code in affected:
+        state['countries'].pop(iso_code, None)
+
+    keywords_table = _get_keywords_table(affected_rows)
+
+    for iso_code, positions in affected_rows.groupby('Code', sort = False) \
+                                            .indices.items():
+        state['countries'][iso_code] = _get_group_entry(
+                                           iso_code,
+                                           affected_rows.iloc[positions],
+                                           select_rows(keywords_table,
+                                                       positions))
+
+    state['rows'] = rows
+    print(f'Incremental refresh of "{name}": {len(inserted)} inserted, '
+          f'{len(changed)} changed and {len(deleted)} deleted rows, '
+          f'{len(affected)} countries rebuilt')
+
+    return state
+
+
+def _get_state_records(state, codes):
+    """
+    Returns the serialized general and measures data of the input country
+    codes, following their order, assembled from the fragments of the
+    incremental state. The records of each country keep their order in the
+    dataset
+    """
+    positions = pd.Series(range(len(codes)), index = codes)
+    rows = state['rows']
+    rows = rows[rows['Code'].isin(positions.index)]
+    rows = rows.assign(rank = rows['Code'].map(positions)) \
+               .sort_values(['rank', 'position'], kind = 'mergesort')
+
+    general_data = serializer.join_items([state['countries'][code]['fragment']
+                                          for code in codes])
+    types_data = serializer.join_items(rows['fragment'].tolist())
+
+    return [general_data, types_data]
+
+
+def _get_groups_aggregate(groups):
+    """
+    Returns the DataFrame with the 'Code', 'Keywords Count' and 'Records
+    Count' columns of the input MeasuresGroupData JSON objects (by country
+    code), from which the countries are ranked
+    """
+    return pd.DataFrame({
+        'Code': list(groups),
+        'Keywords Count': [group['keywordsTotal']
+                           for group in groups.values()],
+        'Records Count': [group['keywordsRecordsTotal']
+                          for group in groups.values()]
+    })
+
+
+def _get_summed_general_information(groups, codes):
+    """
+    Returns the dataset's general information, summing the keyword and source
+    counts of the input MeasuresGroupData JSON objects (by country code),
+    given the country codes in order of first appearance in the dataset
+    """
+    m_counts = {code: groups[code]['keywordsTotal'] for code in codes}
+    keywords_count = Counter()
+    sources_count = Counter()
+
+    for group in groups.values():
+        keywords_count.update({item['keywords']: item['count']
+                               for item in group['keywordsCount']})
+        sources_count.update({item['sources']: item['count']
+                              for item in group['sourcesCount']})
+
+    return MeasuresGeneralData(
+               countries_measures_count = m_counts,
+               all_keywords_count = [{"keywords": keyword, "count": count}
+                                     for keyword, count
+                                     in sorted(keywords_count.items())],
+               all_sources_count = [{"keywords": source, "count": count}
+                                    for source, count
+                                    in sorted(sources_count.items())])
+
+
+def _get_state_code_rows(state):
+    """
+    Returns the rows of the incremental state that have a country code, in
+    dataset order, which are selected once for each refreshed state (so that
+    its keywords table and KeywordIndex are shared by the filters)
+    """
+    return get_derived(state['rows'], 'code_rows',
+                       lambda: state['rows'].dropna(subset = ['Code']) \
+                                            .sort_values('position',
+                                                         kind = 'mergesort'))
+
+
+def _get_state_filter(state, filter_option):
+    """
+    Returns the list with the [export name, serialized data] pair of each
+    output of the input filter option, assembled from the incremental state
+    """
+    name = MeasuresFilter(filter_option).name
+    groups = {code: entry['group']
+              for code, entry in state['countries'].items()}
+
+    if (filter_option == MeasuresFilter.GENERAL_STATISTICS.value):
+        rows = _get_state_code_rows(state)
+        general_data = _get_summed_general_information(
+                           groups, rows['Code'].drop_duplicates().tolist())
+        return [[name, [serializer.dumps(general_data.to_json())]]]
+    elif (filter_option in MEASURES_DATE_FILTERS or
+          filter_option in MEASURES_KEYWORD_FILTERS):
+        rows = _get_state_code_rows(state)
+        fragments = rows['fragment'].to_numpy()
+
+        if (filter_option in MEASURES_DATE_FILTERS):
+            index = IntervalIndex(rows['Code'].to_numpy(),
+                                  pd.to_datetime(rows['Date Start']),
+                                  pd.to_datetime(rows['Date end intended']))
         else:
-            return _process_general_information(data)
+            index = _get_keyword_index(rows)
+
+        return _get_index_exports(filter_option, index,
+                                  lambda positions: serializer.join_items(
+                                                        fragments[positions] \
+                                                            .tolist()))
+    elif (filter_option == MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value):
+        selections = [[name, sorted(groups)]]
+    else:
+        selections = _get_ranked_codes(_get_groups_aggregate(groups),
+                                       filter_option)
+
+    return [[export_name, _get_state_records(state, codes)]
+            for export_name, codes in selections]
+
+
+def _load_incremental(filter_options, sampling = False):
+    """
+    Refreshes the incremental state of the dataset and writes the exports of
+    the input filter options whose data changed since they were last written,
+    returning the list of their [export name, serialized data] pairs
+    """
+    state = _refresh_state(sampling)
+    emitted = []
+
+    for filter_option in filter_options:
+        for name, api_data in _get_state_filter(state, filter_option):
+            filenames = get_measures_filenames(name)[:len(api_data)]
+
+            if (incremental.is_emitted(state['exports'], name, api_data,
+                                       filenames)):
+                print(f'{name} is up to date')
+            else:
+                write_measures_data(name, *api_data)
+                incremental.record_emitted(state['exports'], name, api_data,
+                                           filenames)
+                emitted.append([name, api_data])
+
+    cache.store_state('measures_sample' if sampling else 'measures', state)
+
+    return emitted
+
+
+@profiling.instrumented('stream_filter', label = _get_filter_name)
+def _stream_filter(filter_option, sampling = False, data = None):
+    """
+    Writes the JSON files of the input filter option while its records are
+    produced one country at a time, and returns the list of written export
+    names
+    Precondition: the filter option is the general country information or a
+    ranking one
+    """
+    if (data is None):
+        data = load_measures_dataset(
+                   sampling, MEASURES_FILTER_PROJECTIONS[filter_option])
+
+    if (filter_option == MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value):
+        selections = [[MeasuresFilter(filter_option).name, None]]
+    else:
+        selections = _get_ranked_codes(data, filter_option)
+
+    for name, codes in selections:
+        records = ([group_record.to_json(), data_list.to_json()]
+                   for group_record, data_list in _iter_records(data, codes))
+        write_measures_stream(name, records, settings.ndjson)
+
+    return [name for name, codes in selections]
+
+
+def _is_streamed(filter_option):
+    """
+    Checks whether the input filter option is exported in streaming mode
+    """
+    return settings.streaming and \
+           (filter_option == MeasuresFilter.GENERAL_COUNTRY_INFORMATION.value
+            or filter_option in MEASURES_RANKINGS)
+
+
+def _get_result_key(filter_option, sampling = False):
+    """
+    Returns the key of the cached results of the input filter option
+    """
+    name = 'measures_sample' if sampling else 'measures'
+
+    try:
+        return cache.get_result_key(MeasuresFilter.DATA_FILENAME.value, name,
+                                    filter_option, sampling)
     except FileNotFoundError:
-        print(f'The file "{BedsFilter.DATA_FILENAME.value}" does not exist')
+        print(f'The file "{MeasuresFilter.DATA_FILENAME.value}" does not '
+              'exist')
         sys.exit('No file, no execution... Stopping!')
 
 
+def _write_exports(exports, key):
+    """
+    Writes the JSON files of the input serialized exports and stores them as
+    the cached results with the input key
+    """
+    for name, api_data in exports:
+        write_measures_data(name, *api_data)
+
+    cache.store_result(key, [[name,
+                              get_measures_filenames(name)[:len(api_data)]]
+                             for name, api_data in exports])
+
+
+def _get_streamed_files(names):
+    """
+    Returns the [export name, file names] pairs of the input streamed exports
+    """
+    return [[name, get_measures_filenames(name, settings.ndjson)]
+            for name in names]
+
+
+def _read_exports(cached_exports):
+    """
+    Returns the serialized exports of the input cached [export name, file
+    names] pairs, reading them from their files
+    """
+    return [[name, read_files(filenames)]
+            for name, filenames in cached_exports]
+
+
+def _send_exports(exports):
+    """
+    Sends the serialized data of the input exports to the backend's API
+    """
+    import api
+
+    for name, api_data in exports:
+        api.send_data(api_data, api.MEASURES_URL)
+
+
+def _print_cache_hit(filter_option):
+    """
+    Informs that the cached results of the input filter option are up to date
+    """
+    print(f'Results cache hit for {MeasuresFilter(filter_option).name}, its '
+          'files are up to date')
+
+
+def _load_cached_filter(filter_option, sampling = False):
+    """
+    Writes the JSON files of the input filter option unless its cached
+    results are up to date, and returns the function that sends them to the
+    backend's API
+    """
+    key = _get_result_key(filter_option, sampling)
+    cached_exports = cache.get_result(key)
+
+    if (cached_exports is not None):
+        _print_cache_hit(filter_option)
+        return lambda: _send_exports(_read_exports(cached_exports))
+    elif (settings.chunk_size):
+        file_exports = _chunk_filter(filter_option, sampling)
+        cache.store_result(key, file_exports)
+        return lambda: _send_exports(_read_exports(file_exports))
+    elif (_is_streamed(filter_option)):
+        streamed_exports = _get_streamed_files(_stream_filter(filter_option,
+                                                              sampling))
+        cache.store_result(key, streamed_exports)
+        return lambda: _send_exports(_read_exports(streamed_exports))
+    else:
+        exports = get_serialized_filter(filter_option, sampling)
+        _write_exports(exports, key)
+        return lambda: _send_exports(exports)
+
+
 def load_measure_records(filter_option, cli_mode = False, sampling = False,
                          send_request = False):
     """
@@ -294,41 +1320,98 @@ def load_measure_records(filter_option, cli_mode = False, sampling = False,
     If CLI mode is enabled, the user will be prompted to choose whether a
     request will be sent to the API; otherwise, the sending must be specified
     through the send_request parameter
+    If the cached results of the filter are up to date, the filter is not
+    computed and its files are not rewritten. In incremental mode, only the
+    changes of the dataset are applied and only the changed exports are
+    written (and sent)
     """
-    records = _filter_measures(filter_option, sampling)
-    
-    if (filter_option != MeasuresFilter.GENERAL_STATISTICS.value):
-        general_json_list = [r.to_json() for r in records[0]]
-
-        types_json_list = [r.to_json() for r in records[1]]
-
-        general_data = json.dumps(general_json_list, indent = 4)
-        types_data = json.dumps(types_json_list, indent = 4)
+    if (settings.incremental):
+        exports = _load_incremental([filter_option], sampling)
+        send = lambda: _send_exports(exports)
+    else:
+        send = _load_cached_filter(filter_option, sampling)
 
-        api_data = [general_data, types_data]
+    if (cli_mode):
+        user_input = prompt_user(3)
+        answer = user_input.lower() == 'yes'
 
-        write_measures_data(filter_option, general_data, types_data)
+        if (answer):
+            send()
+    elif (send_request):
+        send()
 
-        if (cli_mode):
-            user_input = prompt_user(3)
-            answer = user_input.lower() == 'yes'
 
-            if (answer):
-                api.send_data(api_data, api.MEASURES_URL)
-        elif (send_request):
-            api.send_data(api_data, api.MEASURES_URL)
-    else:
-        general_json_list = records[0].to_json()
-        general_data = json.dumps(general_json_list, indent = 4)
-        api_data = [general_data]
-        write_measures_data(filter_index = filter_option, 
-                            general_json = general_data)
-
-        if (cli_mode):
-            user_input = prompt_user(3)
-            answer = user_input.lower() == 'yes'
-
-            if (answer):
-                api.send_data(api_data, api.MEASURES_URL)
-        elif (send_request):
-            api.send_data(api_data, api.MEASURES_URL)
\ No newline at end of file
+def load_measure_batch(filter_options, sampling = False, send_request = False):
+    """
+    Retrieves the measures records of several filters from a single load of
+    the dataset, computing the filters concurrently, and then writes all of
+    their JSON files (and sends them to the backend's API if specified). In
+    streaming and chunked modes, each filter writes its files while computing
+    them (in chunked mode, from a single chunked read of the dataset). The
+    filters whose cached results are up to date are skipped, and the dataset
+    is only loaded if any filter must be computed. In incremental mode, only
+    the changes of the dataset are applied and only the changed exports are
+    written (and sent)
+    """
+    if (settings.incremental):
+        exports = _load_incremental(filter_options, sampling)
+
+        if (send_request):
+            _send_exports(exports)
+
+        return
+
+    keys = [_get_result_key(option, sampling) for option in filter_options]
+    cached_results = [cache.get_result(key) for key in keys]
+    missing = [[option, key] for option, key, cached_exports
+               in zip(filter_options, keys, cached_results)
+               if cached_exports is None]
+    exports = []
+    file_exports = []
+
+    for option, cached_exports in zip(filter_options, cached_results):
+        if (cached_exports is not None):
+            _print_cache_hit(option)
+            file_exports.extend(cached_exports)
+
+    if (missing and settings.chunk_size):
+        data = _read_measures_chunks(sampling)
+
+        with data['spill']:
+            for option, key in missing:
+                chunk_exports = _chunk_filter(option, data = data)
+                cache.store_result(key, chunk_exports)
+                file_exports.extend(chunk_exports)
+    elif (missing):
+        projection = get_projection(MEASURES_PROJECTIONS,
+                                    MEASURES_FILTER_PROJECTIONS,
+                                    [option for option, key in missing])
+        data = load_measures_dataset(sampling, projection)
+        streamed = [[option, key] for option, key in missing
+                    if _is_streamed(option)]
+        serialized = [[option, key] for option, key in missing
+                      if not _is_streamed(option)]
+
+        with ThreadPoolExecutor() as executor:
+            streamed_names = executor.map(
+                lambda missing_option: _stream_filter(missing_option[0],
+                                                      data = data),
+                streamed)
+            results = executor.map(
+                lambda missing_option: get_serialized_filter(
+                    missing_option[0], data = data),
+                serialized)
+            streamed_names = list(streamed_names)
+            results = list(results)
+
+        for (option, key), names in zip(streamed, streamed_names):
+            streamed_exports = _get_streamed_files(names)
+            cache.store_result(key, streamed_exports)
+            file_exports.extend(streamed_exports)
+
+        for (option, key), filter_exports in zip(serialized, results):
+            _write_exports(filter_exports, key)
+            exports.extend(filter_exports)
+
+    if (send_request):
+        _send_exports(_read_exports(file_exports) + exports)
@@ -0,0 +1,125 @@
+"""
+This module normalizes the country names and source URLs of the measures
+dataset. Since both columns are drawn from a small, repeated vocabulary, each
+distinct value is mapped only once and the result is broadcast back through
+the column
+"""
+
+import os
+import json
+import cache
+from urllib.parse import urlparse
+from constants import CACHE_DIRECTORY, ISO_CODES_FILENAME, REMAINING_ISO_CODES
+
+
+def _get_table_filename():
+    """
+    Returns the path of the persisted country name to ISO code table
+    """
+    return os.path.join(CACHE_DIRECTORY, ISO_CODES_FILENAME)
+
+
+def _load_iso_table():
+    """
+    Returns the persisted country name to ISO code table, where the names
+    that could not be resolved map to None, or an empty table if it is
+    missing or unreadable. The unresolved names are left out if they were
+    stored by another version of the code, so that they are looked up again.
+    The table is used even when the dataset cache is disabled
+    """
+    try:
+        with open(_get_table_filename()) as table_file:
+            stored = json.load(table_file)
+    except (OSError, ValueError):
+        return {}
+
+    if (not isinstance(stored, dict)):
+        return {}
+
+    iso_table = stored.get('codes', {})
+
+    if (stored.get('version') != cache.get_code_version()):
+        iso_table = {country: iso_code
+                     for country, iso_code in iso_table.items()
+                     if iso_code is not None}
+
+    return iso_table
+
+
+def _save_iso_table(iso_table):
+    """
+    Persists the country name to ISO code table (with None for the names
+    that could not be resolved) and the version of the code that resolved
+    it
+    """
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok = True)
+        with open(_get_table_filename(), 'w') as table_file:
+            json.dump({'version': cache.get_code_version(),
+                       'codes': iso_table}, table_file, indent = 4,
+                      sort_keys = True)
+    except OSError as e:
+        print('Could not write the ISO codes table!')
+        print(e)
+
+
+def _resolve_iso_codes(countries):
+    """
+    Returns a dictionary with the ISO 3166 - alpha 2 codes of the input
+    country names that could be resolved through pycountry or the
+    REMAINING_ISO_CODES constant
+    """
+    import pycountry
+
+    resolved = {}
+
+    for country in countries:
+        if (country.startswith('US:')):
+            resolved[country] = 'US'
+        else:
+            result = pycountry.countries.get(name = country)
+            if (result):
+                resolved[country] = result.alpha_2
+            elif (country in REMAINING_ISO_CODES):
+                resolved[country] = REMAINING_ISO_CODES[country]
+
+    return resolved
+
+
+def get_iso_codes(countries_series):
+    """
+    Returns a list with two elements:
+    [0]: Series of objects with the ISO 3166 - alpha 2 code of each country
+    name in the input Series, which may be categorical (missing for the names
+    that could not be resolved)
+    [1]: Sorted list of the country names that could not be resolved
+    pycountry is only loaded when a name is missing from the persisted table,
+    which keeps the names that could not be resolved as well
+    """
+    iso_table = _load_iso_table()
+    countries = list(countries_series.unique())
+    missing = [country for country in countries if country not in iso_table]
+
+    if (missing):
+        resolved = _resolve_iso_codes(missing)
+        iso_table.update({country: resolved.get(country)
+                          for country in missing})
+        _save_iso_table(iso_table)
+
+    unresolved = sorted(country for country in countries
+                        if iso_table[country] is None)
+    iso_codes = {country: iso_code for country, iso_code in iso_table.items()
+                 if iso_code is not None}
+
+    return [countries_series.map(iso_codes).astype(object), unresolved]
+
+
+def get_url_domains(urls_series):
+    """
+    Returns a Series of objects with the domain of each URL in the input
+    Series, which may be categorical (missing for missing URLs)
+    """
+    domains = {url: urlparse(url).netloc
+               for url in urls_series.dropna().unique()}
+
+    return urls_series.map(domains).astype(object)
@@ -0,0 +1,47 @@
+"""
+This module runs the packing and serialization of the records of a dataset
+on a pool of worker processes. The countries are split into contiguous
+shards of similar size, each worker receives only the rows of its shard, and
+the JSON items serialized by the workers are joined in the original order
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Number of shards per worker, so that a slow shard does not leave the other
+# workers idle
+SHARDS_PER_WORKER = 4
+
+
+def get_shards(data, column, countries, workers):
+    """
+    Splits the input countries (values of the column) into contiguous shards
+    with a similar number of rows and returns a list with the [rows, shard
+    countries] pair of each shard, where the rows keep their dataset order
+    """
+    group_positions = data.groupby(column, observed = True).indices
+    sizes = np.array([len(group_positions[country])
+                      for country in countries])
+    targets = np.linspace(0, sizes.sum(), workers * SHARDS_PER_WORKER + 1)
+    bounds = np.searchsorted(np.cumsum(sizes), targets[1:-1], side = 'right')
+    shards = []
+
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(countries)]):
+        if (start < end):
+            shard_countries = list(countries[start:end])
+            positions = np.sort(np.concatenate([group_positions[country]
+                                                for country
+                                                in shard_countries]))
+            shards.append([data.iloc[positions], shard_countries])
+
+    return shards
+
+
+def map_shards(function, shards, workers):
+    """
+    Runs the input function (which must be defined at module level) over
+    every shard on a pool of worker processes and returns its results in the
+    order of the shards
+    """
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        return list(executor.map(function, shards))
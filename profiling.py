@@ -0,0 +1,302 @@
+"""
+This module instruments the stages of the processing: reading, transforming,
+packing, serializing, writing and sending the data. While the profiling is
+enabled (or any hook is registered), every stage measures its wall time, CPU
+time, peak memory and number of rows, which are passed to the hooks and
+kept for the report table and the JSON trace. Otherwise, a stage only costs
+a function call
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import settings
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_hooks = []
+_records = []
+_records_lock = threading.Lock()
+_local = threading.local()
+_started = time.perf_counter()
+
+
+def _get_peak_memory():
+    """
+    Returns the peak resident memory of the process in megabytes, or None if
+    the platform does not report it
+    """
+    if (resource is None):
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _get_stack():
+    """
+    Returns the stack of the running stages of the current thread
+    """
+    if (not hasattr(_local, 'stack')):
+        _local.stack = []
+
+    return _local.stack
+
+
+class _DisabledStage:
+    """
+    This class is the stage returned while the profiling is disabled, which
+    does not measure anything
+    """
+    def count(self, rows):
+        pass
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exception_type, exception, traceback):
+        return False
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+class Stage:
+    """
+    This class measures a stage of the processing while it runs as a
+    context. Its path joins the names (and labels) of the stages of the
+    thread it runs within
+    """
+    def __init__(self, name, rows = None, label = None):
+        self.name = name
+        self.rows = rows
+        self.label = label
+
+
+    def count(self, rows):
+        """
+        Sets the number of rows (or records) processed by the stage
+        """
+        self.rows = rows
+
+
+    def __enter__(self):
+        stack = _get_stack()
+        step = self.name if self.label is None \
+                         else f'{self.name}[{self.label}]'
+        self._path = '/'.join([stage._path for stage in stack[-1:]] + [step])
+        stack.append(self)
+        self._start_memory = _get_peak_memory()
+        self._start_cpu = time.thread_time()
+        self._start = time.perf_counter()
+
+        return self
+
+
+    def __exit__(self, exception_type, exception, traceback):
+        end = time.perf_counter()
+        cpu = time.thread_time() - self._start_cpu
+        peak_memory = _get_peak_memory()
+        _get_stack().pop()
+
+        metrics = {
+            'name': self.name,
+            'label': self.label,
+            'path': self._path,
+            'thread': threading.current_thread().name,
+            'start': self._start - _started,
+            'wall': end - self._start,
+            'cpu': cpu,
+            'peak_memory': peak_memory,
+            'memory_growth': None if peak_memory is None
+                                  else peak_memory - self._start_memory,
+            'rows': self.rows,
+            'failed': exception_type is not None
+        }
+
+        if (settings.profile):
+            with _records_lock:
+                _records.append(metrics)
+
+        for hook in list(_hooks):
+            hook(metrics)
+
+        return False
+
+
+def is_enabled():
+    """
+    Checks whether the stages are measured: the profiling is enabled or any
+    hook is registered
+    """
+    return settings.profile or bool(_hooks)
+
+
+def stage(name, rows = None, label = None):
+    """
+    Returns the context that measures a stage with the input name (and
+    optionally its number of rows and a label that tells its instances
+    apart), which does nothing if the profiling is disabled
+    """
+    if (not is_enabled()):
+        return _DISABLED_STAGE
+
+    return Stage(name, rows, label)
+
+
+def instrumented(name, count = None, label = None):
+    """
+    Returns a decorator that runs a function as a stage with the input name.
+    The optional count function returns the number of rows of the stage from
+    the result of the function, and the optional label is either a string or
+    a function that returns it from the arguments of the function
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if (not is_enabled()):
+                return function(*args, **kwargs)
+
+            stage_label = label(*args, **kwargs) if callable(label) \
+                          else label
+
+            with Stage(name, label = stage_label) as current_stage:
+                result = function(*args, **kwargs)
+
+                if (count is not None):
+                    current_stage.count(count(result))
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def count_items(*json_objects):
+    """
+    Returns the number of items of the input JSON objects, where a list
+    counts its items and any other object counts as one
+    """
+    return sum(len(json_object) if isinstance(json_object, list) else 1
+               for json_object in json_objects)
+
+
+def add_hook(hook):
+    """
+    Registers a function that is called with the metrics dictionary of every
+    finished stage (name, label, path, thread, start, wall and cpu seconds,
+    peak_memory and memory_growth megabytes, rows and failed), e.g. to
+    forward them to a monitoring system. Registering a hook enables the
+    measurement of the stages even without the profiling
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregisters a function added with add_hook
+    """
+    _hooks.remove(hook)
+
+
+def get_records():
+    """
+    Returns the list of metrics of the finished stages recorded while the
+    profiling was enabled, in the order they finished
+    """
+    with _records_lock:
+        return list(_records)
+
+
+def _get_ancestor_paths(path):
+    """
+    Returns the list of paths from the root stage of the input path to the
+    path itself
+    """
+    steps = path.split('/')
+    return ['/'.join(steps[:index]) for index in range(1, len(steps) + 1)]
+
+
+def print_report():
+    """
+    Prints the table of the recorded stages, adding up the stages with the
+    same path. Every stage is followed by the ones run within it, and the
+    stages with the same parent are in the order they first started
+    """
+    rows = {}
+
+    for metrics in sorted(get_records(), key = lambda item: item['start']):
+        row = rows.setdefault(metrics['path'], {'start': metrics['start'],
+                                                'calls': 0, 'wall': 0.0,
+                                                'cpu': 0.0, 'rows': None,
+                                                'peak': None,
+                                                'growth': None})
+        row['calls'] += 1
+        row['wall'] += metrics['wall']
+        row['cpu'] += metrics['cpu']
+
+        if (metrics['rows'] is not None):
+            row['rows'] = (row['rows'] or 0) + metrics['rows']
+        if (metrics['peak_memory'] is not None):
+            row['peak'] = max(row['peak'] or 0, metrics['peak_memory'])
+            row['growth'] = (row['growth'] or 0) + metrics['memory_growth']
+
+    print('\nProfile of the stages\n')
+    print(f'    {"stage":<60}{"calls":>6}{"wall s":>10}{"cpu s":>10}'
+          f'{"rows":>10}{"peak MB":>10}{"+MB":>8}')
+
+    tree_order = lambda path: [rows[ancestor]['start'] if ancestor in rows
+                               else 0.0 for ancestor
+                               in _get_ancestor_paths(path)]
+
+    for path in sorted(rows, key = tree_order):
+        row = rows[path]
+        depth = path.count('/')
+        stage_name = '  ' * depth + path.rsplit('/', 1)[-1]
+        row_count = '' if row['rows'] is None else row['rows']
+        peak = '' if row['peak'] is None else f'{row["peak"]:.1f}'
+        growth = '' if row['growth'] is None else f'{row["growth"]:.1f}'
+
+        print(f'    {stage_name[:60]:<60}{row["calls"]:>6}'
+              f'{row["wall"]:>10.3f}{row["cpu"]:>10.3f}{row_count:>10}'
+              f'{peak:>10}{growth:>8}')
+
+    print()
+
+
+def write_trace(filename):
+    """
+    Writes the recorded stages on a JSON file in the trace event format,
+    which can be opened with chrome://tracing or Perfetto
+    """
+    process_id = os.getpid()
+    events = [{
+        'name': metrics['name'] if metrics['label'] is None \
+                else f'{metrics["name"]} {metrics["label"]}',
+        'cat': metrics['path'],
+        'ph': 'X',
+        'ts': round(1e6 * metrics['start']),
+        'dur': round(1e6 * metrics['wall']),
+        'pid': process_id,
+        'tid': metrics['thread'],
+        'args': {key: metrics[key] for key
+                 in ['cpu', 'peak_memory', 'memory_growth', 'rows', 'failed']}
+    } for metrics in get_records()]
+
+    try:
+        with open(filename, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                      trace_file, indent = 4)
+        print(f'Wrote the profile trace on {filename}!')
+    except OSError as e:
+        print(f'Could not write {filename}!')
+        print(e)
@@ -0,0 +1,128 @@
+"""
+This module parses and evaluates the boolean keyword queries of the measures
+dataset, where the keywords are combined with the NOT, AND and OR operators
+(in uppercase, from the highest to the lowest precedence) and parentheses,
+e.g. '(school closure OR university closure) AND NOT remote schooling'. A
+query is parsed into a tree of nested lists, which is evaluated with the set
+operations of the bitmaps of its keywords
+"""
+
+import re
+from functools import reduce
+
+_TOKENS = re.compile(r'(\(|\)|\bAND\b|\bOR\b|\bNOT\b)')
+_OPERATORS = ['(', ')', 'AND', 'OR', 'NOT']
+
+
+def _tokenize(query):
+    """
+    Returns the list of tokens of a query: its parentheses, its operators and
+    its keywords (in lowercase and with single spaces)
+    """
+    tokens = []
+
+    for piece in _TOKENS.split(query):
+        piece = ' '.join(piece.split())
+
+        if (piece):
+            tokens.append(piece if piece in _OPERATORS else piece.lower())
+
+    return tokens
+
+
+def _parse_operand(tokens, position):
+    """
+    Returns a list with the tree of the operand of the query that starts at
+    the input token position (a keyword, a negated operand or a parenthesized
+    expression) and the position of the token after it
+    """
+    if (position == len(tokens)):
+        raise ValueError('The keyword query ends unexpectedly')
+
+    token = tokens[position]
+
+    if (token == 'NOT'):
+        operand, position = _parse_operand(tokens, position + 1)
+        return [['not', operand], position]
+    elif (token == '('):
+        tree, position = _parse_operation(tokens, position + 1, 'OR')
+
+        if (position == len(tokens) or tokens[position] != ')'):
+            raise ValueError('A "(" of the keyword query is not closed')
+
+        return [tree, position + 1]
+    elif (token in _OPERATORS):
+        raise ValueError(f'Unexpected "{token}" in the keyword query')
+
+    return [['keyword', token], position + 1]
+
+
+def _parse_operation(tokens, position, operator):
+    """
+    Returns a list with the tree of the operation of the query that starts at
+    the input token position, joining its operands with the input operator
+    ('OR' joins AND operations, and 'AND' joins operands), and the position
+    of the token after it
+    """
+    parse = (lambda position: _parse_operation(tokens, position, 'AND')) \
+            if operator == 'OR' else \
+            (lambda position: _parse_operand(tokens, position))
+    tree, position = parse(position)
+    operands = [tree]
+
+    while (position < len(tokens) and tokens[position] == operator):
+        tree, position = parse(position + 1)
+        operands.append(tree)
+
+    if (len(operands) == 1):
+        return [tree, position]
+
+    return [[operator.lower()] + operands, position]
+
+
+def parse_query(query):
+    """
+    Returns the tree of a keyword query as nested lists: ['keyword',
+    keyword], ['not', operand], or ['and', operands...] / ['or',
+    operands...]
+    Raises ValueError if the query is empty or not well formed
+    """
+    tokens = _tokenize(query)
+    tree, position = _parse_operation(tokens, 0, 'OR')
+
+    if (position < len(tokens)):
+        raise ValueError(f'Unexpected "{tokens[position]}" in the keyword '
+                         'query')
+
+    return tree
+
+
+def evaluate_query(tree, get_bitmap, universe):
+    """
+    Returns the bitmap of the rows that match a query tree, given the
+    function that returns the bitmap of the rows of a keyword and the bitmap
+    of all the rows. The operands of an AND are intersected starting from
+    the sparse ones, and its negated operands are subtracted instead of
+    being complemented
+    """
+    operator = tree[0]
+
+    if (operator == 'keyword'):
+        return get_bitmap(tree[1])
+    elif (operator == 'not'):
+        return universe - evaluate_query(tree[1], get_bitmap, universe)
+    elif (operator == 'or'):
+        return reduce(lambda union, bitmap: union | bitmap,
+                      [evaluate_query(operand, get_bitmap, universe)
+                       for operand in tree[1:]])
+
+    positives = [evaluate_query(operand, get_bitmap, universe)
+                 for operand in tree[1:] if operand[0] != 'not']
+    negatives = [evaluate_query(operand[1], get_bitmap, universe)
+                 for operand in tree[1:] if operand[0] == 'not']
+    positives.sort(key = lambda bitmap: not bitmap.is_sparse())
+    result = reduce(lambda intersection, bitmap: intersection & bitmap,
+                    positives[1:], positives[0]) if positives else universe
+
+    return reduce(lambda difference, bitmap: difference - bitmap, negatives,
+                  result)
@@ -0,0 +1,94 @@
+"""
+This module contains the ranking engine that selects the N top or bottom
+countries of a per-country aggregate by one of its metrics. It relies on
+partial selection, so only the selected countries are ever sorted
+"""
+
+import numpy as np
+from constants import TOP_N
+
+
+def _get_selection(values, threshold, count, ascending):
+    """
+    Returns the positions of the first N values in the direction of the
+    ranking, given the N-th value of that direction as threshold. Ties are
+    broken by position so that the result is deterministic
+    """
+    if (ascending):
+        chosen = np.flatnonzero(values < threshold)
+        keys = values
+    else:
+        chosen = np.flatnonzero(values > threshold)
+        keys = -values
+
+    ties = np.flatnonzero(values == threshold)[:count - len(chosen)]
+    selection = np.concatenate([chosen, ties])
+
+    return selection[np.lexsort((selection, keys[selection]))]
+
+
+def rank(aggregate, metric, count, directions):
+    """
+    Returns a dictionary from each requested direction ('top' for the highest
+    values, 'bottom' for the lowest) to the list of the N index labels of the
+    aggregate (a DataFrame with one row per country) ranked by the metric
+    column. Missing values are left out, and all the directions are selected
+    from a single partition of the values
+    """
+    metric_values = aggregate[metric]
+    present = metric_values.notna().to_numpy()
+    labels = aggregate.index.to_numpy()[present]
+    values = metric_values.to_numpy(dtype = float)[present]
+    count = min(count, len(values))
+    rankings = {}
+
+    if (count <= 0):
+        return {direction: [] for direction in directions}
+
+    partitioned = np.partition(values, [count - 1, len(values) - count])
+
+    for direction in directions:
+        if (direction == 'top'):
+            threshold = partitioned[len(values) - count]
+            selection = _get_selection(values, threshold, count, False)
+        else:
+            threshold = partitioned[count - 1]
+            selection = _get_selection(values, threshold, count, True)
+
+        rankings[direction] = labels[selection].tolist()
+
+    return rankings
+
+
+def get_directions(filter_direction, direction = None):
+    """
+    Returns the list of directions to rank for a filter with the input
+    direction, given the requested direction ('top', 'bottom' or 'both'; None
+    keeps the one of the filter)
+    """
+    if (direction is None):
+        return [filter_direction]
+    elif (direction == 'both'):
+        return ['top', 'bottom']
+    else:
+        return [direction]
+
+
+def get_export_name(filter_name, filter_ranking, metric, direction, count):
+    """
+    Returns the name of the exported files for a ranking of a filter, given
+    the name of the filter and its own [metric, direction] list. The name of
+    the filter is used when the ranking is its own with the default count;
+    otherwise the name tells the direction, count and metric, preceded by the
+    name of the filter when the metric or direction is not its own (so that
+    the rankings of different filters never share their files)
+    """
+    metric_name = metric.upper().replace(' ', '_')
+    name = f'{direction.upper()}_{count}_COUNTRIES_{metric_name}'
+
+    if (filter_ranking != [metric, direction]):
+        return f'{filter_name}_{name}'
+    elif (count == TOP_N):
+        return filter_name
+
+    return name
@@ -0,0 +1,81 @@
+"""
+This module reads the datasets with their explicit schemas, which map every
+expected column to its type: the repeated strings are loaded as categoricals,
+the numbers that fit in narrower types are narrowed, the dates are parsed,
+and the columns without a type are inferred by pandas. The schema is
+verified while reading, so a file that does not match it is rejected. Only
+a projection of its columns can be read, so that every filter parses just
+the columns it uses
+"""
+
+import pandas as pd
+from constants import DATE_FORMAT
+
+
+def _get_columns_schema(schema, columns):
+    """
+    Returns the schema restricted to the input columns (in the order of the
+    schema), or the whole schema if they are None
+    """
+    if (columns is None):
+        return schema
+
+    return {column: dtype for column, dtype in schema.items()
+            if column in columns}
+
+
+def _parse_dates(data, filename, schema):
+    """
+    Parses the date columns of the schema in the input dataset, which is
+    modified in place
+    """
+    for column, dtype in schema.items():
+        if (dtype == 'date'):
+            try:
+                data[column] = pd.to_datetime(data[column],
+                                              format = DATE_FORMAT)
+            except ValueError as e:
+                raise ValueError(f'The file "{filename}" does not match its '
+                                 f'schema, since "{column}" has a date '
+                                 f'that is not in the {DATE_FORMAT} '
+                                 'format') from e
+
+
+def get_projection(projections, filter_projections, filter_options):
+    """
+    Returns the name of the narrowest projection that has the columns of all
+    the input filter options, given the dictionary from projection names to
+    their columns (from the narrowest to the widest, each one including the
+    previous ones) and the dictionary from filter options to the names of
+    their projections
+    """
+    names = list(projections)
+
+    return names[max(names.index(filter_projections[filter_option])
+                     for filter_option in filter_options)]
+
+
+def read_dataset(filename, schema, columns = None, **kwargs):
+    """
+    Reads a dataset from its CSV file with the input schema (a dictionary
+    from column names to pandas types, 'date' for the dates in the
+    DATE_FORMAT format, or None to infer the type) and returns it. Only the
+    input columns are read, or all the ones of the schema if None. Any other
+    keyword argument is passed to pandas.read_csv
+    Raises ValueError if a column is missing or a value does not fit its type
+    """
+    schema = _get_columns_schema(schema, columns)
+    dtypes = {column: dtype for column, dtype in schema.items()
+              if dtype not in [None, 'date']}
+
+    try:
+        data = pd.read_csv(filename, usecols = list(schema), dtype = dtypes,
+                           **kwargs)
+    except (ValueError, OverflowError) as e:
+        raise ValueError(f'The file "{filename}" does not match its schema: '
+                         f'{e}') from e
+
+    _parse_dates(data, filename, schema)
+
+    return data
+
@@ -0,0 +1,174 @@
+"""
+This module serializes the exported JSON data with the backend chosen in the
+settings. The data is either pretty-printed, with the same format as
+json.dumps(data, indent = 4), or compact (without whitespace). The pretty
+format is always written by the standard library encoder, since orjson only
+indents by two spaces and writes NaN, small floats and non-ASCII characters
+differently; the compact one is written by orjson when it is selected (or
+installed, with the automatic backend). orjson is only imported the first
+time its backend is used
+"""
+
+import json
+import settings
+import importlib.util
+from json.encoder import encode_basestring_ascii
+
+# Whether orjson is installed, which is looked up the first time the
+# automatic backend is resolved (None until then)
+_orjson_installed = None
+
+
+def _encode_default(value):
+    """
+    Returns the JSON-compatible value of a NumPy scalar or array, which the
+    encoders call for the objects they cannot serialize
+    """
+    if (hasattr(value, 'tolist')):
+        return value.tolist()
+
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON '
+                    'serializable')
+
+
+def get_backend():
+    """
+    Returns the name of the backend of the compact format: the one chosen in
+    the settings, or orjson if it is installed and the choice is automatic
+    """
+    global _orjson_installed
+
+    if (settings.json_backend == 'auto'):
+        if (_orjson_installed is None):
+            _orjson_installed = importlib.util.find_spec('orjson') is not None
+
+        return 'orjson' if _orjson_installed else 'stdlib'
+
+    return settings.json_backend
+
+
+def get_format():
+    """
+    Returns the name of the current output format, which identifies the
+    bytes written for the same data
+    """
+    if (settings.compact_json):
+        return f'compact-{get_backend()}'
+
+    return 'pretty'
+
+
+def dumps(json_object):
+    """
+    Returns the JSON string of an object in the current output format. NumPy
+    scalars and arrays are serialized as their Python values, and NaN as in
+    the standard library (or as null with orjson)
+    """
+    if (not settings.compact_json):
+        return json.dumps(json_object, indent = 4, default = _encode_default)
+    elif (get_backend() == 'orjson'):
+        import orjson
+
+        return orjson.dumps(json_object, default = _encode_default,
+                            option = orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    return json.dumps(json_object, separators = (',', ':'),
+                      default = _encode_default)
+
+
+def dumps_line(json_object):
+    """
+    Returns the line (without its line break) of an object in a
+    newline-delimited JSON file, which is compact in the compact format and
+    uses the standard library separators otherwise
+    """
+    if (settings.compact_json):
+        return dumps(json_object)
+
+    return json.dumps(json_object, default = _encode_default)
+
+
+def dumps_items(json_list):
+    """
+    Returns the text of the items of a list as it appears in the serialized
+    list, without its brackets (an empty string if there are no items)
+    """
+    if (not json_list):
+        return ''
+    elif (settings.compact_json):
+        return dumps(json_list)[1:-1]
+
+    return dumps(json_list)[2:-2]
+
+
+def _get_value_encoder(level):
+    """
+    Returns the function that encodes a value as it appears in the pretty
+    format, nested at the input level. The strings, nulls and lists of
+    strings (most of the values of the records) are encoded without going
+    through a JSONEncoder
+    """
+    encoder = json.JSONEncoder(indent = 4, default = _encode_default).encode
+    indentation = '\n' + ' ' * 4 * level
+    opening, separator, closing = ['[' + indentation + ' ' * 4,
+                                   ',' + indentation + ' ' * 4,
+                                   indentation + ']']
+
+    def encode(value):
+        if (isinstance(value, str)):
+            return encode_basestring_ascii(value)
+        elif (value is None):
+            return 'null'
+        elif (isinstance(value, list) and value and
+              all(isinstance(item, str) for item in value)):
+            return opening + \
+                   separator.join(map(encode_basestring_ascii, value)) + \
+                   closing
+
+        return encoder(value).replace('\n', indentation)
+
+    return encode
+
+
+def dumps_objects(keys, columns):
+    """
+    Returns a list with the text of each object of a list as it appears in
+    the serialized list of the pretty format (as returned by dumps_items for
+    the object alone), given the keys of the objects and the column of
+    values of each key. The values are encoded from their columns, without
+    building the objects
+    """
+    encode = _get_value_encoder(2)
+    keys = [json.dumps(key).replace('%', '%%') for key in keys]
+    template = '    {\n' + \
+               ',\n'.join(f'        {key}: %s' for key in keys) + \
+               '\n    }'
+
+    return [template % values
+            for values in zip(*[map(encode, column) for column in columns])]
+
+
+def get_delimiters():
+    """
+    Returns a list with the opening, separator and closing of the items of a
+    non-empty serialized list in the current output format
+    """
+    if (settings.compact_json):
+        return ['[', ',', ']']
+
+    return ['[\n', ',\n', '\n]']
+
+
+def join_items(fragments):
+    """
+    Returns the serialized list whose items are the input fragments (as
+    returned by dumps_items), following their order
+    """
+    fragments = [fragment for fragment in fragments if fragment]
+
+    if (not fragments):
+        return '[]'
+
+    opening, separator, closing = get_delimiters()
+
+    return opening + separator.join(fragments) + closing
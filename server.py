@@ -0,0 +1,193 @@
+"""
+This module contains the query server, which keeps both transformed datasets
+in memory and serves the results of every filter as JSON over local HTTP
+"""
+
+import os
+import json
+import threading
+import beds
+import measures as msrs
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from commons import get_filter_names
+from constants import (BedsFilter, MeasuresFilter, BED_FILTERS,
+                       MEASURE_FILTERS)
+
+
+class DatasetStore:
+    """
+    This class keeps a transformed dataset in memory together with the cache
+    of its serialized filter results. Both are replaced when the CSV file of
+    the dataset changes
+    """
+    def __init__(self, filename, filters_count, load, serialize, parts):
+        self._filename = filename
+        self._filters_count = filters_count
+        self._load = load
+        self._serialize = serialize
+        self._parts = parts
+        self._lock = threading.Lock()
+        self._signature = None
+        self._data = None
+        self._generation = 0
+        self._results = {}
+
+
+    def _get_signature(self):
+        """
+        Returns the size and modification time of the CSV file
+        """
+        file_stat = os.stat(self._filename)
+        return (file_stat.st_size, file_stat.st_mtime_ns)
+
+
+    def get_data(self):
+        """
+        Returns the loaded dataset and its generation, reloading it (and
+        dropping the cached results) if the CSV file changed
+        """
+        signature = self._get_signature()
+
+        with self._lock:
+            if (signature != self._signature):
+                self._data = self._load()
+                self._signature = signature
+                self._generation += 1
+                self._results = {}
+
+            return [self._data, self._generation]
+
+
+    def _encode(self, exports):
+        """
+        Returns the JSON response body for the serialized exports of a filter,
+        as an object from each export name to its parts
+        """
+        encoded_exports = []
+
+        for name, api_data in exports:
+            parts = ', '.join(f'"{part}": {part_data}' for part, part_data
+                              in zip(self._parts, api_data))
+            encoded_exports.append(f'"{name}": {{{parts}}}')
+
+        return ('{' + ', '.join(encoded_exports) + '}').encode()
+
+
+    def is_valid(self, filter_option):
+        """
+        Checks whether the input filter option exists for the dataset
+        """
+        return 1 <= filter_option <= self._filters_count
+
+
+    def get_result(self, filter_option):
+        """
+        Returns the JSON response body with the results of the input filter
+        option, computing them only if they are not cached
+        """
+        data, generation = self.get_data()
+        result = self._results.get(filter_option)
+
+        if (result is None):
+            result = self._encode(self._serialize(filter_option, data = data))
+
+            with self._lock:
+                if (generation == self._generation):
+                    self._results[filter_option] = result
+
+        return result
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    This class handles the requests of the query server:
+    - GET /: the available filters of each dataset
+    - GET /beds/<index of filter>: results of a bed capacity filter
+    - GET /measures/<index of filter>: results of a measures filter
+    """
+    protocol_version = 'HTTP/1.1'
+
+
+    def _send_body(self, status, body):
+        """
+        Sends a JSON response with the input status and body
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def _send_error(self, status, message):
+        """
+        Sends a JSON error response
+        """
+        self._send_body(status, json.dumps({'error': message}).encode())
+
+
+    def do_GET(self):
+        """
+        Serves the filters list or the results of a filter
+        """
+        path_parts = urlparse(self.path).path.strip('/').split('/')
+
+        if (path_parts == ['']):
+            filters = {'beds': get_filter_names(BED_FILTERS),
+                       'measures': get_filter_names(MEASURE_FILTERS)}
+            self._send_body(200, json.dumps(filters).encode())
+            return
+
+        store = self.server.stores.get(path_parts[0])
+
+        if (store is None or len(path_parts) != 2):
+            self._send_error(404, 'Not found')
+        elif (not path_parts[1].isdigit() or
+              not store.is_valid(int(path_parts[1]))):
+            self._send_error(400, 'Not a valid filter')
+        else:
+            try:
+                self._send_body(200, store.get_result(int(path_parts[1])))
+            except OSError as e:
+                self._send_error(503, f'The dataset is not available: {e}')
+
+
+    def log_message(self, format, *args):
+        """
+        Only logs the requests that failed
+        """
+        if (len(args) > 1 and not str(args[1]).startswith('2')):
+            super().log_message(format, *args)
+
+
+def serve(host, port):
+    """
+    Loads both datasets and serves the filter results until interrupted
+    """
+    server = ThreadingHTTPServer((host, port), QueryRequestHandler)
+    server.daemon_threads = True
+    server.stores = {
+        'beds': DatasetStore(BedsFilter.DATA_FILENAME.value,
+                             len(BED_FILTERS), beds.load_beds_dataset,
+                             beds.get_serialized_filter,
+                             ['general', 'types']),
+        'measures': DatasetStore(MeasuresFilter.DATA_FILENAME.value,
+                                 len(MEASURE_FILTERS),
+                                 msrs.load_measures_dataset,
+                                 msrs.get_serialized_filter,
+                                 ['general', 'measures'])
+    }
+
+    for store in server.stores.values():
+        store.get_data()
+
+    print(f'Serving the filters on http://{host}:{server.server_port}/ '
+          '(press Ctrl+C to stop)')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('\nStopping the server')
+    finally:
+        server.server_close()
@@ -0,0 +1,89 @@
+"""
+This module stores the run-time settings chosen through the execution
+arguments, which are shared by the processing modules
+"""
+
+from constants import (TOP_N, SPATIAL_RADIUS, SPATIAL_COUNT, KEYWORD_QUERY,
+                       API_CONCURRENCY, API_TIMEOUT, API_RETRIES)
+
+# Whether the transformed datasets can be read from and written to the cache
+use_cache = True
+
+# Whether the filters are recomputed and their files rewritten even if their
+# cached results are up to date
+force = False
+
+# Whether the stages of the processing are measured and reported
+profile = False
+
+# Number of worker processes that pack the records of the countries (1 packs
+# them in the main process)
+workers = 1
+
+# Number of rows read at a time from the CSV files, which are folded into
+# mergeable aggregates instead of being loaded whole (None reads them whole)
+chunk_size = None
+
+# Whether the measures dataset is refreshed incrementally, applying only the
+# rows changed since the last run and writing only the changed exports
+incremental = False
+
+# Number of countries selected by the ranking filters
+ranking_count = TOP_N
+
+# Name of the metric used by the ranking filters (None keeps the one of each
+# filter), as a key of the BEDS_METRICS or MEASURES_METRICS constants
+ranking_metric = None
+
+# Direction of the ranking filters: 'top', 'bottom' or 'both' (None keeps the
+# one of each filter)
+ranking_direction = None
+
+# Query points of the spatial filters, as a list of [latitude, longitude]
+# pairs (None queries from the location of every country)
+spatial_points = None
+
+# Radius of the countries within distance filter, in kilometers
+spatial_radius = SPATIAL_RADIUS
+
+# Number of countries selected by the nearest countries filter
+spatial_count = SPATIAL_COUNT
+
+# Date of the active measures filter, as a 'YYYY-MM-DD' string (None uses
+# the last start date of the measures)
+active_date = None
+
+# First and last dates of the daily active measures filter, as a list of two
+# 'YYYY-MM-DD' strings (None uses the range of the start dates of the
+# measures)
+active_range = None
+
+# ISO codes of the countries of the date and keyword filters of the measures
+# dataset (None keeps all of them)
+country_codes = None
+
+# Boolean query of the keyword filters, e.g. 'curfew AND NOT school closure'
+keyword_query = KEYWORD_QUERY
+
+# Whether the measures files are written while their records are produced,
+# one country at a time
+streaming = False
+
+# Whether the streamed files are written as newline-delimited JSON
+ndjson = False
+
+# Whether the JSON files are written without whitespace instead of indented
+compact_json = False
+
+# Backend of the compact JSON files: 'stdlib', 'orjson', or 'auto' to use
+# orjson when it is installed
+json_backend = 'auto'
+
+# Maximum number of API requests in flight at the same time
+api_concurrency = API_CONCURRENCY
+
+# Timeout of each API request, in seconds
+api_timeout = API_TIMEOUT
+
+# Number of times a failed API request is retried
+api_retries = API_RETRIES
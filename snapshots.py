@@ -0,0 +1,137 @@
+"""
+This module writes and reads the columnar snapshots of the transformed
+datasets. Every column is stored as its own NumPy arrays in an uncompressed
+.npz file, together with a JSON header with the names and types of the
+columns: the numbers and dates keep their arrays, the categoricals are
+stored as their integer codes and their categories, and the strings as the
+integer codes of their distinct values, whose UTF-8 text is joined in a
+single array with their offsets. A snapshot is read without unpickling any
+object, and each column is rebuilt straight from its arrays
+"""
+
+import json
+import numpy as np
+import pandas as pd
+
+_HEADER_KEY = 'header'
+_INDEX_KEY = 'index'
+
+
+def _write_strings(key, strings, arrays):
+    """
+    Adds the joined UTF-8 text of the input strings and the offsets of each
+    one in it (in characters) to the arrays of the snapshot
+    """
+    if (not all(isinstance(string, str) for string in strings)):
+        raise TypeError(f'The column "{key}" has values that are not strings')
+
+    arrays[f'{key}.text'] = np.frombuffer(''.join(strings).encode(),
+                                          dtype = np.uint8)
+    arrays[f'{key}.offsets'] = np.cumsum([0] + [len(string)
+                                                for string in strings])
+
+
+def _read_strings(key, arrays):
+    """
+    Returns the object array of the strings stored under the input key
+    """
+    text = arrays[f'{key}.text'].tobytes().decode()
+    offsets = arrays[f'{key}.offsets'].tolist()
+
+    return np.array([text[start:end]
+                     for start, end in zip(offsets[:-1], offsets[1:])],
+                    dtype = object)
+
+
+def _write_column(key, values, arrays):
+    """
+    Adds the arrays of the input Series to the arrays of the snapshot under
+    the input key, and returns the header entry of its type
+    Raises TypeError if the values are neither numbers, dates, categoricals
+    nor strings
+    """
+    if (isinstance(values.dtype, pd.CategoricalDtype)):
+        arrays[f'{key}.codes'] = values.cat.codes.to_numpy()
+        return {
+            'kind': 'category',
+            'ordered': bool(values.cat.ordered),
+            'categories': _write_column(f'{key}.categories',
+                                        pd.Series(values.cat.categories),
+                                        arrays)
+        }
+    elif (isinstance(values.dtype, np.dtype) and values.dtype.kind != 'O'):
+        arrays[key] = values.to_numpy()
+        return {'kind': 'array'}
+
+    codes, uniques = pd.factorize(values)
+    arrays[f'{key}.codes'] = codes
+    _write_strings(key, list(uniques), arrays)
+
+    return {'kind': 'strings', 'dtype': str(values.dtype)}
+
+
+def _read_column(key, entry, arrays):
+    """
+    Returns the Series of the column stored under the input key, given the
+    header entry of its type
+    """
+    if (entry['kind'] == 'category'):
+        categories = _read_column(f'{key}.categories', entry['categories'],
+                                  arrays)
+        return pd.Series(pd.Categorical.from_codes(
+                             arrays[f'{key}.codes'],
+                             categories = pd.Index(categories),
+                             ordered = entry['ordered']))
+    elif (entry['kind'] == 'array'):
+        return pd.Series(arrays[key])
+
+    # The code -1 of the missing values takes the NaN appended to the
+    # distinct strings
+    uniques = np.append(_read_strings(key, arrays), np.nan)
+
+    return pd.Series(uniques[arrays[f'{key}.codes']], dtype = entry['dtype'])
+
+
+def write_snapshot(data, filename):
+    """
+    Writes the columnar snapshot of the input DataFrame on the input .npz
+    file
+    Raises TypeError if a column has values that cannot be stored
+    """
+    arrays = {}
+    columns = [[name, _write_column(f'column{position}', data[name],
+                                    arrays)]
+               for position, name in enumerate(data.columns)]
+
+    if (isinstance(data.index, pd.RangeIndex)):
+        index = {'kind': 'range', 'start': int(data.index.start),
+                 'stop': int(data.index.stop), 'step': int(data.index.step)}
+    else:
+        index = _write_column(_INDEX_KEY, data.index.to_series(), arrays)
+
+    header = json.dumps({'columns': columns, 'index': index})
+    arrays[_HEADER_KEY] = np.frombuffer(header.encode(), dtype = np.uint8)
+
+    with open(filename, 'wb') as snapshot_file:
+        np.savez(snapshot_file, **arrays)
+
+
+def read_snapshot(filename):
+    """
+    Returns the DataFrame of the columnar snapshot of the input .npz file
+    """
+    with np.load(filename, allow_pickle = False) as arrays:
+        header = json.loads(arrays[_HEADER_KEY].tobytes().decode())
+        data = pd.DataFrame({name: _read_column(f'column{position}', entry,
+                                                arrays)
+                             for position, (name, entry)
+                             in enumerate(header['columns'])})
+        index = header['index']
+
+        if (index['kind'] == 'range'):
+            data.index = pd.RangeIndex(index['start'], index['stop'],
+                                       index['step'])
+        else:
+            data.index = pd.Index(_read_column(_INDEX_KEY, index, arrays))
+
+    return data
@@ -0,0 +1,199 @@
+"""
+This module contains the spatial index of the countries, which answers radius
+and nearest-neighbour queries over their coordinates. The points are placed
+on the unit sphere, where the straight (chord) distance between two points
+grows with their great-circle distance, and split by a KD-tree stored as
+arrays. A batch of queries descends the tree one level at a time for all its
+points at once, so the work is vectorized and each query only visits the
+nodes whose bounding box is within its distance
+"""
+
+import numpy as np
+from constants import EARTH_RADIUS, SPATIAL_LEAF_SIZE
+
+# Chord length beyond the diameter of the unit sphere, which contains all the
+# points from any query point
+WHOLE_SPHERE_CHORD = 2.5
+
+
+def get_unit_vectors(lat, lng):
+    """
+    Returns the array with the 3D unit vector of each latitude and longitude
+    (in degrees) pair of the input arrays
+    """
+    lat = np.radians(np.asarray(lat, dtype = float))
+    lng = np.radians(np.asarray(lng, dtype = float))
+    cos_lat = np.cos(lat)
+
+    return np.column_stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng),
+                            np.sin(lat)])
+
+
+def _get_chords(distances):
+    """
+    Returns the chord lengths on the unit sphere of the input great-circle
+    distances, in kilometers
+    """
+    angles = np.clip(np.asarray(distances, dtype = float) / EARTH_RADIUS, 0,
+                     np.pi)
+    return 2 * np.sin(angles / 2)
+
+
+def _get_distances(chords):
+    """
+    Returns the great-circle distances, in kilometers, of the input chord
+    lengths on the unit sphere
+    """
+    return 2 * EARTH_RADIUS * np.arcsin(np.clip(chords / 2, 0, 1))
+
+
+class SpatialIndex:
+    """
+    This class is a KD-tree over the unit vectors of labeled points. Every
+    node keeps the bounding box and the range of its points in the order of
+    the tree, and the nodes with at most SPATIAL_LEAF_SIZE points are leaves
+    """
+    def __init__(self, labels, lat, lng, leaf_size = SPATIAL_LEAF_SIZE):
+        self.labels = np.asarray(labels)
+        self.lat = np.asarray(lat, dtype = float)
+        self.lng = np.asarray(lng, dtype = float)
+        self._points = get_unit_vectors(self.lat, self.lng)
+        self._order = np.arange(len(self._points))
+        lower, upper, starts, ends, children = [], [], [], [], []
+        pending = [[0, len(self._points), -1, 0]] if len(self._points) \
+                  else []
+
+        while (pending):
+            start, end, parent, side = pending.pop()
+            node = len(starts)
+            segment = self._order[start:end]
+            node_points = self._points[segment]
+
+            if (parent >= 0):
+                children[parent][side] = node
+
+            lower.append(node_points.min(axis = 0))
+            upper.append(node_points.max(axis = 0))
+            starts.append(start)
+            ends.append(end)
+            children.append([-1, -1])
+
+            if (end - start > leaf_size):
+                axis = np.argmax(upper[node] - lower[node])
+                middle = (start + end) // 2
+                self._order[start:end] = segment[np.argpartition(
+                                             node_points[:, axis],
+                                             middle - start)]
+                pending.append([middle, end, node, 1])
+                pending.append([start, middle, node, 0])
+
+        self._lower = np.array(lower).reshape(-1, 3)
+        self._upper = np.array(upper).reshape(-1, 3)
+        self._starts = np.array(starts, dtype = int)
+        self._ends = np.array(ends, dtype = int)
+        self._children = np.array(children, dtype = int).reshape(-1, 2)
+
+
+    def __len__(self):
+        return len(self._points)
+
+
+    def _search(self, queries, chords):
+        """
+        Returns a list with the query positions, point positions and chord
+        distances of every pair of a query (unit vector) and a point within
+        its chord length
+        """
+        query_ids = np.arange(len(queries) if len(self) else 0)
+        nodes = np.zeros(len(query_ids), dtype = int)
+        leaf_queries, leaf_nodes = [query_ids[:0]], [nodes[:0]]
+
+        while (len(nodes)):
+            query_points = queries[query_ids]
+            gaps = np.maximum(self._lower[nodes] - query_points, 0) + \
+                   np.maximum(query_points - self._upper[nodes], 0)
+            near = np.einsum('ij,ij->i', gaps, gaps) <= chords[query_ids] ** 2
+            query_ids, nodes = query_ids[near], nodes[near]
+            leaves = self._children[nodes, 0] < 0
+
+            leaf_queries.append(query_ids[leaves])
+            leaf_nodes.append(nodes[leaves])
+            query_ids = np.repeat(query_ids[~leaves], 2)
+            nodes = self._children[nodes[~leaves]].ravel()
+
+        query_ids = np.concatenate(leaf_queries)
+        nodes = np.concatenate(leaf_nodes)
+        sizes = self._ends[nodes] - self._starts[nodes]
+        offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes,
+                                                     sizes)
+        query_ids = np.repeat(query_ids, sizes)
+        positions = self._order[np.repeat(self._starts[nodes], sizes) +
+                                offsets]
+        differences = self._points[positions] - queries[query_ids]
+        squared = np.einsum('ij,ij->i', differences, differences)
+        inside = squared <= chords[query_ids] ** 2
+
+        return [query_ids[inside], positions[inside],
+                np.sqrt(squared[inside])]
+
+
+    def query_radius(self, lat, lng, radius):
+        """
+        Returns a list with the query positions, point positions and
+        great-circle distances (in kilometers) of the points within the
+        radius (in kilometers, one for all the queries or one per query) of
+        each query point, given their latitude and longitude arrays. The
+        pairs are sorted by query and then by distance
+        """
+        queries = get_unit_vectors(lat, lng)
+        chords = np.broadcast_to(_get_chords(radius), len(queries))
+        query_ids, positions, chord_distances = self._search(queries, chords)
+        order = np.lexsort((positions, chord_distances, query_ids))
+
+        return [query_ids[order], positions[order],
+                _get_distances(chord_distances[order])]
+
+
+    def query_nearest(self, lat, lng, count):
+        """
+        Returns a list with the query positions, point positions and
+        great-circle distances (in kilometers) of the N nearest points of
+        each query point (all the points if there are less), given their
+        latitude and longitude arrays. The pairs are sorted by query and
+        then by distance. Each query starts from the radius that would hold
+        N points if they were spread evenly, which is doubled until it does
+        """
+        queries = get_unit_vectors(lat, lng)
+        count = min(count, len(self))
+
+        if (count <= 0):
+            return [np.array([], dtype = int), np.array([], dtype = int),
+                    np.array([], dtype = float)]
+
+        chords = np.full(len(queries), 2 * np.sqrt(count / len(self)))
+        pending = np.arange(len(queries))
+        found = []
+
+        while (len(pending)):
+            query_ids, positions, chord_distances = self._search(
+                                                        queries[pending],
+                                                        chords[pending])
+            complete = np.bincount(query_ids,
+                                   minlength = len(pending)) >= count
+            kept = complete[query_ids]
+            found.append([pending[query_ids[kept]], positions[kept],
+                          chord_distances[kept]])
+            pending = pending[~complete]
+            chords[pending] = np.minimum(2 * chords[pending],
+                                         WHOLE_SPHERE_CHORD)
+
+        query_ids, positions, chord_distances = [np.concatenate(column)
+                                                 for column in zip(*found)]
+        order = np.lexsort((positions, chord_distances, query_ids))
+        query_ids = query_ids[order]
+        ranks = np.arange(len(query_ids)) - np.searchsorted(query_ids,
+                                                            query_ids)
+        nearest = order[ranks < count]
+
+        return [query_ids[ranks < count], positions[nearest],
+                _get_distances(chord_distances[nearest])]
@@ -0,0 +1,48 @@
+"""
+This module reports the startup cost of the application: how long the entry
+point took to be ready and how long each of the modules loaded on demand
+takes to import
+"""
+
+import sys
+import time
+import importlib
+from constants import DEFERRED_MODULES
+
+
+def _time_import(module_name):
+    """
+    Imports the input module and returns the seconds it took, which only
+    include its dependencies that were not imported yet
+    """
+    start = time.perf_counter()
+    importlib.import_module(module_name)
+    return time.perf_counter() - start
+
+
+def print_report(ready_seconds):
+    """
+    Prints the startup-time report, given the seconds the entry point took
+    until its execution arguments were parsed. The deferred modules are
+    imported in the order of the DEFERRED_MODULES constant, so each row shows
+    the cost it adds on top of the previous ones
+    """
+    print('\nStartup-time report (ms)\n')
+    print(f'    {"entry point ready":<24}{1000 * ready_seconds:>10.1f}')
+
+    total = 0.0
+
+    for module_name in DEFERRED_MODULES:
+        was_loaded = module_name in sys.modules
+
+        try:
+            seconds = _time_import(module_name)
+        except ImportError:
+            print(f'    {module_name:<24}{"missing":>10}')
+            continue
+
+        total += seconds
+        status = ' (already loaded)' if was_loaded else ''
+        print(f'    {module_name:<24}{1000 * seconds:>10.1f}{status}')
+
+    print(f'    {"deferred imports total":<24}{1000 * total:>10.1f}\n')
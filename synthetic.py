@@ -0,0 +1,102 @@
+"""
+This module generates synthetic versions of the datasets at any scale. Their
+rows are drawn at random from the bundled CSV files, so they keep the same
+schema and the real country, bed type, keyword and source cardinalities,
+and the values that would repeat too much are perturbed: the bed and
+population figures are jittered and the measure IDs are renumbered. The
+files are written in blocks, so that their size does not depend on memory
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+from constants import BedsFilter, MeasuresFilter, SYNTHETIC_BLOCK_ROWS
+
+
+def _jitter_beds(block, rng):
+    """
+    Multiplies the beds and population values of a block of bed capacity rows
+    by a random factor around 1
+    """
+    beds_factors = rng.lognormal(0, 0.25, len(block))
+    population_factors = rng.lognormal(0, 0.1, len(block))
+
+    block['beds'] = (block['beds'] * beds_factors).round(3)
+    block['population'] = (block['population'] * population_factors) \
+                              .round().astype('Int64')
+
+
+def _renumber_measures(block, first_id):
+    """
+    Replaces the IDs of a block of measures rows with consecutive unique
+    numbers starting at first_id, keeping the missing ones missing, and
+    returns the next unused ID
+    """
+    present = block['ID'].notna().to_numpy()
+    ids = np.arange(first_id, first_id + present.sum())
+
+    block['ID'] = pd.array([None] * len(block), dtype = 'Int64')
+    block.loc[present, 'ID'] = ids
+
+    return first_id + len(ids)
+
+
+def generate_dataset(dataset, rows, filename, seed = 0):
+    """
+    Writes a synthetic version of the input dataset ('beds' or 'measures')
+    with the input number of rows on a CSV file. The same seed always
+    produces the same file
+    """
+    rng = np.random.default_rng(seed)
+    is_beds = dataset == 'beds'
+
+    if (is_beds):
+        template = pd.read_csv(BedsFilter.DATA_FILENAME.value)
+        encoding = 'utf-8'
+    else:
+        template = pd.read_csv(MeasuresFilter.DATA_FILENAME.value,
+                               encoding = 'utf-8-sig')
+        encoding = 'utf-8-sig'
+
+    next_id = 1
+
+    for start in range(0, rows, SYNTHETIC_BLOCK_ROWS):
+        size = min(SYNTHETIC_BLOCK_ROWS, rows - start)
+        block = template.iloc[rng.integers(0, len(template), size)] \
+                        .reset_index(drop = True)
+
+        if (is_beds):
+            _jitter_beds(block, rng)
+        else:
+            next_id = _renumber_measures(block, next_id)
+
+        block.to_csv(filename, index = False, mode = 'a' if start else 'w',
+                     header = start == 0, encoding = encoding)
+
+
+def parse_arguments():
+    """
+    Parses the execution arguments of the generator
+    """
+    parser = argparse.ArgumentParser(
+        description = 'Generates a synthetic version of a dataset')
+    parser.add_argument('dataset', choices = ['beds', 'measures'],
+                        help = 'dataset whose rows are drawn')
+    parser.add_argument('rows', type = int, help = 'number of rows')
+    parser.add_argument('filename', help = 'path of the CSV file to write')
+    parser.add_argument('--seed', type = int, default = 0,
+                        help = 'seed of the random generator')
+    arguments = parser.parse_args()
+
+    if (arguments.rows < 1):
+        parser.error('the number of rows must be positive')
+
+    return arguments
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    generate_dataset(arguments.dataset, arguments.rows, arguments.filename,
+                     arguments.seed)
+    print(f'Wrote {arguments.rows} synthetic {arguments.dataset} rows on '
+          f'{arguments.filename}')
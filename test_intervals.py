@@ -0,0 +1,83 @@
+"""
+This module checks the interval index of the measures against a scan of
+every interval, run with pytest
+"""
+
+import numpy as np
+from intervals import IntervalIndex, get_day
+
+
+def _get_active(labels, starts, ends, day, chosen_labels):
+    """
+    Returns the sorted positions of the intervals of the chosen labels that
+    are active on the input day number, found by checking all of them
+    """
+    start_days = starts.astype(np.int64)
+    end_days = ends.astype(np.int64)
+    ongoing = np.isnat(ends)
+    active = ~np.isnat(starts) & (start_days <= day) & \
+             (ongoing | ((end_days >= day) & (end_days >= start_days))) & \
+             np.isin(labels, chosen_labels)
+    positions = np.flatnonzero(active)
+
+    return positions[np.lexsort((positions, labels[positions]))]
+
+
+def _check_index(labels, starts, ends, days):
+    """
+    Checks the active intervals and the daily counts of the index of the
+    input intervals on every one of the input day numbers
+    """
+    index = IntervalIndex(labels, starts, ends)
+
+    for day in days:
+        groups, positions = index.query_active(day)
+        assert np.array_equal(positions, _get_active(labels, starts, ends,
+                                                     day, index.labels))
+        assert np.array_equal(index.labels[groups], labels[positions])
+
+    groups, counts = index.count_daily(days[0], days[-1])
+
+    for column, day in enumerate(range(days[0], days[-1] + 1)):
+        for row, group in enumerate(groups):
+            assert counts[row, column] == len(_get_active(
+                                                  labels, starts, ends, day,
+                                                  [index.labels[group]]))
+
+
+def test_ongoing_interval_after_every_end():
+    """
+    An ongoing interval that starts after the last end date of the others
+    is only active from its start
+    """
+    labels = np.array(['A', 'B', 'B'], dtype = object)
+    starts = np.array(['2020-03-10', '2020-03-01', '2020-03-02'],
+                      dtype = 'datetime64[D]')
+    ends = np.array(['NaT', '2020-03-03', '2020-03-03'],
+                    dtype = 'datetime64[D]')
+    index = IntervalIndex(labels, starts, ends)
+
+    assert index.query_active(get_day('2020-03-01'))[1].tolist() == [1]
+    assert index.query_active(get_day('2020-03-10'))[1].tolist() == [0]
+    _check_index(labels, starts, ends,
+                 list(range(get_day('2020-02-25'), get_day('2020-03-20'))))
+
+
+def test_random_intervals():
+    """
+    Random intervals, with missing starts and ends and some that end before
+    they start, match the scan on days inside and around their range
+    """
+    rng = np.random.default_rng(0)
+    size = 2000
+    labels = rng.choice(np.array(['AA', 'BB', 'CC', 'DD'], dtype = object),
+                        size)
+    start_days = rng.integers(18000, 18100, size)
+    starts = start_days.astype('datetime64[D]')
+    ends = (start_days + rng.integers(-5, 40, size)).astype('datetime64[D]')
+    starts[rng.random(size) < 0.05] = np.datetime64('NaT')
+    ends[rng.random(size) < 0.3] = np.datetime64('NaT')
+
+    _check_index(labels, starts, ends, list(range(17990, 18160)))
+    ends[start_days > 18050] = np.datetime64('NaT')
+    _check_index(labels, starts, ends, list(range(17990, 18160)))
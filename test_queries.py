@@ -0,0 +1,173 @@
+"""
+This module checks the parsing of the keyword queries and their evaluation
+with the bitmaps of the keyword index against a filter of every row, run
+with pytest
+"""
+
+import numpy as np
+import pytest
+from bitmaps import Bitmap
+from keywords import KeywordIndex
+from queries import parse_query
+
+# Keywords of the random rows, from the most to the least frequent
+KEYWORDS = ['school closure', 'curfew', 'remote schooling', 'travel ban',
+            'mask', 'lockdown', 'university closure', 'rare']
+FREQUENCIES = [0.5, 0.3, 0.2, 0.1, 0.05, 0.02, 0.01, 0.001]
+CODES = ['AA', 'BB', 'CC', 'DD']
+
+# Queries and the functions that tell whether the set of keywords of a row
+# matches them
+QUERIES = [
+    ['curfew', lambda k: 'curfew' in k],
+    ['  School   CLOSURE ', lambda k: 'school closure' in k],
+    ['NOT curfew', lambda k: 'curfew' not in k],
+    ['school closure AND curfew',
+     lambda k: 'school closure' in k and 'curfew' in k],
+    ['mask OR rare', lambda k: 'mask' in k or 'rare' in k],
+    ['school closure AND NOT remote schooling',
+     lambda k: 'school closure' in k and 'remote schooling' not in k],
+    ['NOT curfew AND NOT mask', lambda k: not k & {'curfew', 'mask'}],
+    ['mask OR curfew AND lockdown',
+     lambda k: 'mask' in k or ('curfew' in k and 'lockdown' in k)],
+    ['(mask OR curfew) AND lockdown',
+     lambda k: ('mask' in k or 'curfew' in k) and 'lockdown' in k],
+    ['NOT (school closure OR university closure)',
+     lambda k: not k & {'school closure', 'university closure'}],
+    ['(school closure OR university closure) AND NOT (remote schooling OR '
+     '(curfew AND travel ban))',
+     lambda k: bool(k & {'school closure', 'university closure'}) and
+               not ('remote schooling' in k or
+                    k >= {'curfew', 'travel ban'})],
+    ['NOT NOT rare', lambda k: 'rare' in k],
+    ['((curfew))', lambda k: 'curfew' in k],
+    ['unknown keyword', lambda k: False],
+    ['unknown keyword OR NOT rare', lambda k: 'rare' not in k],
+    ['curfew AND NOT curfew', lambda k: False]
+]
+
+
+def _get_random_rows(size, seed):
+    """
+    Returns a list with the set of keywords and the country code of each
+    one of size random rows
+    """
+    rng = np.random.default_rng(seed)
+    present = rng.random((size, len(KEYWORDS))) < FREQUENCIES
+    keyword_sets = [{KEYWORDS[k] for k in np.flatnonzero(row)}
+                    for row in present]
+
+    return [keyword_sets, rng.choice(np.array(CODES, dtype = object), size)]
+
+
+def _get_index(keyword_sets, codes):
+    """
+    Returns the KeywordIndex of the input rows
+    """
+    rows = [row for row, keywords in enumerate(keyword_sets)
+            for _ in keywords]
+    keywords = [keyword for keywords in keyword_sets
+                for keyword in sorted(keywords)]
+
+    return KeywordIndex(np.array(rows, dtype = int), keywords, codes)
+
+
+def _filter_rows(keyword_sets, codes, matches, chosen_codes = None):
+    """
+    Returns the result of KeywordIndex.query for the rows whose keywords
+    match and whose code is chosen, found by checking every row
+    """
+    rows = [row for row, keywords in enumerate(keyword_sets)
+            if matches(keywords) and
+            (chosen_codes is None or codes[row] in chosen_codes)]
+    rows.sort(key = lambda row: codes[row])
+    row_codes = [codes[row] for row in rows]
+    result_codes = sorted(set(row_codes))
+
+    return [result_codes, [row_codes.count(code) for code in result_codes],
+            rows]
+
+
+def _check_query(index, keyword_sets, codes, query, matches,
+                 chosen_codes = None):
+    """
+    Checks the result of a query against the filter of every row
+    """
+    result_codes, counts, rows = index.query(parse_query(query),
+                                             chosen_codes)
+    expected = _filter_rows(keyword_sets, codes, matches, chosen_codes)
+
+    assert result_codes.tolist() == expected[0]
+    assert counts.tolist() == expected[1]
+    assert rows.tolist() == expected[2]
+
+
+@pytest.mark.parametrize('size', [0, 1, 37, 5000])
+def test_random_rows(size):
+    """
+    Every query matches the same rows as the filter of every row, with and
+    without a choice of country codes, on sparse and dense bitmaps
+    """
+    keyword_sets, codes = _get_random_rows(size, size)
+    index = _get_index(keyword_sets, codes)
+
+    for query, matches in QUERIES:
+        _check_query(index, keyword_sets, codes, query, matches)
+        _check_query(index, keyword_sets, codes, query, matches,
+                     ['BB', 'DD', 'ZZ'])
+
+
+def test_precedence():
+    """
+    NOT binds tighter than AND, which binds tighter than OR, and the
+    parentheses group the operands
+    """
+    assert parse_query('a OR b AND NOT c') == \
+           ['or', ['keyword', 'a'], ['and', ['keyword', 'b'],
+                                     ['not', ['keyword', 'c']]]]
+    assert parse_query('(a OR b) AND c') == \
+           ['and', ['or', ['keyword', 'a'], ['keyword', 'b']],
+            ['keyword', 'c']]
+    assert parse_query('NOT (a AND b) OR c d') == \
+           ['or', ['not', ['and', ['keyword', 'a'], ['keyword', 'b']]],
+            ['keyword', 'c d']]
+    assert parse_query('a and b') == ['keyword', 'a and b']
+
+
+@pytest.mark.parametrize('query', ['', '   ', '()', '(curfew', 'curfew)',
+                                   '((curfew) OR mask', 'AND curfew',
+                                   'curfew AND', 'curfew OR OR mask',
+                                   'NOT', 'curfew NOT mask', ') curfew (',
+                                   'curfew AND (mask OR)'])
+def test_malformed_queries(query):
+    """
+    An empty or malformed query raises ValueError
+    """
+    with pytest.raises(ValueError, match = 'keyword query'):
+        parse_query(query)
+
+
+def test_bitmap_operations():
+    """
+    The set operations of the bitmaps match those of the sets of their ids,
+    for every combination of sparse and dense bitmaps
+    """
+    rng = np.random.default_rng(0)
+    size = 1003
+    id_sets = [set(np.flatnonzero(rng.random(size) < density).tolist())
+               for density in [0, 0.005, 0.02, 0.5, 1]]
+    bitmaps = [Bitmap.from_ids(size, sorted(ids)) for ids in id_sets]
+
+    assert {bitmap.is_sparse() for bitmap in bitmaps} == {True, False}
+    assert Bitmap.full(size).to_ids().tolist() == list(range(size))
+
+    for left_ids, left in zip(id_sets, bitmaps):
+        assert len(left) == len(left_ids)
+
+        for right_ids, right in zip(id_sets, bitmaps):
+            assert (left & right).to_ids().tolist() == \
+                   sorted(left_ids & right_ids)
+            assert (left | right).to_ids().tolist() == \
+                   sorted(left_ids | right_ids)
+            assert (left - right).to_ids().tolist() == \
+                   sorted(left_ids - right_ids)
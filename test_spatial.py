@@ -0,0 +1,160 @@
+"""
+This module checks the radius and nearest-neighbour queries of the spatial
+index against the haversine distances between every query point and every
+country of the beds dataset, run with pytest
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from constants import BedsFilter, EARTH_RADIUS
+from spatial import SpatialIndex
+
+# Tolerance, in kilometers, of the distances found through the unit sphere
+TOLERANCE = 1e-6
+
+
+def _get_beds_points():
+    """
+    Returns a list with the labels, latitudes and longitudes of the distinct
+    coordinates of the beds dataset
+    """
+    data = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                    BedsFilter.DATA_FILENAME.value),
+                       usecols = ['country', 'lat', 'lng'],
+                       keep_default_na = False, na_values = [''])
+    data = data.dropna().drop_duplicates(['lat', 'lng'])
+
+    return [data['country'].to_numpy(dtype = object),
+            data['lat'].to_numpy(), data['lng'].to_numpy()]
+
+
+def _get_haversine(lat, lng, points_lat, points_lng):
+    """
+    Returns the array with the great-circle distance, in kilometers, from
+    each query point (rows) to each point (columns), given their latitude
+    and longitude arrays
+    """
+    lat, lng = [np.radians(np.asarray(a, dtype = float))[:, None]
+                for a in [lat, lng]]
+    points_lat, points_lng = [np.radians(np.asarray(a, dtype = float))
+                              for a in [points_lat, points_lng]]
+    half_chords = np.sin((points_lat - lat) / 2) ** 2 + np.cos(lat) * \
+                  np.cos(points_lat) * np.sin((points_lng - lng) / 2) ** 2
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(half_chords, 0, 1)))
+
+
+def _check_sorted(query_ids, distances):
+    """
+    Checks that the pairs of a query result are sorted by query and then by
+    distance
+    """
+    order = np.lexsort((distances, query_ids))
+
+    assert np.array_equal(order, np.arange(len(query_ids)))
+
+
+def _check_radius(index, lat, lng, radius):
+    """
+    Checks the points within the radius of each query point against the
+    haversine distances, leaving out the points on the edge of the radius
+    """
+    query_ids, positions, distances = index.query_radius(lat, lng, radius)
+    expected = _get_haversine(lat, lng, index.lat, index.lng)
+    found = np.zeros(expected.shape, dtype = bool)
+    found[query_ids, positions] = True
+    edge = np.abs(expected - radius) <= TOLERANCE
+
+    _check_sorted(query_ids, distances)
+    assert np.array_equal(found[~edge], (expected <= radius)[~edge])
+    assert np.allclose(distances, expected[query_ids, positions],
+                       rtol = 0, atol = TOLERANCE)
+
+
+def _check_nearest(index, lat, lng, count):
+    """
+    Checks the N nearest points of each query point against the haversine
+    distances: the distances are the N smallest ones of the query, and each
+    point is at the distance it was found at
+    """
+    query_ids, positions, distances = index.query_nearest(lat, lng, count)
+    expected = _get_haversine(lat, lng, index.lat, index.lng)
+    count = min(count, len(index))
+    smallest = np.sort(expected, axis = 1)[:, :count].ravel()
+
+    _check_sorted(query_ids, distances)
+    assert np.array_equal(np.bincount(query_ids, minlength = len(expected)),
+                          np.full(len(expected), count))
+    assert np.allclose(distances, smallest, rtol = 0, atol = TOLERANCE)
+    assert np.allclose(distances, expected[query_ids, positions],
+                       rtol = 0, atol = TOLERANCE)
+
+    for query in range(len(expected)):
+        assert len(np.unique(positions[query_ids == query])) == count
+
+
+def test_beds_countries():
+    """
+    The countries of the beds dataset within several radii, and the nearest
+    ones, of every country and of random points match the haversine scan
+    """
+    labels, lat, lng = _get_beds_points()
+    index = SpatialIndex(labels, lat, lng)
+    rng = np.random.default_rng(0)
+    query_lat = np.concatenate([lat, rng.uniform(-90, 90, 200)])
+    query_lng = np.concatenate([lng, rng.uniform(-180, 180, 200)])
+
+    for radius in [0, 500, 1000, 3000, 20000]:
+        _check_radius(index, query_lat, query_lng, radius)
+
+    for count in [1, 5, 17]:
+        _check_nearest(index, query_lat, query_lng, count)
+
+
+def test_antimeridian():
+    """
+    The points on both sides of the antimeridian are close to each other,
+    so they are found from the query points on the other side
+    """
+    labels, lat, lng = _get_beds_points()
+    labels = np.concatenate([labels, ['XA', 'XB', 'XC']])
+    lat = np.concatenate([lat, [-17.5, -17.5, 65.0]])
+    lng = np.concatenate([lng, [179.8, -179.8, -179.9]])
+    index = SpatialIndex(labels, lat, lng)
+    query_lat = np.array([-17.5, -17.5, -17.5, 65.0, 65.0])
+    query_lng = np.array([180.0, -180.0, 179.5, 179.9, -180.0])
+
+    query_ids, positions, _ = index.query_radius(query_lat, query_lng, 100)
+
+    assert set(index.labels[positions[query_ids == 0]]) >= {'XA', 'XB'}
+    assert set(index.labels[positions[query_ids == 3]]) >= {'XC'}
+
+    for radius in [50, 100, 1000]:
+        _check_radius(index, query_lat, query_lng, radius)
+
+    for count in [1, 2, 5]:
+        _check_nearest(index, query_lat, query_lng, count)
+
+
+def test_more_nearest_than_points():
+    """
+    Asking for more nearest points than the index holds returns all of
+    them, sorted by distance, for every query point
+    """
+    labels, lat, lng = _get_beds_points()
+    rng = np.random.default_rng(1)
+    query_lat = rng.uniform(-90, 90, 20)
+    query_lng = rng.uniform(-180, 180, 20)
+
+    for size in [1, 3, len(labels)]:
+        index = SpatialIndex(labels[:size], lat[:size], lng[:size])
+
+        _check_nearest(index, query_lat, query_lng, size + 10)
+
+    index = SpatialIndex(labels[:0], lat[:0], lng[:0])
+
+    assert all(len(column) == 0
+               for column in index.query_nearest(query_lat, query_lng, 5))
+    assert all(len(column) == 0
+               for column in index.query_radius(query_lat, query_lng, 500))